@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 #
 # Copies files using a json file to describe actions
+#   * a cp action with 'progress: true' in its options prints a progress line of the bytes copied and MB/s
 #
 # todos
 #   * detect/specify (?) binary files and handle binary file diffs
 import argparse
 import difflib
-import filecmp
 import os
 import shutil
 import sys
@@ -75,13 +75,26 @@ def action_cp_to_dst_file(src, dst, options=None, relatives=None) -> dict:
     overwrite_status = options.get("overwite_status", "NO_W_ERROR")
     preview = options.get("preview", True)
 
-    cp_func: Callable[[str, str], str] = preview_cp if preview else shutil.copy2  # type: ignore[assignment]
+    progress = path_utils.MvProgress(path_utils.print_progress_line) if options.get("progress", False) else None
+
+    def cp_func(src_path: str, dst_path: str) -> None:
+        if preview:
+            preview_cp(src_path, dst_path)
+        elif progress is None:
+            shutil.copy2(src_path, dst_path)
+        else:
+            #### path_utils.cp copies onto <dst_path> so resolve it and reject the same file as shutil.copy2 does
+            if os.path.isdir(dst_path):
+                dst_path = os.path.join(dst_path, os.path.basename(src_path))
+            if os.path.exists(dst_path) and os.path.samefile(src_path, dst_path):
+                raise shutil.SameFileError(f"'{src_path}' and '{dst_path}' are the same file")
+            path_utils.cp(src_path, dst_path, progress=progress)
 
     src_path = cfg_utils.create_path_from_relative_path(src, relatives)
     dst_path = cfg_utils.create_path_from_relative_path(dst, relatives)
 
     if os.path.exists(dst_path):
-        if filecmp.cmp(src_path, dst_path):
+        if path_utils.is_file_content_equal(src_path, dst_path):
             print(f"INFO: skipping: cp '{src_path}' '{dst_path}'; contents equal")
             return {"error_code": 0, "dst_path": dst_path}
 
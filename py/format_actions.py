@@ -182,6 +182,9 @@ def main(args: Sequence[str] = None) -> None:
     formatters, args_filters = _parse_input(args)
     #### parse filters
     objs = filter_utils.main(cli_utils.shell_split(args_filters))  # type: ignore[arg-type] # TODO
+    #### the filtered objs are streamed into a single formatter but can only be iterated once
+    if len(formatters) > 1:
+        objs = list(objs)
     for formatter in formatters:
         objs_modified, objs_unmodified = formatter_run(formatter["formatter"], objs, formatter["args"])  # type: ignore[arg-type] # TODO
         print("UNMODIFIED below:")
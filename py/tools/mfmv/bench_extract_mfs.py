@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+#
+# Benchmarks Multifile.extract_mfs (MultifileIndex) against Multifile.extract_mfs_regex on generated filenames
+#
+# usage
+#   * python -m tools.mfmv.bench_extract_mfs
+#       * runs both implementations at the default sizes of 1k/10k/100k files
+#   * python -m tools.mfmv.bench_extract_mfs --sizes 1000 5000 --regex-max 5000
+#       * extract_mfs_regex is skipped for sizes above --regex-max since it scales quadratically
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+from collections.abc import Sequence
+
+from tools.mfmv import mfmv
+
+
+def gen_file_strs(num_files: int, seed: int = 0) -> list[str]:
+    """Generate <num_files> filenames where roughly half of the files belong to mfs of 2-12 files."""
+    rng = random.Random(seed)
+    preparts = ("", "-", "_", " - ", "-ep", "-pt", "_part")
+    exts = (".mp4", ".mkv", ".avi", ".txt")
+    file_strs: list[str] = []
+    while len(file_strs) < num_files:
+        base = f"show{len(file_strs)}"
+        if rng.random() < 0.5:
+            file_strs.append(f"{base}{rng.choice(('', '-720p', '.final'))}{rng.choice(exts)}")
+            continue
+        prepart = rng.choice(preparts)
+        ext = rng.choice(exts)
+        for i in range(rng.randint(0, 1), rng.randint(2, 12)):
+            file_strs.append(f"{base}{prepart}{i}{ext}")
+    rng.shuffle(file_strs)
+    return file_strs[:num_files]
+
+
+def time_call(func: Callable, *args) -> tuple[float, list[dict]]:
+    start = time.perf_counter()
+    out = func(*args)
+    return time.perf_counter() - start, out
+
+
+def mf_keys(mf_details: Sequence[dict]) -> list[tuple[str, list[str]]]:
+    return [(mf_detail["base"], list(mf_detail["parts"])) for mf_detail in mf_details]
+
+
+def parse_inputs(argparse_args: Sequence[str] | None = None) -> dict:
+    """Parse cmd line inputs; set, check, and fix script's default variables."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=[1000, 10000, 100000], nargs="+", type=int, help="number of files")
+    parser.add_argument("--regex-max", default=1000, type=int, help="largest size to run extract_mfs_regex on")
+    parser.add_argument("--seed", default=0, type=int, help="seed for generating filenames")
+    return dict(parser.parse_args(argparse_args).__dict__.items())
+
+
+def main(argparse_args: Sequence[str] | None = None) -> None:
+    args = parse_inputs(argparse_args)
+    for size in args["sizes"]:
+        file_strs = gen_file_strs(size, args["seed"])
+        index_s, index_mfs = time_call(mfmv.Multifile.extract_mfs, file_strs)
+        print(f"INFO: files={size}; extract_mfs={index_s:.3f}s; mfs={len(index_mfs)}")
+        if size > args["regex_max"]:
+            print(f"INFO: files={size}; extract_mfs_regex skipped, size > --regex-max={args['regex_max']}")
+            continue
+        regex_s, regex_mfs = time_call(mfmv.Multifile.extract_mfs_regex, file_strs)
+        matching = mf_keys(index_mfs) == mf_keys(regex_mfs)
+        print(
+            f"INFO: files={size}; extract_mfs_regex={regex_s:.3f}s; mfs={len(regex_mfs)}; "
+            f"speedup={regex_s / index_s:.1f}x; matching={matching}",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,12 +11,26 @@
 #   * mfs mv default format is base + postpart + part + ext unless inplace=True then format is base + part + postpart + ext
 #       * partial mv: '--range-mv 2-3' via cmdargs or 'range_mv 2-3' via cli to allow mf=[f1,f2,f3] to mv only [f2,f3]
 #   * mf mv is not atomic, but each individual file mv is atomic; see: https://en.wikipedia.org/wiki/Atomicity_(database_systems)
+#       * a mf's mvs are journaled and rolled back on error; an interrupted mf mv can be finished with --resume-mv
+#         or undone with --rollback-mv
 #
 # usage
 #   * python mfmv.py --help
 #       * provides help info on scripts cmd line args
 #   * python mfmv.py
 #       * uses default params to locate mfs and launch cli
+#   * python mfmv.py --jobs 0
+#       * searches dirs for mfs using one process per cpu; mfs are still presented in the same order
+#   * python mfmv.py --rollback-mv
+#       * undoes the mvs of a mf mv that was interrupted, then exits
+#   * python mfmv.py --rules rules.yaml
+#       * mvs every mf found without prompting as decided by rules.yaml, see MvRules, streaming each mf's plan and
+#         result as json lines to ~/.cache/mfmv/plan_log.jsonl or --plan-log
+#   * python mfmv.py --progress
+#       * prints a progress line with the MB and files mv'd and the MB/s of each mf mv, useful across filesystems
+#   * python mfmv.py --no-cache
+#       * dirs unchanged since a previous search are reused from ~/.cache/mfmv/scan_cache.jsonl unless --no-cache
+#       * likewise the case sensitivity of the searched filesystem is kept in ~/.cache/path_utils/case_sensitivity.json
 # warnings
 #   * race condition when an external process moves files currently being batch mv'd
 #       * each file is safe, but in the worst case an abort occurs and only a portion of the mf's files will mv
@@ -33,16 +47,24 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
+import contextlib
+import functools
+import heapq
 import itertools
 import json
 import math
 import os
 import re
 import sys
+import time
 from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
 from collections.abc import Sequence
 from typing import Any
 
+import yaml  # type: ignore[import-untyped]
 from utils import path_utils
 from utils.wrapped_indexable_callable import WrappedIndexableCallable
 
@@ -195,6 +217,40 @@ def import_json_obj(f: str, key: str) -> list[str]:
     parser.add_argument("--inplace", "--inp", action="store_true", default=False, help="toggle mv inplace mode")
     parser.add_argument("--maxdepth", "--mx", default=10, type=int, help="the recursive dir search max depth")
     parser.add_argument("--mindepth", "--mn", default=1, type=int, help="the recursive dir search min depth")
+    parser.add_argument("--cache-file", default=ScanCache.default_path(), help="path to the multifile search cache")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="do not read or write the multifile search and case sensitivity caches"
+    )
+    parser.add_argument(
+        "--rebuild-cache",
+        action="store_true",
+        help="ignore cached results for this regex and range search and rewrite them",
+    )
+    parser.add_argument(
+        "--mv-journal",
+        default=default_cache_path("mv_journal.jsonl"),
+        help="path to the journal of the mf mv in progress",
+    )
+    parser.add_argument("--resume-mv", action="store_true", help="finish the mvs in --mv-journal then exit")
+    parser.add_argument("--rollback-mv", action="store_true", help="undo the mvs in --mv-journal then exit")
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="print a progress line of the bytes and files mv'd by each mf mv",
+    )
+    parser.add_argument("--rules", help="yaml or json file deciding each mf mv without prompting, see MvRules")
+    parser.add_argument(
+        "--plan-log",
+        default=default_cache_path("plan_log.jsonl"),
+        help="jsonl file appended with the plan and result of each mf mv decided by --rules",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        default=1,
+        type=int,
+        help="number of processes used to search dirs for multifiles; 0 uses one per cpu",
+    )
     parser.add_argument(
         "--range-search",
         "--rs",
@@ -227,6 +283,17 @@ def import_json_obj(f: str, key: str) -> list[str]:
         <= 1,
     )
     raise_if_false(ValueError, out["maxdepth"] >= out["mindepth"] and out["mindepth"] > 0)
+    raise_if_false(ValueError, out["jobs"] >= 0)
+    raise_if_false(ValueError, not (out["no_cache"] and out["rebuild_cache"]))
+    raise_if_false(ValueError, not (out["resume_mv"] and out["rollback_mv"]))
+    if out["resume_mv"] or out["rollback_mv"]:
+        raise_if_false(FileNotFoundError, os.path.isfile(out["mv_journal"]), f"no journal at '{out['mv_journal']}'")
+        return out
+    raise_if_false(
+        FileExistsError,
+        not os.path.exists(out["mv_journal"]),
+        f"interrupted mv journaled at '{out['mv_journal']}'; use --resume-mv or --rollback-mv",
+    )
     #### convert range search range from alpha to int if given an alpha range
     out["range_search"] = [int_from_alpha(x) if isinstance(x, str) else x for x in out["range_search"]]
     #### when regex is None then its set using exts related args
@@ -242,7 +309,13 @@ def import_json_obj(f: str, key: str) -> list[str]:
         assert out["exts"] is not None
         out["exts"] = "|".join([r"\." + ext if ext[0] != "." else ext for ext in out["exts"]])
         out["regex"] = "^.*(" + out["exts"] + ")$"
-    #### get user specified part formatting for renaming multifiles
+    #### get part formatting for renaming multifiles from the rules file or else from the user
+    if out["rules"] is not None:
+        raise_if_false(FileNotFoundError, os.path.isfile(out["rules"]), f"no rules file at '{out['rules']}'")
+        out["rules"] = MvRules(out["rules"], dir_out=out["dir_out"], range_mv=out["range_mv"], inplace=out["inplace"])
+        for k in ("exts_env", "exts_json", "exts", "part_out"):
+            out.pop(k, None)
+        return out
     out["parts_out"] = part_func_selection_terminal(gen_wrapped_indexable_callable())
     assert out["parts_out"] is not None
     out["prepart"] = prepart_selection_terminal()
@@ -256,35 +329,301 @@ def import_json_obj(f: str, key: str) -> list[str]:
     return out
 
 
-def listdir_dirs(
-    dir_in: str = "",
+def progress_line(enabled: bool) -> path_utils.MvProgress | None:
+    """Progress of a mf mv printed as a single line to stderr if <enabled>"""
+    return path_utils.MvProgress(path_utils.print_progress_line) if enabled else None
+
+
+def default_cache_path(file_name: str) -> str:
+    cache_dir = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache_dir, "mfmv", file_name)
+
+
+class ScanCache:
+    """On-disk cache of each dir's listing and mfs for a regex and range search, keyed on the dir's mtime and inode.
+
+    A dir's mtime changes whenever an entry is added, removed or renamed within it, so an unchanged (st_mtime_ns,
+    st_ino) means the cached subdirs, files and mfs can be reused without listing or searching the dir again. Entries
+    whose mtime was too close to when they were listed are not trusted since a change within the filesystem's
+    timestamp granularity would go unnoticed. On save, entries of dirs that were listed as removed this run are
+    dropped and, past MAX_ENTRIES, so are those listed longest ago.
+    """
+
+    RACY_NS = 2 * 10**9
+    MAX_ENTRIES = 2**16
+    _FIELDS = frozenset(["key", "dir", "mtime_ns", "ino", "listed_ns", "subdirs", "files", "mfs"])
+
+    def __init__(self, path: str, regex: str, min_in: int, max_in: int, rebuild: bool = False) -> None:
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._key = [regex, min_in, max_in]
+        self._entries: dict[str, dict] = {}  # entries for <self._key> by absolute dir path
+        self._other_entries: list[dict] = []  # entries for other regexes or ranges, preserved on save
+        self._seen: set[str] = set()  # dirs passed to get() this run, whose subdirs are known when saving
+        self._valid: set[str] = set()  # dirs whose cached entry was reused this run
+        lines: list[str] = []
+        if os.path.isfile(path):
+            try:
+                with path_utils.open_unix_safely(path) as f:
+                    lines = list(f)
+            except (OSError, ValueError) as err:
+                print(f"WARNING: ignoring unreadable search cache '{path}': {err}")
+        for line in lines:
+            #### a line cut short by a crash or otherwise corrupt is skipped and so dropped on save
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(entry, dict) or not self._FIELDS <= entry.keys():
+                continue
+            if entry["key"] != self._key:
+                self._other_entries.append(entry)
+            elif not rebuild:
+                self._entries[entry["dir"]] = entry
+
+    @staticmethod
+    def default_path() -> str:
+        return default_cache_path("scan_cache.jsonl")
+
+    def get(self, dir_: str, stat: os.stat_result) -> dict | None:
+        """Return the cached entry for <dir_> if <stat> shows it is unchanged, otherwise start a new entry."""
+        abs_dir = os.path.abspath(dir_)
+        self._seen.add(abs_dir)
+        entry = self._entries.get(abs_dir)
+        if (
+            entry is not None
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and entry["ino"] == stat.st_ino
+            and entry["listed_ns"] - entry["mtime_ns"] > self.RACY_NS
+        ):
+            self.hits += 1
+            self._valid.add(abs_dir)
+            return entry
+        self.misses += 1
+        self._entries[abs_dir] = {
+            "key": self._key,
+            "dir": abs_dir,
+            "mtime_ns": stat.st_mtime_ns,
+            "ino": stat.st_ino,
+            "listed_ns": time.time_ns(),
+            "subdirs": [],
+            "files": [],
+            "mfs": None,
+        }
+        return None
+
+    def get_mfs(self, dir_: str) -> list[dict] | None:
+        """Return the cached mf details for <dir_> if its entry was reused this run."""
+        abs_dir = os.path.abspath(dir_)
+        if abs_dir not in self._valid:
+            return None
+        return self._entries[abs_dir]["mfs"]  # type: ignore[no-any-return]
+
+    def put(self, dir_: str, **fields: Any) -> None:
+        """Update fields of the entry for <dir_> that was returned or started by get() this run."""
+        abs_dir = os.path.abspath(dir_)
+        assert abs_dir in self._seen, dir_
+        self._entries[abs_dir].update(fields)
+
+    def save(self) -> None:
+        """Atomically write the cache to self.path, pruned of removed dirs and capped at MAX_ENTRIES.
+
+        No dir is stat'd: a dir that was not passed to get() this run is removed if its parent was and no longer lists
+        it as a subdir, or if its parent is removed.
+        """
+        removed: dict[str, bool] = {}
+
+        def is_removed(abs_dir: str) -> bool:
+            if abs_dir not in removed:
+                parent = os.path.dirname(abs_dir)
+                if abs_dir in self._seen:
+                    removed[abs_dir] = False
+                elif parent in self._seen:
+                    removed[abs_dir] = os.path.basename(abs_dir) not in self._entries[parent]["subdirs"]
+                else:
+                    removed[abs_dir] = parent != abs_dir and is_removed(parent)
+            return removed[abs_dir]
+
+        entries = [self._entries[abs_dir] for abs_dir in self._seen]
+        unseen = [
+            entry
+            for entry in itertools.chain(
+                self._other_entries, (e for d, e in self._entries.items() if d not in self._seen)
+            )
+            if not is_removed(entry["dir"])
+        ]
+        unseen.sort(key=lambda entry: entry["listed_ns"], reverse=True)
+        entries += unseen[: max(0, self.MAX_ENTRIES - len(entries))]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = path_utils.generate_tmp_from_path(self.path)
+        with path_utils.open_unix_safely(tmp_path, "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+def walk_dirs_files(
+    dir_in: str = ".",
     mindepth: int = 1,
     maxdepth: int = 1,
     excludes: Sequence[str] | None = None,
-) -> list[str]:
-    """Get dirs from directory within the recursive depths mindepth-maxdepth and remove excludes."""
-    #### recursively find all dirs in dir_in between levels mindepth and maxdepth with excludes removed
+    regex: str = ".*",
+    cache: ScanCache | None = None,
+) -> Iterator[tuple[str, list[str]]]:
+    """Lazily yield (dir, files) for dirs within the recursive depths mindepth-maxdepth with excludes removed.
+
+    Each dir is listed by a single os.scandir; dirs are pruned by depth and <excludes> while descending and files that
+    match <regex> are selected using the type info of each DirEntry so no extra stats are needed. With a <cache>, dirs
+    are stat'd instead and only listed if they changed since they were cached.
+    """
     excludes = [] if excludes is None else excludes
-    dirs_walk = [
-        d[0]
-        for d in os.walk(dir_in)
-        if os.walk(dir_in)
-        and d[0][len(dir_in) :].count(os.sep) <= maxdepth - 1
-        and d[0][len(dir_in) :].count(os.sep) >= mindepth - 1
+    pattern = re.compile(regex, re.IGNORECASE)
+
+    #### local funcs
+    def entry_is(entry: os.DirEntry, is_dir: bool) -> bool:
+        try:
+            return entry.is_dir() and not entry.is_symlink() if is_dir else entry.is_file()
+        except OSError:
+            return False
+
+    def listdir(dir_: str) -> tuple[list[str], list[str]] | None:
+        """Return the subdirs and the files matching <regex> in <dir_>."""
+        try:
+            cached = None if cache is None else cache.get(dir_, os.stat(dir_))
+            if cached is not None:
+                return cached["subdirs"], cached["files"]
+            with os.scandir(dir_) as it:
+                entries = list(it)
+        except OSError:
+            return None
+        subdirs = [e.name for e in entries if entry_is(e, True)]
+        files = [e.name for e in entries if entry_is(e, False) and pattern.search(e.name) is not None]
+        if cache is not None:
+            cache.put(dir_, subdirs=subdirs, files=files)
+        return subdirs, files
+
+    def walk(dir_: str, depth: int) -> Iterator[tuple[str, list[str]]]:
+        #### an excluded dir's path is a substring of all of its subdirs so they are pruned too
+        if any(e in dir_ for e in excludes):
+            return
+        listing = listdir(dir_)
+        if listing is None:
+            return
+        subdirs, files = listing
+        if depth >= mindepth - 1:
+            yield dir_, files
+        if depth < maxdepth - 1:
+            for subdir in subdirs:
+                yield from walk(os.path.join(dir_, subdir), depth + 1)
+
+    yield from walk(dir_in, 0)
+
+
+def _extract_multifile_details(dir_files: tuple[str, list[str]], min_in: int, max_in: int) -> list[dict]:
+    """Process pool worker for scan_dirs; parts are returned as strs since the parts generators cannot be pickled."""
+    dir_in, files = dir_files
+    return [
+        {"dir": dir_in, **mf_detail, "parts": mf_detail["parts"].materialize()}
+        for mf_detail in Multifile.extract_mfs(files, min_in, max_in)
     ]
-    #### remove all excludes from dirs_walk
-    return [d for d in dirs_walk if all(False for e in excludes if e in d)]
 
 
-def listdir_files(dir_in: str = ".", regex: str = ".*") -> list[str]:
-    """Get files from dir_in that match the regex pattern reg."""
-    files = [f for f in os.listdir(dir_in) if os.path.isfile(os.path.join(dir_in, f))]
-    return [f for f in files if re.search(regex, f, re.IGNORECASE) is not None]
+def scan_dirs(
+    dirs_files: Iterable[tuple[str, list[str]]],
+    min_in: int = 0,
+    max_in: int = 1,
+    jobs: int = 1,
+    cache: ScanCache | None = None,
+) -> list[tuple[Multifile, ...]]:
+    """Return the Multifile objects of each (dir, files) in <dirs_files>, in order, using <jobs> processes.
+
+    Dirs with mfs in <cache> are not searched again and the mfs of the remaining dirs are stored in <cache>.
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    executor_context = (
+        concurrent.futures.ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else contextlib.nullcontext()
+    )
+    with executor_context as executor:
+        #### dirs are submitted while being walked; results are gathered in the order of <dirs_files>
+        pending: list[tuple[str, list[dict] | concurrent.futures.Future]] = []
+        for dir_files in dirs_files:
+            cached = None if cache is None else cache.get_mfs(dir_files[0])
+            if cached is not None:
+                pending.append((dir_files[0], cached))
+            elif executor is None:
+                pending.append((dir_files[0], _extract_multifile_details(dir_files, min_in, max_in)))
+            else:
+                pending.append((dir_files[0], executor.submit(_extract_multifile_details, dir_files, min_in, max_in)))
+        mfs_list = []
+        for dir_, details in pending:
+            if isinstance(details, concurrent.futures.Future):
+                details = details.result()
+            if cache is not None:
+                cache.put(dir_, mfs=details)
+            mfs_list.append(tuple(Multifile(mf_detail) for mf_detail in details))
+    return mfs_list
+
+
+PART_FUNCS_MAX_DIGITS = 9
+
+#### part family patterns for inverting gen_indexable_part_funcs; nums and nums_one share the unpadded pattern
+_PADDED_NUMS_REGEX = re.compile(r"[0-9]{1,%d}" % PART_FUNCS_MAX_DIGITS)
+_NUMS_REGEX = re.compile(r"0|[1-9][0-9]*")
+_PADDED_ALPHAS_REGEX = re.compile(r"[a-z]{1,%d}" % PART_FUNCS_MAX_DIGITS)
+_ALPHAS_REGEX = re.compile(r"a|[b-z][a-z]{0,%d}" % (PART_FUNCS_MAX_DIGITS - 1))
+
+
+@functools.lru_cache(maxsize=2**16)
+def part_owners(part: str) -> tuple[tuple[int, int], ...]:
+    """Return (parts list index, part index) for every gen_indexable_part_funcs() list generating <part>.
+
+    The part funcs are inverted using their family patterns rather than generating and comparing their parts.
+    """
+    digits = PART_FUNCS_MAX_DIGITS
+    nums_length = 10 ** (digits - 1)
+    width = len(part)
+    owners = []
+    if _PADDED_NUMS_REGEX.fullmatch(part):
+        value = int(part)
+        unpadded = _NUMS_REGEX.fullmatch(part) is not None
+        owners.append((digits - width, value))  # padded_nums
+        if unpadded and value < nums_length:
+            owners.append((digits, value))  # nums
+        if value > 0:
+            owners.append((2 * digits + 1 - width, value - 1))  # padded_nums_one
+            if unpadded and value - 1 < nums_length:
+                owners.append((2 * digits + 1, value - 1))  # nums_one
+    elif _PADDED_ALPHAS_REGEX.fullmatch(part):
+        value = functools.reduce(lambda acc, c: acc * 26 + ord(c) - ord("a"), part, 0)
+        owners.append((3 * digits + 2 - width, value))  # padded_alphas
+        if _ALPHAS_REGEX.fullmatch(part):
+            owners.append((3 * digits + 2, value))  # alphas
+    return tuple(owners)
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_first_part_start_regex(max_in: int) -> re.Pattern:
+    """Return a pattern matching the chars that a part with a part index of at most <max_in> can start with."""
+    nums = "".join(str(n) for n in range(1, 10) if n - 1 <= max_in)  # nums_one has the lowest index for a num
+    alphas = "".join(chr(ord("a") + n) for n in range(1, 26) if n <= max_in)
+    return re.compile(f"[0{nums}a{alphas}]")
+
+
+@functools.lru_cache(maxsize=2**16)
+def _part_owners_in_range(part: str, min_in: int, max_in: int) -> tuple[tuple[int, int], ...] | None:
+    """Return the part_owners() of <part> with part indices in [min_in, max_in], or None if no extension of <part>
+    can have any since appending digits or letters to a part never lowers its part indices."""
+    owners = part_owners(part)
+    if all(part_index > max_in for _, part_index in owners):
+        return None
+    return tuple(owner for owner in owners if min_in <= owner[1] <= max_in)
 
 
 def gen_indexable_part_funcs() -> Sequence[tuple[Callable, int]]:
     """Set the static variable _parts_lists."""
-    max_digits = 9
+    max_digits = PART_FUNCS_MAX_DIGITS
     max_length = 10 ** (max_digits - 1)  # arbitrarily set to max of 1 billion - 1
     length = max_length
     assert length <= max_length
@@ -347,8 +686,36 @@ def padded_alphas(index, lst=None):
     return part_funcs
 
 
+def make_part_inverse(parts_lst_index: int) -> Callable[[Any], int]:
+    """Return the inverse of the <parts_lst_index>'th gen_indexable_part_funcs() func, computed by part_owners()."""
+
+    def part_inverse(part):
+        for owner_index, part_index in part_owners(part) if isinstance(part, str) else ():
+            if owner_index == parts_lst_index:
+                return part_index
+        raise ValueError(f"'{part}' is not generated by part func {parts_lst_index}")
+
+    return part_inverse
+
+
+def make_part_batch(parts_lst_index: int) -> Callable[[range], list[str]] | None:
+    """Return a func generating the parts of the <parts_lst_index>'th gen_indexable_part_funcs() func for a range of
+    indices with a single format pass, or None for the alphas which are generated a part at a time."""
+    digits = PART_FUNCS_MAX_DIGITS
+    family, offset = divmod(parts_lst_index, digits + 1)
+    if family > 1:
+        return None
+    fmt = "{:d}" if offset == digits else "{:0%dd}" % (digits - offset)
+    if family == 0:
+        return lambda indices: list(map(fmt.format, indices))
+    return lambda indices: list(map(fmt.format, range(indices.start + 1, indices.stop + 1, indices.step)))
+
+
 def gen_wrapped_indexable_callable() -> Sequence[WrappedIndexableCallable]:
-    return tuple(WrappedIndexableCallable(func, length) for func, length in gen_indexable_part_funcs())
+    return tuple(
+        WrappedIndexableCallable(func, length, inverse=make_part_inverse(i), batch=make_part_batch(i))
+        for i, (func, length) in enumerate(gen_indexable_part_funcs())
+    )
 
 
 def part_func_selection_terminal(part_funcs) -> WrappedIndexableCallable | None:
@@ -419,6 +786,217 @@ def pre_or_post_part_selection_terminal(recommended: list[str], pre_or_post_str:
             print(f"ERROR: unrecognized confirmation '{confirmation}'.")
 
 
+class MvRules:
+    """Naming decisions for mf mvs loaded from a yaml or json rules file instead of prompting the user.
+
+    The top level of the file holds the defaults and a list of rules; each mf is decided by the first rule whose
+    'match' regex is found in the mf's first file path, else by the defaults. e.g.
+        part: 11  # naming increment style by its index as listed by part_func_selection_terminal
+        prepart: "-pt"
+        postpart: null  # null, the default for prepart and postpart, keeps the mf's own
+        action: continue  # continue mvs the mf; skip leaves it, the default so that only chosen mfs are mv'd
+        rules:
+          - match: "(?i)/anime/"
+            prepart: " - ep"
+          - match: "sample"
+            action: skip
+    Keys 'dir_out', 'range_mv' (e.g. "0-4") and 'inplace' are also accepted and default to their cmdargs. A 'part'
+    is only needed by decisions that continue, so it may be left out of the defaults if each such rule sets its own.
+    """
+
+    KEYS = ("part", "prepart", "postpart", "action", "dir_out", "range_mv", "inplace")
+    ACTIONS = ("continue", "skip")
+
+    def __init__(self, path: str, dir_out: str | None = None, range_mv: Sequence | None = None, inplace: bool = False):
+        with path_utils.open_unix_safely(path) as f:
+            data = json.load(f) if path.lower().endswith(".json") else yaml.safe_load(f)
+        raise_if_false(ValueError, isinstance(data, dict), f"ERROR: rules file '{path}' should hold a mapping")
+        self.path = path
+        self.parts_lists = gen_wrapped_indexable_callable()
+        defaults = {"part": None, "prepart": None, "postpart": None, "action": "skip"}
+        defaults.update(dir_out=dir_out, range_mv=range_mv, inplace=inplace)
+        self.defaults = self.__check(defaults, {k: v for k, v in data.items() if k != "rules"})
+        self.rules: list[tuple[re.Pattern, dict]] = []
+        for rule in data.get("rules") or []:
+            raise_if_false(ValueError, isinstance(rule, dict) and "match" in rule, f"ERROR: rule without match {rule}")
+            fields = {k: v for k, v in rule.items() if k != "match"}
+            self.rules.append((re.compile(rule["match"]), self.__check(self.defaults, fields)))
+
+    def match(self, mf: Multifile) -> dict:
+        """Return the decision for <mf>, with 'part' as its parts list and 'rule' as the index of the rule used."""
+        first_file = mf[0]
+        for i, (regex, decision) in enumerate(self.rules):
+            if regex.search(first_file):
+                return {**decision, "part": self.__parts_list(decision["part"]), "rule": i}
+        return {**self.defaults, "part": self.__parts_list(self.defaults["part"]), "rule": None}
+
+    def __parts_list(self, part: int | None) -> WrappedIndexableCallable | None:
+        return None if part is None else self.parts_lists[part - 1]
+
+    def __check(self, defaults: dict, fields: dict) -> dict:
+        """Return <defaults> updated with <fields> after validating both."""
+        unknown = set(fields) - set(self.KEYS)
+        raise_if_false(ValueError, not unknown, f"ERROR: unknown keys {sorted(unknown)} in rules file '{self.path}'")
+        out = {**defaults, **fields}
+        if isinstance(fields.get("range_mv"), str):
+            out["range_mv"] = parse_range_alpha(fields["range_mv"])
+        raise_if_false(ValueError, out["action"] in self.ACTIONS, f"ERROR: action should be one of {self.ACTIONS}")
+        raise_if_false(
+            ValueError,
+            (out["part"] is None and out["action"] == "skip")
+            or (isinstance(out["part"], int) and 1 <= out["part"] <= len(self.parts_lists)),
+            f"ERROR: rules file '{self.path}' needs a part between 1 and {len(self.parts_lists)}, given {out['part']}",
+        )
+        for k in ("prepart", "postpart"):
+            raise_if_false(ValueError, out[k] is None or isinstance(out[k], str), f"ERROR: {k} should be a string")
+        raise_if_false(NotADirectoryError, out["dir_out"] is None or os.path.isdir(out["dir_out"]))
+        return out
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_prefix_regex(prefix_style: str) -> re.Pattern:
+    return re.compile(r"^(.*?)" + prefix_style + r"$", re.IGNORECASE)
+
+
+class MultifileIndex:
+    """Hash indexed search for the mfs in a group of filenames.
+
+    Locates the same mfs as Multifile.extract_mfs_regex, but each filename is scanned only once for the first file
+    parts of every parts list, runs of contiguous files are measured with set lookups, and claiming a mf only updates
+    the candidates that shared one of its files instead of rescanning every remaining file. First file parts are
+    recognized with part_owners(), so <parts_lists> must be ordered like gen_wrapped_indexable_callable().
+    """
+
+    def __init__(
+        self,
+        file_strs: Sequence[str],
+        parts_lists: Sequence[WrappedIndexableCallable],
+        min_in: int = 0,
+        max_in: int = 1,
+    ) -> None:
+        assert min_in <= max_in, (min_in, max_in)
+        assert len(parts_lists) == 3 * PART_FUNCS_MAX_DIGITS + 3, len(parts_lists)
+        self._files = list(file_strs)
+        self._file_set = set(self._files)
+        self._parts_lists = parts_lists
+        self._min_in = min_in
+        self._max_in = max_in
+
+    def extract_mfs(self, prefix_style: str) -> list[dict]:
+        """Return mf details longest first, ties going to the mf that Multifile.extract_mfs_regex finds first."""
+        candidates = self._find_candidates()
+        #### map each file to the candidates whose runs include it along with its position in that run
+        file_to_candidates: dict[str, list[tuple[int, int]]] = {}
+        for candidate_index, candidate in enumerate(candidates):
+            for pos, f in enumerate(candidate["run"]):
+                file_to_candidates.setdefault(f, []).append((candidate_index, pos))
+        heap = [(-c["size"], c["key"], i) for i, c in enumerate(candidates)]
+        heapq.heapify(heap)
+        prefix_regex = _compile_prefix_regex(prefix_style)
+        mf_details = []
+        while heap:
+            neg_size, _key, candidate_index = heapq.heappop(heap)
+            candidate = candidates[candidate_index]
+            if -neg_size != candidate["size"]:
+                continue  # stale heap entry from before the candidate's run was truncated
+            size = candidate["size"]
+            m = prefix_regex.search(candidate["base"])
+            assert m is not None
+            mf_details.append(
+                {
+                    "base": m.group(1),
+                    "prepart": m.group(2) + m.group(3) + m.group(4),
+                    "parts": candidate["parts_lst"][candidate["part_index"] : candidate["part_index"] + size],
+                    "postpart": candidate["postpart"],
+                    "ext": candidate["ext"],
+                },
+            )
+            #### claim the mf's files and truncate every other run that contained one of them
+            candidate["size"] = 0
+            for f in candidate["run"][:size]:
+                self._file_set.discard(f)
+                for other_index, pos in file_to_candidates[f]:
+                    other = candidates[other_index]
+                    if pos < other["size"]:
+                        other["size"] = pos if pos > 1 else 0
+                        if other["size"] > 1:
+                            heapq.heappush(heap, (-other["size"], other["key"], other_index))
+        return mf_details
+
+    def _find_candidates(self) -> list[dict]:
+        """Return every first file candidate with a run of more than one contiguous file."""
+        candidates = []
+        for file_index, f in enumerate(self._files):
+            ext_start = f.rfind(".")
+            if ext_start < 0:
+                continue
+            ext = f[ext_start:]
+            for part, pos, occurrence, owners in self._find_first_parts(f, ext_start):
+                base = f[:pos]
+                postpart = f[pos + len(part) : ext_start]
+                for parts_lst_index, part_index in owners:
+                    parts_lst = self._parts_lists[parts_lst_index]
+                    run = self._measure_run(parts_lst, part_index, base, postpart, ext)
+                    if len(run) > 1:
+                        candidates.append(
+                            {
+                                "key": (parts_lst_index, part_index, file_index, occurrence),
+                                "parts_lst": parts_lst,
+                                "part_index": part_index,
+                                "base": base,
+                                "postpart": postpart,
+                                "ext": ext,
+                                "run": run,
+                                "size": len(run),
+                            },
+                        )
+        return candidates
+
+    def _find_first_parts(self, f: str, ext_start: int) -> Iterator[tuple[str, int, int, tuple[tuple[int, int], ...]]]:
+        """Yield (part, pos, occurrence, owners) for each first file part in <f> preceding <ext_start>.
+
+        Only positions holding a char that an in range part can start with are searched, and each is extended one char
+        at a time until no longer part can be in range. Like str.find, the occurrences of a part never overlap.
+        """
+        ends: dict[str, int] = {}
+        occurrences: dict[str, int] = {}
+        for m in _compile_first_part_start_regex(self._max_in).finditer(f, 0, ext_start):
+            pos = m.start()
+            for end in range(pos + 1, min(ext_start, pos + PART_FUNCS_MAX_DIGITS) + 1):
+                part = f[pos:end]
+                owners = _part_owners_in_range(part, self._min_in, self._max_in)
+                if owners is None:
+                    break
+                if not owners or pos < ends.get(part, 0):
+                    continue
+                ends[part] = end
+                occurrence = occurrences.get(part, 0)
+                occurrences[part] = occurrence + 1
+                yield part, pos, occurrence, owners
+
+    def _measure_run(
+        self,
+        parts_lst: WrappedIndexableCallable,
+        part_index: int,
+        base: str,
+        postpart: str,
+        ext: str,
+    ) -> list[str]:
+        """Return the contiguous files starting at <part_index> of <parts_lst>."""
+        run: list[str] = []
+        start = part_index
+        chunk = 2  # most runs end at their second file, so parts are materialized in doubling chunks
+        while start < len(parts_lst):
+            for part in parts_lst.materialize(slice(start, start + chunk)):
+                file_out = base + part + postpart + ext
+                if file_out not in self._file_set:
+                    return run
+                run.append(file_out)
+            start += chunk
+            chunk *= 2
+        return run
+
+
 class Multifile:
     """Allows operation on a contiguous group of similarly named files."""
 
@@ -441,8 +1019,13 @@ def mv(  # pylint: disable=[too-many-branches,too-many-locals,too-many-statement
         dir_out: str | None = None,
         range_mv: Sequence[int] | None = None,
         inplace: bool = False,
+        journal: str | None = None,
+        progress: bool = False,
     ) -> Multifile | None:
-        """Move this object's files using the pattern specified by parts."""
+        """Move this object's files using the pattern specified by parts, journaling the mvs to <journal> if given.
+
+        With <progress> a progress line of the mvs is printed, see path_utils.MvProgress.
+        """
         #### asserts
         assert self.ismultifile(), self.to_list()
         #### set output multifile dict
@@ -463,14 +1046,8 @@ def mv(  # pylint: disable=[too-many-branches,too-many-locals,too-many-statement
         print("INFO: printing potential mv cmds to be executed...")
         while True:
             #### check if mv operations are valid, if not then abort
-            if range_mv is None:
-                reduced_list = self.to_list()
-            else:
-                reduced_list = [
-                    self.__get_nth_file(i)
-                    for i, p in enumerate(self["parts"])
-                    if p.lower() in [str(r) for r in range_mv]
-                ]  # TODO: self.to_list()[i] wont work
+            reduced_list = self.__range_files(range_mv)
+            if range_mv is not None:
                 assert len(reduced_list) == len(
                     range_mv,
                 ), f"ERROR: portion of range unaccounted for '{len(reduced_list)}' != '{len(range_mv)}'"  # TODO:
@@ -505,60 +1082,16 @@ def mv(  # pylint: disable=[too-many-branches,too-many-locals,too-many-statement
             if choice in ("c", "continue"):
                 if length != new_length:
                     continue
-                if not all(old not in new_list for old in reduced_list):
-                    if all(old == new for old, new in zip(reduced_list, new_list)):
-                        print("ERROR: src and target are the same")
-                        continue
-                    # TODO: hack to reverse lists to avoid mf overwriting itself during mv
-                    old_char = self["parts"][0][-1]
-                    new_char = out_mf["parts"][0][-1]
-                    if old_char.isdigit():
-                        if int(old_char) < int(new_char):
-                            reduced_list.reverse()
-                            new_list.reverse()
-                    else:
-                        if old_char < new_char:
-                            reduced_list.reverse()
-                            new_list.reverse()
-                assert self.ismultifile()
-                #### simulate mv and perform preliminary checks to avoid unwanted partial mvs
-                sim_failed = False
-                out_exists = [f for f in new_list if os.path.isfile(f)]
-                for old, new in zip(reduced_list, new_list):
-                    if old == new:
-                        continue
-                        # print(f"ERROR: mv sim error: old==new: mv '{old}' '{new}'")
-                        # sim_failed = True; break
-                    if not os.path.isfile(old):
-                        print(f"ERROR: mv sim error: os.path.isfile(old) == False: mv '{old}' '{new}'")
-                        sim_failed = True
-                        break
-                    if new in out_exists:
-                        print(f"ERROR: mv sim error: os.path.isfile(new) is True: mv '{old}' '{new}'")
-                        sim_failed = True
-                        break
-                    try_or(ValueError, out_exists.remove, old)
-                    out_exists.append(new)
-                if sim_failed:
+                if all(old == new for old, new in zip(reduced_list, new_list)):
+                    print("ERROR: src and target are the same")
                     continue
-                if not all(ol in out_exists for ol in new_list):
-                    print(
-                        f"ERROR: mv sim error: new_list != out_list\nERROR: new_list: {new_list}\nERROR: out_exists: {out_exists}",
-                    )
+                assert self.ismultifile()
+                #### mv the files as one locked and journaled batch; nothing is mv'd if the plan fails its checks
+                try:
+                    path_utils.RenamePlan(reduced_list, new_list, journal).execute(progress_line(progress))
+                except (FileExistsError, FileNotFoundError, NotADirectoryError, ValueError) as e:
+                    print(f"ERROR: mv plan error: {e}")
                     continue
-                #### mv the files, they are assumed
-                for old, new in zip(reduced_list, new_list):
-                    if old != new:
-                        #### asserts to prepare for mv
-                        assert not os.path.isfile(new), f"ERROR: mv '{old}' '{new}'"
-                        #### basic mv operation on single file
-                        path_utils.mv(old, new)
-                        #### asserts to prepare for mv
-                        assert not os.path.isfile(old), f"ERROR: mv '{old}' '{new}'"
-                    else:
-                        #### basic mv operation on single file
-                        path_utils.mv(old, new)
-                    assert os.path.isfile(new), f"ERROR: mv '{old}' '{new}'"
                 # self = out_mf # TODO: this has no effect, was this actually necessary?
                 return out_mf
             assert choice not in ("c", "continue")
@@ -600,6 +1133,59 @@ def mv(  # pylint: disable=[too-many-branches,too-many-locals,too-many-statement
             print("#######################################################")
         return None
 
+    def mv_by_rule(
+        self,
+        decision: dict,
+        journal: str | None = None,
+        log: Callable[[dict], None] | None = None,
+        progress: bool = False,
+    ) -> Multifile | None:
+        """Move this object's files as given by <decision> from MvRules.match without prompting.
+
+        The planned mvs and then their result are passed to <log> as dicts, the result's 'status' being one of
+        'mvd', 'skipped' or 'error'. With <progress> a progress line of the mvs is printed.
+        """
+        log = log if log is not None else lambda record: None
+        out_dict = dict(self.file_dict.items())
+        out_dict["dir"] = decision["dir_out"] if decision["dir_out"] is not None else self["dir"]
+        for k in ("prepart", "postpart"):
+            if decision[k] is not None:
+                out_dict[k] = decision[k]
+        reduced_list = self.__range_files(decision["range_mv"])
+        record = {"first_file": self[0], "rule": decision["rule"], "action": decision["action"]}
+        if decision["part"] is None:
+            #### only skip decisions may leave out the part, so there are no mvs to plan
+            log({"event": "plan", **record, "mvs": []})
+            log({"event": "result", **record, "status": "skipped"})
+            return None
+        out_dict["parts"] = decision["part"][: len(reduced_list)]
+        out_mf = Multifile(out_dict)
+        new_list = out_mf.to_list(inplace=decision["inplace"])
+        log({"event": "plan", **record, "mvs": list(zip(reduced_list, new_list))})
+        error = None
+        if decision["action"] == "skip":
+            log({"event": "result", **record, "status": "skipped"})
+            return None
+        if len(reduced_list) != len(new_list) or (
+            decision["range_mv"] and len(reduced_list) != len(decision["range_mv"])
+        ):
+            error = f"multifile length mismatch for lhs ({len(reduced_list)}) and rhs ({len(new_list)})"
+        elif reduced_list == new_list:
+            error = "src and target are the same"
+        elif not self.ismultifile():
+            error = "files of the multifile no longer exist"
+        else:
+            try:
+                path_utils.RenamePlan(reduced_list, new_list, journal).execute(progress_line(progress))
+            except (FileExistsError, FileNotFoundError, NotADirectoryError, ValueError) as e:
+                error = f"mv plan error: {e}"
+        if error is not None:
+            print(f"ERROR: {self[0]}: {error}")
+            log({"event": "result", **record, "status": "error", "error": error})
+            return None
+        log({"event": "result", **record, "status": "mvd"})
+        return out_mf
+
     ## methods that examine the state of the multifile or its referenced contents
     def ismultifile(self) -> bool:
         """Ensure this object has at least two valid and contiguous files."""
@@ -625,16 +1211,30 @@ def __get_nth_file(self, n: int, exc_dir: bool = False, inplace: bool = True) ->
             out[0] = os.path.join(self["dir"], out[0])
         return "".join([str(x) for x in out if x is not None])
 
+    def __range_files(self, range_mv: Sequence | None) -> list[str]:
+        """Get this multifile's files whose parts are in <range_mv>, or all of its files if None."""
+        if range_mv is None:
+            return self.to_list()
+        range_strs = [str(r) for r in range_mv]
+        return [self.__get_nth_file(i) for i, p in enumerate(self["parts"]) if p.lower() in range_strs]
+
     def __isalpha(self) -> bool:
         return self["parts"][0][-1].isalpha()  # type: ignore[no-any-return]
 
     @classmethod
-    def extract_mfs(
+    def extract_mfs(cls, file_strs: Sequence[str], min_in: int = 0, max_in: int = 1) -> list[dict]:
+        """Return details of the mfs in <file_strs>, longest first, using a MultifileIndex."""
+        assert min_in <= max_in, (min_in, max_in)
+        return MultifileIndex(file_strs, cls.__get_parts_lists(), min_in, max_in).extract_mfs(cls.__prefix_style)
+
+    @classmethod
+    def extract_mfs_regex(
         cls,
         file_strs: Sequence[str],
         min_in: int = 0,
         max_in: int = 1,
     ):  # pylint: disable=[too-many-branches,too-many-locals]
+        """Reference implementation of extract_mfs that rescans <file_strs> with regexes for every mf found."""
         assert min_in <= max_in, (min_in, max_in)
         file_strs_use = list(file_strs)
         #### max string length for regex iterating
@@ -694,7 +1294,7 @@ def extract_mfs(
             for p in out["parts"]:
                 f_out = f"{out['base']}{out['prepart']}{p}{out['postpart']}{out['ext']}"
                 file_strs_use.remove(f_out)
-            return [out] + cls.extract_mfs(file_strs=file_strs_use, min_in=min_in, max_in=max_in)
+            return [out] + cls.extract_mfs_regex(file_strs=file_strs_use, min_in=min_in, max_in=max_in)
         return []
 
     #### class methods
@@ -709,7 +1309,6 @@ def extract_multifiles(
         """Returns a list of Multifile objects in dir_in."""
         #### check and set inputs
         assert os.path.isdir(dir_in), dir_in
-        assert all(os.path.isfile(os.path.join(dir_in, f)) for f in files), (dir_in, files)
         assert min_in <= max_in, (min_in, max_in)
         #### initializes outputs
         return tuple(cls({"dir": dir_in, **mf_detail}) for mf_detail in cls.extract_mfs(files, min_in, max_in))
@@ -729,31 +1328,86 @@ def __get_parts_lists(cls) -> Sequence[WrappedIndexableCallable]:
 def main(argparse_args: Sequence[str] | None = None) -> None:
     #### parses script input to populate args dict
     args = parse_inputs(argparse_args)
-    #### recursively find all dirs in dir_in between levels mindepth and maxdepth with excludes removed
-    dirs_walk = listdir_dirs(args["dir_in"], args["mindepth"], args["maxdepth"], args["excludes"])
+    #### finish or undo an interrupted mf mv
+    if args["resume_mv"] or args["rollback_mv"]:
+        plan = path_utils.RenamePlan.from_journal(args["mv_journal"])
+        print(f"INFO: {plan.done} of {len(plan.steps)} mvs journaled at '{args['mv_journal']}' were completed")
+        if args["resume_mv"]:
+            plan.execute(progress_line(args["progress"]))
+        else:
+            plan.rollback()
+        print("INFO: SUCCESS")
+        return
     #### print useful info
     print(f"INFO: root dir to search for multifiles: '{args['dir_in']}'")
-    if len(dirs_walk) > 1:
-        print(
-            f"INFO: searching recursively {args['mindepth']}-{args['maxdepth']} dirs deep... found {len(dirs_walk)} dirs",
-        )
     print(f"INFO: regex file filter: '{args['regex']}'")
-    #### search for multifiles in dirs_walk
-    # print(f"dirs_walk={dirs_walk}")
-    mfs_list = [
-        Multifile.extract_multifiles(
-            d,
-            listdir_files(d, args["regex"]),
-            min_in=args["range_search"][0],
-            max_in=args["range_search"][-1],
+    #### lazily walk dirs in dir_in between levels mindepth and maxdepth with excludes removed and search for multifiles
+    cache = (
+        None
+        if args["no_cache"]
+        else ScanCache(
+            args["cache_file"],
+            args["regex"],
+            args["range_search"][0],
+            args["range_search"][-1],
+            rebuild=args["rebuild_cache"],
+        )
+    )
+    #### the case sensitivity of the searched filesystem is kept across runs for the mvs along with the search cache
+    if cache is not None:
+        path_utils.is_filesystem_case_sensitive(args["dir_in"], persist=True)
+    dirs_walk = walk_dirs_files(
+        args["dir_in"],
+        args["mindepth"],
+        args["maxdepth"],
+        args["excludes"],
+        regex=args["regex"],
+        cache=cache,
+    )
+    mfs_list = scan_dirs(
+        dirs_walk,
+        min_in=args["range_search"][0],
+        max_in=args["range_search"][-1],
+        jobs=args["jobs"],
+        cache=cache,
+    )
+    if cache is not None:
+        cache.save()
+    if len(mfs_list) > 1:
+        print(
+            f"INFO: searched recursively {args['mindepth']}-{args['maxdepth']} dirs deep... found {len(mfs_list)} dirs",
         )
-        for d in dirs_walk
-    ]
     print(f"INFO: found {sum(len(mfs) for mfs in mfs_list)} multifile candidates")
-    #### mv each multifile
-    for mfs in mfs_list:
-        for mf in mfs:
-            mf.mv(args["prepart"], args["parts_out"], args["dir_out"], args["range_mv"], args["inplace"])
+    if cache is not None:
+        print(f"INFO: search cache '{cache.path}': {cache.hits} hits, {cache.misses} misses")
+    #### mv each multifile, deciding by the rules file if given else by prompting the user
+    if args["rules"] is not None:
+        statuses: dict[str, int] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(args["plan_log"])), exist_ok=True)
+        with path_utils.open_unix_safely(args["plan_log"], "a") as log_file:
+
+            def log(record: dict) -> None:
+                log_file.write(json.dumps({"time": time.time(), **record}) + "\n")
+                log_file.flush()
+                if record["event"] == "result":
+                    statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+
+            for mfs in mfs_list:
+                for mf in mfs:
+                    mf.mv_by_rule(args["rules"].match(mf), args["mv_journal"], log, args["progress"])
+        print(f"INFO: mf mv results {statuses} logged to '{args['plan_log']}'")
+    else:
+        for mfs in mfs_list:
+            for mf in mfs:
+                mf.mv(
+                    args["prepart"],
+                    args["parts_out"],
+                    args["dir_out"],
+                    args["range_mv"],
+                    args["inplace"],
+                    args["mv_journal"],
+                    args["progress"],
+                )
     print("INFO: SUCCESS")
 
 
@@ -2,6 +2,7 @@
 
 import parameterized  # type: ignore[import-untyped] # python3 -m pip install parameterized
 from tools import mfmv
+from tools.mfmv import bench_extract_mfs
 
 # fmt: off
 PARAMS = (
@@ -54,6 +55,18 @@ def test_no_1(self, files_in, expected_mf_details):
                 else:
                     self.assertEqual(v, mf_detail[k], type(mf_detail[k]))
 
+    @parameterized.parameterized.expand(
+        [(p[0],) for p in PARAMS] + [(bench_extract_mfs.gen_file_strs(100, seed),) for seed in range(3)],
+    )
+    def test_matches_extract_mfs_regex(self, files_in):
+        as_tuples = lambda mfs: [
+            (mf["base"], mf["prepart"], list(mf["parts"]), mf["postpart"], mf["ext"]) for mf in mfs
+        ]
+        for min_in, max_in in ((0, 1), (1, 3)):
+            expected = as_tuples(mfmv.Multifile.extract_mfs_regex(files_in, min_in, max_in))
+            actual = as_tuples(mfmv.Multifile.extract_mfs(files_in, min_in, max_in))
+            self.assertEqual(expected, actual)
+
 
 if __name__ == "__main__":
     unittest.main()
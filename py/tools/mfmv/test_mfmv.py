@@ -16,7 +16,12 @@
 #   * input prompts related to dir such as 'd ..'
 import contextlib
 import copy
+import itertools
+import json
 import os
+import re
+import shutil
+import tempfile
 import unittest.mock
 from collections.abc import Sequence
 
@@ -133,6 +138,7 @@ def setUp(self):
             "exts_env": None,
             "range_search": [0, 1],
             "range_mv": None,
+            "no_cache": True,
         }
         self.args_dict = dict(default_parser_args)
         self.base = "base"
@@ -172,11 +178,9 @@ def custom_input(prompt=""):
 
         return custom_input
 
-    def listdir_side_effect(self, *args, **_kwargs):
-        return self.files_in if args[0] == self.args_dict["dir_in"] else []
-
-    def listdir_dirs_side_effect(self, *_args, **_kwargs):
-        return [self.args_dict["dir_in"]]
+    def walk_dirs_files_side_effect(self, *_args, **kwargs):
+        files = [f for f in self.files_in if re.search(kwargs["regex"], f, re.IGNORECASE)]
+        return iter([(self.args_dict["dir_in"], files)])
 
     def isfile_side_effect(self, *args, **_kwargs):
         for lhs, rhs in self.mvd:
@@ -199,8 +203,9 @@ def isdir_side_effect(self, *args, **_kwargs):
             return True
         return False
 
-    def multifile_mv_side_effect(self, *args, **_kwargs):
-        self.mvd.append((args[0], args[1]))
+    def rename_plan_side_effect(self, srcs, dsts, *_args, **_kwargs):
+        self.mvd.extend(zip(srcs, dsts))
+        return unittest.mock.DEFAULT
 
     def part_func_selection_terminal_side_effect(self, *_args, **_kwargs):
         mfmv.gen_wrapped_indexable_callable()
@@ -220,26 +225,26 @@ def run_test(self, args, files_in, files_out, prepart, part_out):  # pylint: dis
         with contextlib.ExitStack() as stack:
             for mgr in (
                 unittest.mock.patch("builtins.input", input_side_effect),
-                unittest.mock.patch("os.listdir", side_effect=self.listdir_side_effect),
                 unittest.mock.patch("os.path.isfile", side_effect=self.isfile_side_effect),
                 unittest.mock.patch("os.path.isdir", side_effect=self.isdir_side_effect),
-                unittest.mock.patch("tools.mfmv.mfmv.listdir_dirs", side_effect=self.listdir_dirs_side_effect),
+                unittest.mock.patch("tools.mfmv.mfmv.walk_dirs_files", side_effect=self.walk_dirs_files_side_effect),
                 unittest.mock.patch("tools.mfmv.mfmv.prepart_selection_terminal", return_value=""),
                 unittest.mock.patch("tools.mfmv.mfmv.postpart_selection_terminal", return_value=""),
                 # unittest.mock.patch("tools.mfmv.mfmv.part_func_selection_terminal", return_value=part_out),
                 # unittest.mock.patch('builtins.print'): # silence output and speed up test
             ):
                 stack.enter_context(mgr)
-            mv = stack.enter_context(
-                unittest.mock.patch("tools.mfmv.mfmv.path_utils.mv", side_effect=self.multifile_mv_side_effect),
+            rename_plan = stack.enter_context(
+                unittest.mock.patch("tools.mfmv.mfmv.path_utils.RenamePlan", side_effect=self.rename_plan_side_effect),
             )
 
             argparse_args = make_argparse_args(self.args_dict)
             mfmv.main(argparse_args)
-            assert len(mv.call_args_list) == len(
-                mv_pairs,
-            ), f"{len(mv.call_args_list)} != {len(mv_pairs)};\nmv.call_args_list={mv.call_args_list}\nmv_pairs{mv_pairs}"
-            for mv_args, _mv_kwargs in mv.call_args_list:
+            assert rename_plan.return_value.execute.call_count == rename_plan.call_count == 1
+            assert len(self.mvd) == len(
+                mv_pairs
+            ), f"{len(self.mvd)} != {len(mv_pairs)};\nmvd={self.mvd}\nmv_pairs{mv_pairs}"
+            for mv_args in self.mvd:
                 assert mv_args in mv_pairs, f"{mv_args} not in {mv_pairs}"
 
     @parameterized.parameterized.expand(PARAMS)
@@ -299,6 +304,37 @@ def test_gen_indexable_part_funcs(self, _print):
             with self.assertRaises(IndexError):
                 _ = wf[length]
 
+    def test_part_owners(self):
+        dic = self.gen_indexable_part_funcs_fixture()
+        for parts_lst_index, wf in enumerate(dic["wrapped_funcs"]):
+            for part_index in itertools.chain(range(min(len(wf), 1000)), [len(wf) - 1]):
+                part = wf[part_index]
+                owners = mfmv.part_owners(part)
+                assert (parts_lst_index, part_index) in owners, (part, owners)
+                assert all(dic["wrapped_funcs"][i][j] == part for i, j in owners), (part, owners)
+        for part in ("", "A", "1a", "a1", "0" * 10, "b" * 10, "-"):
+            assert mfmv.part_owners(part) == (), part
+
+    def test_part_index_of(self):
+        slices = [slice(None), slice(3, 90, 7), slice(None, 40, -3), slice(-5, None)]
+        for wf in mfmv.gen_wrapped_indexable_callable():
+            for sliced in (wf[s][:100] for s in slices):
+                parts = list(sliced)
+                for i, part in enumerate(parts):
+                    assert sliced.index_of(part) == i, (part, i)
+                for part in ("", "-", "00000000000", wf[len(wf) - 1], wf[min(200, len(wf) - 1)], 0):
+                    assert (part in sliced) is (part in parts), part
+
+    def test_part_materialize(self):
+        slices = [slice(None), slice(3, 90, 7), slice(None, 40, -3), slice(-5, None), slice(50, 0)]
+        for wf, (func, length) in zip(mfmv.gen_wrapped_indexable_callable(), mfmv.gen_indexable_part_funcs()):
+            wf_no_batch = WrappedIndexableCallable(func, length)[:200]
+            for s in slices:
+                expected = [func(i) for i in range(min(length, 200))][s]
+                assert wf[:200].materialize(s) == expected, s
+                assert wf_no_batch.materialize(s) == expected, s
+            assert wf.take(12) == wf_no_batch.take(12) == [func(i) for i in range(min(length, 12))]
+
     @unittest.mock.patch("builtins.print")
     def test_part_func_selection_terminal(self, _print):
         dic = self.gen_indexable_part_funcs_fixture()
@@ -361,5 +397,196 @@ def test_postpart_selection_terminal(self, _print):
                 )
 
 
+class ScanDirsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.dirs = []
+        for i in range(6):
+            d = os.path.join(self.tmp_dir.name, f"dir{i}")
+            os.mkdir(d)
+            for f in [f"show{i}-ep{p}.mp4" for p in range(1, i + 2)] + ["alone.mp4", "notes.txt"]:
+                open(os.path.join(d, f), "w", encoding="utf-8").close()  # pylint: disable=consider-using-with
+            self.dirs.append(d)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_walk_dirs_files(self):
+        os.makedirs(os.path.join(self.dirs[0], "sub", "subsub"))
+        sub_file = os.path.join(self.dirs[0], "sub", "sub.MP4")
+        open(sub_file, "w", encoding="utf-8").close()  # pylint: disable=consider-using-with
+        walked = dict(mfmv.walk_dirs_files(self.tmp_dir.name, 2, 3, ["dir5"], r"^.*\.mp4$"))
+        self.assertEqual(sorted(walked), sorted(self.dirs[:-1] + [os.path.join(self.dirs[0], "sub")]))
+        self.assertEqual(sorted(walked[self.dirs[0]]), ["alone.mp4", "show0-ep1.mp4"])
+        self.assertEqual(walked[os.path.join(self.dirs[0], "sub")], ["sub.MP4"])
+
+    def test_scan_dirs_jobs_matches_serial(self):
+        expected = mfmv.scan_dirs(mfmv.walk_dirs_files(self.tmp_dir.name, 2, 2, regex=r"^.*\.mp4$"), jobs=1)
+        actual = mfmv.scan_dirs(mfmv.walk_dirs_files(self.tmp_dir.name, 2, 2, regex=r"^.*\.mp4$"), jobs=2)
+        self.assertEqual(sum(len(mfs) for mfs in expected), 5)
+        as_lists = lambda mfs_list: [[mf.to_list() for mf in mfs] for mfs in mfs_list]
+        self.assertEqual(as_lists(expected), as_lists(actual))
+
+    def scan_with_cache(self, cache_file, rebuild=False):
+        cache = mfmv.ScanCache(cache_file, r"^.*\.mp4$", 0, 1, rebuild=rebuild)
+        walk = mfmv.walk_dirs_files(self.tmp_dir.name, 2, 2, regex=r"^.*\.mp4$", cache=cache)
+        mfs_list = mfmv.scan_dirs(walk, cache=cache)
+        cache.save()
+        return cache, sorted(mf.to_list() for mfs in mfs_list for mf in mfs)
+
+    def test_scan_cache(self):
+        for d in [self.tmp_dir.name] + self.dirs:
+            os.utime(d, ns=(0, 0))  # avoid the racy window of dirs modified right before being listed
+        cache_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cache_dir.cleanup)
+        cache_file = os.path.join(cache_dir.name, "mfmv", "scan_cache.jsonl")
+        cache, expected = self.scan_with_cache(cache_file)
+        self.assertEqual((cache.hits, cache.misses), (0, 7))
+        cache, actual = self.scan_with_cache(cache_file)
+        self.assertEqual((cache.hits, cache.misses), (7, 0))
+        self.assertEqual(expected, actual)
+        #### a new file changes the dir's mtime so only that dir is searched again
+        open(
+            os.path.join(self.dirs[0], "show0-ep2.mp4"), "w", encoding="utf-8"
+        ).close()  # pylint: disable=consider-using-with
+        cache, actual = self.scan_with_cache(cache_file)
+        self.assertEqual((cache.hits, cache.misses), (6, 1))
+        self.assertEqual(len(actual), len(expected) + 1)
+        cache, _actual = self.scan_with_cache(cache_file, rebuild=True)
+        self.assertEqual((cache.hits, cache.misses), (0, 7))
+
+    def test_scan_cache_pruned(self):
+        os.mkdir(os.path.join(self.dirs[0], "sub"))
+        for d in [self.tmp_dir.name] + self.dirs:
+            os.utime(d, ns=(0, 0))  # avoid the racy window of dirs modified right before being listed
+        cache_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cache_dir.cleanup)
+        cache_file = os.path.join(cache_dir.name, "mfmv", "scan_cache.jsonl")
+        other = mfmv.ScanCache(cache_file, r"^.*\.mkv$", 0, 1)
+        for d in [os.path.join(self.dirs[0], "sub"), self.dirs[1], cache_dir.name]:
+            other.get(d, os.stat(d))
+        other.save()
+        self.scan_with_cache(cache_file)
+        shutil.rmtree(self.dirs[0])
+        cache, _actual = self.scan_with_cache(cache_file)
+        self.assertEqual((cache.hits, cache.misses), (5, 1))
+        with open(cache_file, encoding="utf-8") as f:
+            dirs = [json.loads(line)["dir"] for line in f]
+        #### the removed dir and its subdir are dropped from the entries of both keys, others are kept
+        self.assertEqual(len(dirs), 8)
+        self.assertNotIn(self.dirs[0], dirs)
+        self.assertNotIn(os.path.join(self.dirs[0], "sub"), dirs)
+        self.assertIn(self.dirs[1], dirs)
+        self.assertIn(cache_dir.name, dirs)
+        #### past MAX_ENTRIES, the entries listed longest ago are dropped first
+        with unittest.mock.patch.object(mfmv.ScanCache, "MAX_ENTRIES", 3):
+            cache, _actual = self.scan_with_cache(cache_file)
+        with open(cache_file, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 6)
+
+    def test_scan_cache_corrupt(self):
+        for d in [self.tmp_dir.name] + self.dirs:
+            os.utime(d, ns=(0, 0))  # avoid the racy window of dirs modified right before being listed
+        cache_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cache_dir.cleanup)
+        cache_file = os.path.join(cache_dir.name, "mfmv", "scan_cache.jsonl")
+        _cache, expected = self.scan_with_cache(cache_file)
+        #### lines cut short or otherwise corrupt are skipped
+        with open(cache_file, "a", encoding="utf-8") as f:
+            f.write('[]\n{"key": 1}\n{"key": ["^.*\\.mp4$", 0, 1], "dir": "/')
+        cache, actual = self.scan_with_cache(cache_file)
+        self.assertEqual((cache.hits, cache.misses), (7, 0))
+        self.assertEqual(expected, actual)
+        with open(cache_file, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 7)
+        #### an unreadable cache is ignored and rewritten
+        with open(cache_file, "a", encoding="utf-8") as f:
+            f.write("\r\n")
+        with unittest.mock.patch("builtins.print") as print_:
+            cache, actual = self.scan_with_cache(cache_file)
+        self.assertIn("WARNING", print_.call_args[0][0])
+        self.assertEqual((cache.hits, cache.misses), (0, 7))
+        self.assertEqual(expected, actual)
+
+
+class MvRulesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.dir = os.path.join(self.tmp_dir.name, "lib")
+        os.mkdir(self.dir)
+        for f in [f"show-ep{p}.mp4" for p in range(1, 4)] + [f"sample_{p}.mp4" for p in range(1, 3)] + ["other.mp4"]:
+            open(os.path.join(self.dir, f), "w", encoding="utf-8").close()  # pylint: disable=consider-using-with
+        self.plan_log = os.path.join(self.tmp_dir.name, "plan_log.jsonl")
+
+    def run_rules(self, rules_file, rules):
+        rules_file = os.path.join(self.tmp_dir.name, rules_file)
+        with open(rules_file, "w", encoding="utf-8") as f:
+            f.write(rules)
+        args = ["--dir-in", self.dir, "--rules", rules_file, "--plan-log", self.plan_log, "--no-cache"]
+        args += ["--mv-journal", os.path.join(self.tmp_dir.name, "mv_journal.jsonl")]
+        with unittest.mock.patch("builtins.input", side_effect=AssertionError("rules mode should not prompt")):
+            mfmv.main(args)
+        with open(self.plan_log, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    @unittest.mock.patch("builtins.print")
+    def test_rules_yaml(self, _print):
+        records = self.run_rules(
+            "rules.yaml", 'part: 20\nprepart: "-pt"\naction: continue\nrules:\n  - match: sample\n    action: skip\n'
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.dir)),
+            ["other.mp4", "sample_1.mp4", "sample_2.mp4", "show-pt1.mp4", "show-pt2.mp4", "show-pt3.mp4"],
+        )
+        results = {os.path.basename(r["first_file"]): r for r in records if r["event"] == "result"}
+        self.assertEqual(results["show-ep1.mp4"]["status"], "mvd")
+        self.assertEqual((results["sample_1.mp4"]["status"], results["sample_1.mp4"]["rule"]), ("skipped", 0))
+        self.assertEqual(len(records), 4)
+
+    @unittest.mock.patch("builtins.print")
+    def test_rules_json(self, _print):
+        records = self.run_rules(
+            "rules.json", json.dumps({"part": 1, "rules": [{"match": "show", "action": "continue"}]})
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.dir)),
+            [
+                "other.mp4",
+                "sample_1.mp4",
+                "sample_2.mp4",
+                "show-ep000000000.mp4",
+                "show-ep000000001.mp4",
+                "show-ep000000002.mp4",
+            ],
+        )
+        self.assertEqual(sorted(r["status"] for r in records if r["event"] == "result"), ["mvd", "skipped"])
+
+    @unittest.mock.patch("builtins.print")
+    def test_rules_without_default_part(self, _print):
+        records = self.run_rules(
+            "rules.yaml", "rules:\n  - match: show\n    part: 20\n    prepart: -pt\n    action: continue\n"
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.dir)),
+            ["other.mp4", "sample_1.mp4", "sample_2.mp4", "show-pt1.mp4", "show-pt2.mp4", "show-pt3.mp4"],
+        )
+        results = {os.path.basename(r["first_file"]): r for r in records if r["event"] == "result"}
+        self.assertEqual((results["show-ep1.mp4"]["status"], results["show-ep1.mp4"]["rule"]), ("mvd", 0))
+        self.assertEqual((results["sample_1.mp4"]["status"], results["sample_1.mp4"]["rule"]), ("skipped", None))
+
+    def test_rules_invalid(self):
+        for rules in (
+            "part: 0",
+            "part: 1\naction: mv",
+            "part: 1\ncolour: red",
+            "rules:\n  - action: skip",
+            "action: continue",
+            "rules:\n  - match: show\n    action: continue",
+        ):
+            with self.subTest(rules=rules), unittest.mock.patch("builtins.print"):
+                self.assertRaises(ValueError, self.run_rules, "rules.yaml", rules)
+
+
 if __name__ == "__main__":
     unittest.main()
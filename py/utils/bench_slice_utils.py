@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+#
+# Micro-benchmarks slice_utils.NormalizedSlice against the slice_utils functions it replaces
+#
+# usage
+#   * python -m utils.bench_slice_utils
+#       * times index, containment, merge and reversal on a container of 10**8 items
+#   * python -m utils.bench_slice_utils --length 1000 --number 100000
+from __future__ import annotations
+
+import argparse
+import timeit
+from collections.abc import Sequence
+
+from utils import slice_utils
+
+
+def parse_inputs(argparse_args: Sequence[str] | None = None) -> dict:
+    """Parse cmd line inputs; set, check, and fix script's default variables."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--length", default=10**8, type=int, help="length of the container being sliced")
+    parser.add_argument("--number", default=200000, type=int, help="number of calls timed per operation")
+    return dict(parser.parse_args(argparse_args).__dict__.items())
+
+
+def main(argparse_args: Sequence[str] | None = None) -> None:
+    args = parse_inputs(argparse_args)
+    length = args["length"]
+    slice_ = slice(length // 10, -length // 10, 3)
+    normalized = slice_utils.NormalizedSlice(slice_, length)
+    index = len(normalized) // 2
+    benchmarks = {
+        "index": (
+            lambda: slice_utils.slice_index(index, slice_, length),
+            lambda: normalized.index(index),
+        ),
+        "contains": (
+            lambda: slice_utils.in_slice(index, slice_, length),
+            lambda: index in normalized,
+        ),
+        "len": (
+            lambda: slice_utils.slice_length(slice_, length),
+            lambda: len(normalized),
+        ),
+        "merge": (
+            lambda: slice_utils.slice_merge([slice_, slice(5, -5, 2)], length),
+            lambda: normalized.merge(slice(5, -5, 2)),
+        ),
+        "reverse": (
+            lambda: slice_utils.slice_merge([slice_, slice(None, None, -1)], length),
+            lambda: normalized.reverse(),  # pylint: disable=unnecessary-lambda
+        ),
+    }
+    for name, (func_s, normalized_s) in benchmarks.items():
+        func_t = timeit.timeit(func_s, number=args["number"])
+        normalized_t = timeit.timeit(normalized_s, number=args["number"])
+        print(
+            f"INFO: {name}: slice_utils={func_t * 1e9 / args['number']:.0f}ns; "
+            f"NormalizedSlice={normalized_t * 1e9 / args['number']:.0f}ns; speedup={func_t / normalized_t:.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
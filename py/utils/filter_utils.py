@@ -10,22 +10,41 @@
 #
 # author: acegene <acegene22@gmail.com>
 import argparse
+import array
+import itertools
 import os
 import re
+import sys
 from collections.abc import Callable
 from collections.abc import Iterable
+from collections.abc import Iterator
 from collections.abc import Sequence
 from re import Pattern
 from typing import Any
 
 import git  # python3 -m pip install GitPython
 from utils import cli_utils
+from utils import git_utils
 from utils import path_utils
 from utils import re_utils
 from utils.argparse_utils import DirType
 from utils.argparse_utils import RegexAction
 from utils.log_manager import LogManager
 
+GIT_QUERY_BATCH_SIZE = 2**12
+#### relative cost of each filter, by which plan_filters orders runs of 'and' filters
+FILTER_COSTS = {
+    "regex": 0,
+    "files": 1,
+    "apple_junk": 1,
+    "git_staged": 2,
+    "git_tracked": 2,
+    "git_untracked": 2,
+    "git_ignored": 3,
+    "git_text": 3,
+}
+WALKING_FILTERS = ("apple_junk", "files")
+
 
 class _AccumulateAndsOrsAction(argparse.Action):
     def __init__(self, option_strings, dest, nargs=None, **kwargs):
@@ -39,7 +58,7 @@ def __call__(self, parser, namespace, values, option_string=None):
         )
 
 
-def _parse_input(argparse_args: Sequence[str] | None = None) -> list[dict]:
+def _parse_input(argparse_args: Sequence[str] | None = None) -> tuple[list[dict], bool]:
     """Parse cmd line inputs; set, check, and fix script's default variables."""
 
     # pylint: disable=[too-many-locals,too-many-statements]
@@ -55,6 +74,7 @@ def generate_parser() -> argparse.ArgumentParser:
         parser = argparse.ArgumentParser()
         parser.add_argument("--and", "-a", action=_AccumulateAndsOrsAction, help="TODO")
         parser.add_argument("--or", "-o", action=_AccumulateAndsOrsAction, help="TODO")
+        parser.add_argument("--explain", action="store_true", help="print the planned order of the filters to stderr")
         parser.add_argument(
             "--dir",
             "-d",
@@ -66,42 +86,58 @@ def generate_parser() -> argparse.ArgumentParser:
 
     def generate_parser_apple_junk(dir_: str) -> argparse.ArgumentParser:
         parser = argparse.ArgumentParser()
-        parser.add_argument("--dir", "-d", default=dir_, type=DirType(), help="directory to search for files")
+        parser.add_argument(
+            "--dir", "-d", dest="dir_", default=dir_, type=DirType(), help="directory to search for files"
+        )
         default_excludes = [".git"]
         parser.add_argument("--excludes", "-e", default=default_excludes, nargs="+", help="paths to exclude")
         return parser
 
     def generate_parser_files(dir_: str) -> argparse.ArgumentParser:
         parser = argparse.ArgumentParser()
-        parser.add_argument("--dir", "-d", default=dir_, type=DirType(), help="directory to search for files")
+        parser.add_argument(
+            "--dir", "-d", dest="dir_", default=dir_, type=DirType(), help="directory to search for files"
+        )
         default_excludes = [".git", "__pycache__"]
         parser.add_argument("--excludes", "-e", default=default_excludes, nargs="+", help="paths to exclude")
         return parser
 
     def generate_parser_git_ignored(dir_: str) -> argparse.ArgumentParser:
         parser = argparse.ArgumentParser()
-        parser.add_argument("--dir", "-d", default=dir_, type=DirType(), help="directory for git repo")
+        parser.add_argument("--dir", "-d", dest="dir_", default=dir_, type=DirType(), help="directory for git repo")
         return parser
 
     def generate_parser_git_staged(dir_: str) -> argparse.ArgumentParser:
         parser = argparse.ArgumentParser()
-        parser.add_argument("--dir", "-d", default=dir_, type=DirType(), help="directory for git repo")
+        parser.add_argument("--dir", "-d", dest="dir_", default=dir_, type=DirType(), help="directory for git repo")
+        parser.add_argument(
+            "--no-read-index",
+            action="store_false",
+            dest="read_index",
+            help="ask git rather than reading its index file",
+        )
         return parser
 
     def generate_parser_git_text(dir_: str) -> argparse.ArgumentParser:
         parser = argparse.ArgumentParser()
-        parser.add_argument("--dir", "-d", default=dir_, type=DirType(), help="directory for git repo")
+        parser.add_argument("--dir", "-d", dest="dir_", default=dir_, type=DirType(), help="directory for git repo")
         parser.add_argument("--eol", "-e", choices=["all", "cr", "crlf", "lf"], default="lf", help="end of line format")
         return parser
 
     def generate_parser_git_tracked(dir_: str) -> argparse.ArgumentParser:
         parser = argparse.ArgumentParser()
-        parser.add_argument("--dir", "-d", default=dir_, type=DirType(), help="directory for git repo")
+        parser.add_argument("--dir", "-d", dest="dir_", default=dir_, type=DirType(), help="directory for git repo")
+        parser.add_argument(
+            "--no-read-index",
+            action="store_false",
+            dest="read_index",
+            help="ask git rather than reading its index file",
+        )
         return parser
 
     def generate_parser_git_untracked(dir_: str) -> argparse.ArgumentParser:
         parser = argparse.ArgumentParser()
-        parser.add_argument("--dir", "-d", default=dir_, type=DirType(), help="directory for git repo")
+        parser.add_argument("--dir", "-d", dest="dir_", default=dir_, type=DirType(), help="directory for git repo")
         parser.add_argument(
             "--show-ignored",
             "--si",
@@ -109,6 +145,12 @@ def generate_parser_git_untracked(dir_: str) -> argparse.ArgumentParser:
             default=False,
             help="show files ignored by .gitignore",
         )
+        parser.add_argument(
+            "--no-read-index",
+            action="store_false",
+            dest="read_index",
+            help="ask git rather than reading its index file",
+        )
         return parser
 
     def generate_parser_regex() -> argparse.ArgumentParser:
@@ -182,18 +224,173 @@ def generate_parser_regex() -> argparse.ArgumentParser:
         args_filter = dict(args_internal.__dict__.items())
         filter_lst.append({"filter": f_type, "operation": arg["operation"], "args": args_filter})
     #### return args
-    return filter_lst
+    return filter_lst, args.explain
+
+
+def plan_filters(filter_lst: Sequence[dict]) -> list[dict]:
+    """Order <filter_lst> so that it is cheaper to run while giving the same objs.
+
+    Runs of consecutive 'and' filters commute, so each run is sorted by FILTER_COSTS, running cheap and selective
+    filters before the costlier ones that query every obj reaching them. Repeats of a filter within a run of the same
+    operation are dropped, and walking filters of the same dir share a DirSnapshot so that the dir is listed once.
+    """
+    plan: list[dict] = []
+    for operation, run in itertools.groupby(filter_lst, key=lambda filter_: filter_["operation"]):
+        run_unique: list[dict] = []
+        for filter_ in run:
+            if filter_ not in run_unique:
+                run_unique.append(filter_)
+        if operation == "and":
+            run_unique.sort(key=lambda filter_: FILTER_COSTS[filter_["filter"]])
+        plan += [dict(filter_, args=dict(filter_["args"])) for filter_ in run_unique]
+    walks_by_dir: dict[str, list[dict]] = {}
+    for filter_ in plan:
+        if filter_["filter"] in WALKING_FILTERS:
+            walks_by_dir.setdefault(path_utils.path_clean(filter_["args"]["dir_"]), []).append(filter_)
+    for dir_, filters_walking in walks_by_dir.items():
+        if len(filters_walking) > 1:
+            #### only entries excluded by every sharing filter are left out of the snapshot
+            excludes = frozenset.intersection(*(frozenset(f["args"]["excludes"]) for f in filters_walking))
+            snapshot = DirSnapshot(dir_, excludes)
+            for filter_ in filters_walking:
+                filter_["args"]["snapshot"] = snapshot
+    return plan
+
+
+def explain_plan(filter_lst: Sequence[dict], plan: Sequence[dict]) -> str:
+    """Describe <plan> from plan_filters(<filter_lst>) as one line per filter"""
+    snapshot_ids: dict[int, int] = {}
+    lines = [f"filter plan of {len(plan)} filters from {len(filter_lst)}:"]
+    for i, filter_ in enumerate(plan):
+        args = " ".join(f"{k}={v!r}" for k, v in filter_["args"].items() if k != "snapshot")
+        line = (
+            f"  {i + 1}. --{filter_['operation']} {filter_['filter']} {args} (cost {FILTER_COSTS[filter_['filter']]})"
+        )
+        if "snapshot" in filter_["args"]:
+            snapshot_id = snapshot_ids.setdefault(id(filter_["args"]["snapshot"]), len(snapshot_ids) + 1)
+            line += f" (shares snapshot {snapshot_id})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class DirSnapshot:
+    """Listing of the tree under <dir_>, recorded by the first walk through each dir and replayed to later walks.
+
+    Entries are kept as a compact path table rather than full path strings: entry i is named <names>[i], interned so
+    that repeated basenames are stored once, within the dir entry <parents>[i], with entry 0 being <dir_> itself. The
+    entries of a listed dir i are the contiguous range <children_start>[i] to <children_end>[i]. Dirs are listed
+    with os.scandir when first walked, so a walk streams like os.walk, and entries named in <excludes> are not
+    recorded, so excluded dirs are never listed.
+    """
+
+    _KIND_FILE = 0
+    _KIND_DIR = 1
+    _KIND_DIR_SYMLINK = 2
+
+    def __init__(self, dir_: str, excludes: Iterable[str] = ()) -> None:
+        self.dir = dir_
+        self.excludes = frozenset(excludes)
+        self.names: list[str] = [dir_]
+        self.parents = array.array("i", [-1])
+        self.kinds = bytearray([self._KIND_DIR])
+        self.children_start = array.array("i", [-1])
+        self.children_end = array.array("i", [-1])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def walk(self, excludes: Iterable[str] = ()) -> Iterator[tuple[str, list[str], list[str]]]:
+        """os.walk(<dir_>, topdown=True) without the entries named in <excludes>; names pruned from the yielded dirs
+        are not walked"""
+        excludes = frozenset(excludes) - self.excludes
+        stack = [(0, self.dir)]
+        while stack:
+            i, root = stack.pop()
+            if self.children_start[i] < 0:
+                self._list(i, root)
+            dir_ids: dict[str, int] = {}
+            files = []
+            for j in range(self.children_start[i], self.children_end[i]):
+                name = self.names[j]
+                if name in excludes:
+                    continue
+                if self.kinds[j] == self._KIND_FILE:
+                    files.append(name)
+                else:
+                    dir_ids[name] = j
+            dirs = list(dir_ids)
+            yield root, dirs, files
+            stack += [
+                (dir_ids[d], os.path.join(root, d))
+                for d in reversed(dirs)
+                if d in dir_ids and self.kinds[dir_ids[d]] == self._KIND_DIR
+            ]
+
+    def _list(self, i: int, path: str) -> None:
+        self.children_start[i] = len(self.names)
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name in self.excludes:
+                        continue
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    self.names.append(sys.intern(entry.name))
+                    self.parents.append(i)
+                    if not is_dir:
+                        self.kinds.append(self._KIND_FILE)
+                    else:
+                        self.kinds.append(self._KIND_DIR_SYMLINK if entry.is_symlink() else self._KIND_DIR)
+                    self.children_start.append(-1)
+                    self.children_end.append(-1)
+        except OSError:
+            pass
+        self.children_end[i] = len(self.names)
+
+    def path(self, i: int) -> str:
+        """Full path of entry <i>"""
+        names = []
+        while i > 0:
+            names.append(self.names[i])
+            i = self.parents[i]
+        return os.path.join(self.dir, *reversed(names))
 
 
 def _operation_apply(operation: str, lhs: Iterable[Any], rhs: Iterable[Any]) -> Iterable[Any]:
+    """Lazily combine <lhs>, the upstream objs, with <rhs>, the objs of a filter.
+
+    'and' streams <lhs> through a lookup of <rhs>; 'or' streams <lhs> then <rhs>, deduplicating through the set of
+    objs seen so far, which is the only buffer of the pipeline.
+    """
     if operation == "and":
-        return set(lhs).intersection(rhs)
+        return _intersect(lhs, rhs)
     if operation == "or":
-        return set(lhs).union(rhs)
+        return _unique(itertools.chain(lhs, rhs))
     logger.error_raise(ValueError("<operation> not in ['and', 'or']."), raise_exc=SystemExit(1))
 
 
-def filter_apple_junk(dir_: str, excludes: Iterable[str]) -> Iterable[str]:
+def _intersect(lhs: Iterable[Any], rhs: Iterable[Any]) -> Iterator[Any]:
+    rhs_lookup = rhs if isinstance(rhs, (set, frozenset)) else set(rhs)
+    yield from (obj for obj in lhs if obj in rhs_lookup)
+
+
+def _unique(objs: Iterable[Any]) -> Iterator[Any]:
+    seen = set()
+    for obj in objs:
+        if obj not in seen:
+            seen.add(obj)
+            yield obj
+
+
+def _batched(objs: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    objs_iter = iter(objs)
+    while batch := list(itertools.islice(objs_iter, size)):
+        yield batch
+
+
+def filter_apple_junk(dir_: str, excludes: Iterable[str], snapshot: DirSnapshot | None = None) -> Iterable[str]:
     dirs_junk = [".Spotlight-V100", ".Trash", ".Trashes", ".fseventsd", ".TemporaryItems"]
     files_junk = [
         ".com.apple.timemachine.donotpresent",
@@ -204,15 +401,14 @@ def filter_apple_junk(dir_: str, excludes: Iterable[str]) -> Iterable[str]:
         ".TemporaryItems",
     ]
 
-    objs_out = []
-    for root, dirs, files in os.walk(dir_, topdown=True):
-        dirs[:] = [d for d in dirs if d not in excludes]
-        objs_out += [path_utils.path_clean(os.path.join(root, d)) for d in dirs if d in dirs_junk]
+    snapshot = DirSnapshot(dir_, excludes) if snapshot is None else snapshot
+    for root, dirs, files in snapshot.walk(excludes):
+        objs_out = [os.path.join(root, d) for d in dirs if d in dirs_junk]
         dirs[:] = [d for d in dirs if d not in dirs_junk]
         for file in files:
-            if file not in excludes and file in files_junk:
-                objs_out.append(path_utils.path_clean(os.path.join(root, file)))
-    return objs_out
+            if file in files_junk:
+                objs_out.append(os.path.join(root, file))
+        yield from path_utils.path_clean_many(objs_out)
 
 
 def _filter_apple_junk_wrapped(
@@ -220,51 +416,84 @@ def _filter_apple_junk_wrapped(
     operation: str,
     dir_: str,
     excludes: Iterable[str],
+    snapshot: DirSnapshot | None = None,
 ) -> Iterable[str]:
-    objs_out = filter_apple_junk(dir_, excludes)
+    objs_out = filter_apple_junk(dir_, excludes, snapshot)
     return _operation_apply(operation, objs_in, objs_out)
 
 
-def filter_files(dir_: str, excludes: Iterable[str]) -> Iterable[str]:
-    files_out = []
-    for root, dirs, files in os.walk(dir_, topdown=True):
-        dirs[:] = [d for d in dirs if d not in excludes]
-        for file in files:
-            if file not in excludes:
-                files_out.append(path_utils.path_clean(os.path.join(root, file)))
-    return files_out
+def filter_files(dir_: str, excludes: Iterable[str], snapshot: DirSnapshot | None = None) -> Iterable[str]:
+    snapshot = DirSnapshot(dir_, excludes) if snapshot is None else snapshot
+    for root, _dirs, files in snapshot.walk(excludes):
+        yield from path_utils.path_clean_many(os.path.join(root, file) for file in files)
 
 
-def _filter_files_wrapped(files_in: Iterable[str], operation: str, dir_: str, excludes: Iterable[str]) -> Iterable[str]:
-    files_out = filter_files(dir_, excludes)
+def _filter_files_wrapped(
+    files_in: Iterable[str],
+    operation: str,
+    dir_: str,
+    excludes: Iterable[str],
+    snapshot: DirSnapshot | None = None,
+) -> Iterable[str]:
+    files_out = filter_files(dir_, excludes, snapshot)
     return _operation_apply(operation, files_in, files_out)
 
 
 def filter_git_ignore(files_in: Iterable[str], dir_: str) -> Iterable[str]:
-    #### initialize git var
-    g = git.Git(dir_)
-    #### accumulate ignored files
-    files_out = []
-    for f in files_in:
-        try:
-            git_output = g.check_ignore("--", f)
-        except git.exc.GitCommandError:
-            continue
-        if git_output != "":
-            files_out.append(path_utils.path_clean(f))
-    #### cleanup files then return
-    files_out = [f for f in files_out if os.path.exists(f)]  # TODO: is this needed?
-    return files_out
+    #### query all files through one `git check-ignore --stdin` process; files outside the repo are never ignored
+    query = git_utils.GitBatchQuery.get(dir_, ("check-ignore", "--verbose", "--non-matching"), 4)
+    files = (f for f in (os.path.join(dir_, f) for f in files_in) if query.contains(f))
+    for batch in _batched(files, GIT_QUERY_BATCH_SIZE):
+        #### accumulate ignored files, i.e. matched by a pattern that is not negated
+        files_out = [f for f, (source, _line, pattern, _path) in query.query(batch) if source and pattern[:1] != "!"]
+        #### cleanup files then yield
+        yield from (f for f in path_utils.path_clean_many(files_out) if os.path.exists(f))  # TODO: is this needed?
 
 
 def _filter_git_ignored_wrapped(files_in: Iterable[str], operation: str, dir_: str) -> Iterable[str]:
-    #### get git ignore files
-    files_out = filter_git_ignore(files_in, dir_)
-    #### apply <operation>
-    return set(files_out) if operation == "and" else _operation_apply("or", files_in, files_out)
+    if operation == "and":
+        return filter_git_ignore(files_in, dir_)
+    #### <files_in> are buffered as they are both passed through and queried
+    files_in = list(files_in)
+    return _operation_apply("or", files_in, filter_git_ignore(files_in, dir_))
+
 
+def _git_index_prefix(index: git_utils.GitIndex, dir_: str) -> str:
+    """Path of <dir_> relative to the top level of <index> as the prefix of its entries, '' being the top level"""
+    prefix = os.path.relpath(os.path.realpath(dir_), index.toplevel)
+    return "" if prefix == "." else prefix.replace(os.sep, "/")
 
-def filter_git_staged(dir_: str):
+
+def _clean_existing(paths: Iterable[str]) -> Iterator[str]:
+    """path_clean each of <paths> that exists, listing each of their dirs once rather than a stat of each path
+
+    Symlinks within the listings are resolved and checked for existence on their own.
+    """
+    listings: dict[str, tuple[str, dict[str, bool]]] = {}
+    for path in paths:
+        dir_, base = os.path.split(path)
+        if dir_ not in listings:
+            try:
+                with os.scandir(dir_ or ".") as entries:
+                    listing = {entry.name: entry.is_symlink() for entry in entries}
+            except OSError:
+                listing = {}
+            listings[dir_] = (os.path.join(path_utils.path_clean(dir_ or "."), ""), listing)
+        dir_clean, listing = listings[dir_]
+        if base not in listing:
+            continue
+        if not listing[base]:
+            yield dir_clean + base
+        elif os.path.exists(path_clean := path_utils.path_clean(path)):
+            yield path_clean
+
+
+def filter_git_staged(dir_: str, read_index: bool = True):
+    #### read the staged files from the index of the repo without git if it can be
+    index = git_utils.GitIndex.get(dir_) if read_index else None
+    if index is not None:
+        files_git_staged = index.staged(_git_index_prefix(index, dir_))
+        return list(_clean_existing(os.path.join(index.toplevel, f) for f in files_git_staged))
     #### initialize git var
     g = git.Git(dir_)
     #### accumulate staged files
@@ -275,41 +504,33 @@ def filter_git_staged(dir_: str):
     #### get the git top level directory
     dir_git = g.rev_parse("--show-toplevel")
     #### cleanup files then return
-    files_out = [path_utils.path_clean(os.path.join(dir_git, f)) for f in files_git_staged]
+    files_out = path_utils.path_clean_many(os.path.join(dir_git, f) for f in files_git_staged)
     files_out = [f for f in files_out if os.path.exists(f)]
     return files_out
 
 
-def _filter_git_staged_wrapped(files_in: Iterable[str], operation: str, dir_: str) -> Iterable[str]:
-    files_out = filter_git_staged(dir_)
+def _filter_git_staged_wrapped(
+    files_in: Iterable[str],
+    operation: str,
+    dir_: str,
+    read_index: bool = True,
+) -> Iterable[str]:
+    files_out = filter_git_staged(dir_, read_index)
     return _operation_apply(operation, files_in, files_out)
 
 
 def filter_git_text(files_in: Iterable[str], dir_: str, eol: str):
-    #### initialize git var
-    g = git.Git(dir_)
-    #### accumulate git text files
-    files_out = []
-    for f in files_in:
-        try:
-            git_output = g.check_attr("-z", "text", str(f)).strip("\x00").split("\x00")
-        except git.exc.GitCommandError:
-            continue
-        #### check if the text attribute for this file is set
-        if git_output != "" and len(git_output) > 2 and git_output[2] == "set":
-            if eol == "all":
-                files_out.append(path_utils.path_clean(f))
-                continue
-            #### check if the eol attribute is equal to what <eol> is specified as
-            try:
-                git_output = g.check_attr("-z", "eol", str(f)).strip("\x00").split("\x00")
-            except git.exc.GitCommandError:
-                continue
-            if git_output != "" and len(git_output) > 2 and git_output[2] == eol:
-                files_out.append(path_utils.path_clean(f))
-    #### cleanup files then return
-    files_out = [f for f in files_out if os.path.exists(f)]
-    return files_out
+    #### query all files through one `git check-attr --stdin` process; files outside the repo have no attributes
+    query = git_utils.GitBatchQuery.get(dir_, ("check-attr", "text", "eol"), 6)
+    files = (f for f in (os.path.join(dir_, str(f)) for f in files_in) if query.contains(f))
+    for batch in _batched(files, GIT_QUERY_BATCH_SIZE):
+        #### accumulate git text files whose eol attribute is <eol> unless <eol> is 'all'
+        files_out = []
+        for f, (_path, _text, text, _path_eol, _eol, eol_attr) in query.query(batch):
+            if text == "set" and eol in ("all", eol_attr):
+                files_out.append(f)
+        #### cleanup files then yield
+        yield from (f for f in path_utils.path_clean_many(files_out) if os.path.exists(f))
 
 
 def _filter_git_text_wrapped(files_in: Iterable[str], operation: str, dir_: str, eol: str) -> Iterable[str]:
@@ -320,24 +541,88 @@ def _filter_git_text_wrapped(files_in: Iterable[str], operation: str, dir_: str,
     return files_out  # type: ignore[no-any-return] # TODO: should this be needed?
 
 
-def filter_git_tracked(dir_: str) -> Iterable[str]:
+def filter_git_tracked(dir_: str, read_index: bool = True) -> Iterable[str]:
+    #### read the tracked files from the index of the repo without git if it can be
+    index = git_utils.GitIndex.get(dir_) if read_index else None
+    if index is not None:
+        prefix = _git_index_prefix(index, dir_)
+        files_git_tracked = (f[len(prefix) + 1 :] if prefix else f for f in index.tracked(prefix))
+        return list(_clean_existing(os.path.join(dir_, f) for f in files_git_tracked))
     g = git.Git(dir_)
     files_git_tracked = g.ls_files("-z").strip("\x00").split("\x00")
     #### early return if no git output
     if files_git_tracked == [""]:
         return []
     #### cleanup files then return
-    files_out = [path_utils.path_clean(os.path.join(dir_, f)) for f in files_git_tracked]
+    files_out = path_utils.path_clean_many(os.path.join(dir_, f) for f in files_git_tracked)
     files_out = [f for f in files_out if os.path.exists(f)]
     return files_out
 
 
-def _filter_git_tracked_wrapped(files_in: Iterable[str], operation: str, dir_: str) -> Iterable[str]:
-    files_out = filter_git_tracked(dir_)
+def _filter_git_tracked_wrapped(
+    files_in: Iterable[str],
+    operation: str,
+    dir_: str,
+    read_index: bool = True,
+) -> Iterable[str]:
+    files_out = filter_git_tracked(dir_, read_index)
     return _operation_apply(operation, files_in, files_out)
 
 
-def filter_git_untracked(dir_: str, show_ignored: bool) -> Iterable[str]:
+def _is_repo_dir(dir_: str) -> bool:
+    """Whether <dir_> is the top level of a repo, having a '.git' file or a '.git' dir with a HEAD"""
+    dot_git = os.path.join(dir_, ".git")
+    return os.path.isfile(dot_git) or os.path.exists(os.path.join(dot_git, "HEAD"))
+
+
+def _git_index_untracked(index: git_utils.GitIndex, dir_: str, show_ignored: bool) -> list[str]:
+    """Paths of the untracked files within <dir_> as `git ls-files --others`, walking <dir_> against the entries of
+    <index> so that git is only asked which of the untracked paths are ignored unless <show_ignored>"""
+    dirs_index = index.dirs()
+    #### only untracked paths are queried so git need not read the index, which costs it a scan of every entry per path
+    query = None
+    if not show_ignored:
+        query = git_utils.GitBatchQuery.get(dir_, ("check-ignore", "--no-index", "--verbose", "--non-matching"), 4)
+    files_out = []
+    dirs = [(dir_, _git_index_prefix(index, dir_))]
+    while dirs:
+        root, prefix = dirs.pop()
+        try:
+            names = set(os.listdir(root))
+        except OSError:
+            continue
+        names.discard(".git")
+        names_tracked, dirs_tracked = dirs_index.get(prefix, ((), ()))
+        dirs += [(os.path.join(root, d), f"{prefix}/{d}" if prefix else d) for d in names.intersection(dirs_tracked)]
+        #### only the untracked names are told apart as files, nested repos and dirs
+        dirs_untracked = {}
+        files_untracked = {}
+        for name in names.difference(names_tracked, dirs_tracked):
+            path = f"{prefix}/{name}" if prefix else name
+            path_os = os.path.join(root, name)
+            if not os.path.isdir(path_os) or os.path.islink(path_os):
+                files_untracked[path] = path_os
+            elif _is_repo_dir(path_os):
+                #### git lists nested repos rather than their files
+                files_untracked[path + "/"] = path_os
+            else:
+                dirs_untracked[path + "/"] = path_os
+        if query is not None:
+            #### ignored dirs are not walked
+            for path, (source, _line, pattern, _path) in query.query([*dirs_untracked, *files_untracked]):
+                if source and pattern[:1] != "!":
+                    dirs_untracked.pop(path, None)
+                    files_untracked.pop(path, None)
+        files_out += files_untracked.values()
+        dirs += [(path_os, path[:-1]) for path, path_os in dirs_untracked.items()]
+    return sorted(files_out)
+
+
+def filter_git_untracked(dir_: str, show_ignored: bool, read_index: bool = True) -> Iterable[str]:
+    #### read the tracked files from the index of the repo without git if it can be and walk the rest
+    index = git_utils.GitIndex.get(dir_) if read_index else None
+    if index is not None:
+        return list(_clean_existing(_git_index_untracked(index, dir_, show_ignored)))
     g = git.Git(dir_)
     params = ["-z", "--others"]
     if not show_ignored:
@@ -347,7 +632,7 @@ def filter_git_untracked(dir_: str, show_ignored: bool) -> Iterable[str]:
     if files_git_untracked == [""]:
         return []
     #### cleanup files then return
-    files_out = [path_utils.path_clean(os.path.join(dir_, f)) for f in files_git_untracked]
+    files_out = path_utils.path_clean_many(os.path.join(dir_, f) for f in files_git_untracked)
     files_out = [f for f in files_out if os.path.exists(f)]
     return files_out
 
@@ -357,16 +642,16 @@ def _filter_git_untracked_wrapped(
     operation: str,
     dir_: str,
     show_ignored: bool,
+    read_index: bool = True,
 ) -> Iterable[str]:
-    files_out = filter_git_untracked(dir_, show_ignored)
+    files_out = filter_git_untracked(dir_, show_ignored, read_index)
     return _operation_apply(operation, files_in, files_out)
 
 
 def filter_regex(objs_in: Iterable[str], regex: Pattern, file_mode: bool = False) -> Iterable[str]:
     if file_mode:
-        objs_to_process = [os.path.basename(f) for f in objs_in]
-        return [o_in for o_in, o in zip(objs_in, objs_to_process) if re.search(regex, o)]
-    return [o for o in objs_in if re.search(regex, o)]
+        return (o for o in objs_in if re.search(regex, os.path.basename(o)))
+    return (o for o in objs_in if re.search(regex, o))
 
 
 def _filter_regex_wrapped(objs_in: Iterable[str], operation: str, regex: Pattern, file_mode: bool) -> Iterable[str]:
@@ -401,10 +686,18 @@ def filter_run(objs: Iterable[Any], operation: str, filter_: str, args: dict) ->
 
 
 def main(args: Sequence[str] = None, initial_objs: Iterable | None = None) -> Iterable[Any]:
+    """Chain the filters of <args> onto <initial_objs> as a lazy pipeline whose objs are yielded as they are found.
+
+    The returned iterator can be consumed once; 'and' filters stream the objs of the filters before them while 'or'
+    filters also buffer the set of objs seen to deduplicate them, see _operation_apply.
+    """
     initial_objs = set() if initial_objs is None else initial_objs
-    filter_list = _parse_input(args)
+    filter_list, explain = _parse_input(args)
+    plan = plan_filters(filter_list)
+    if explain:
+        print(explain_plan(filter_list, plan), file=sys.stderr)
     filter_final_result = initial_objs
-    for filter_ in filter_list:
+    for filter_ in plan:
         filter_final_result = filter_run(filter_final_result, filter_["operation"], filter_["filter"], filter_["args"])
     return filter_final_result
 
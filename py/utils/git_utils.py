@@ -1,10 +1,26 @@
 ## TODO:
 ## - add relative option for generating file lists
+from __future__ import annotations
+
+import array
+import atexit
+import contextlib
+import hashlib
+import itertools
 import logging
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+from collections.abc import Iterable
+from collections.abc import Iterator
 from collections.abc import Sequence
 
 import git
-
+import gitdb  # installed along with GitPython
 
 ## tracking branch given branch https://stackoverflow.com/a/9753364
 ## git for-each-ref --format='%(upstream:short)' $(git rev-parse --symbolic-full-name <SOMEBRANCH>)
@@ -122,6 +138,452 @@ def get_untracked_ignored_files(repo: git.Repo) -> list[str]:
     return [] if untracked_ignored_files == "" else untracked_ignored_files.split("\x00")
 
 
+class GitBatchQuery:
+    """Long lived `git <args> --stdin -z` process of a repo answering any number of paths, e.g. check-ignore.
+
+    Paths are written to the process from a thread while its NUL separated output is read, so batches of any size
+    cannot deadlock on full pipes, and GIT_FLUSH=1 makes git answer each path as soon as it is read. Processes are
+    pooled per repo top level and <args> by GitBatchQuery.get and closed at exit.
+
+    Attributes:
+        toplevel: Top level directory of the repo, the cwd of the process
+        args: Args of the git command, without '--stdin' and '-z'
+        fields_per_path: Number of NUL separated fields git outputs per path
+    """
+
+    _pool: dict[tuple[str, tuple[str, ...]], GitBatchQuery] = {}
+    _pool_lock = threading.Lock()
+    _toplevels: dict[str, str] = {}
+
+    def __init__(self, toplevel: str, args: Sequence[str], fields_per_path: int) -> None:
+        self.toplevel = toplevel
+        self.args = tuple(args)
+        self.fields_per_path = fields_per_path
+        self._lock = threading.Lock()
+        self._proc: subprocess.Popen | None = None
+        self._stderr: tempfile._TemporaryFileWrapper | None = None  # pylint: disable=[protected-access]
+        self._dirs_real: dict[str, str | None] = {}
+
+    @classmethod
+    def get(cls, dir_: str, args: Sequence[str], fields_per_path: int) -> GitBatchQuery:
+        """Pooled GitBatchQuery of <args> for the repo containing <dir_>
+
+        Raises:
+            git.exc.GitCommandError: if <dir_> is not in a git repo
+        """
+        with cls._pool_lock:
+            if dir_ not in cls._toplevels:
+                cls._toplevels[dir_] = os.path.realpath(git.Git(dir_).rev_parse("--show-toplevel"))
+            key = (cls._toplevels[dir_], tuple(args))
+            if key not in cls._pool:
+                cls._pool[key] = cls(key[0], args, fields_per_path)
+            return cls._pool[key]
+
+    @classmethod
+    def close_all(cls) -> None:
+        with cls._pool_lock:
+            for query in cls._pool.values():
+                query.close()
+            cls._pool.clear()
+
+    def close(self) -> None:
+        """Terminate the process, which is started again by the next query"""
+        if self._proc is not None:
+            with contextlib.suppress(BrokenPipeError):
+                self._proc.stdin.close()  # type: ignore[union-attr]
+            try:
+                self._proc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+            self._proc.stdout.close()  # type: ignore[union-attr]
+            self._stderr.close()  # type: ignore[union-attr]
+            self._proc = None
+
+    def __enter__(self) -> GitBatchQuery:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def contains(self, path: str) -> bool:
+        """Whether <path> is within the work tree and not beyond a symlinked dir of it, as such paths make git exit"""
+        return self._dir_real(os.path.dirname(os.path.abspath(path))) is not None
+
+    def _dir_real(self, dir_: str) -> str | None:
+        """Real path of the absolute <dir_> if it is within the work tree without passing through a symlink within it"""
+        if dir_ not in self._dirs_real:
+            dir_real = os.path.realpath(dir_)
+            parent = os.path.dirname(dir_)
+            if os.path.commonpath((dir_real, self.toplevel)) != self.toplevel:
+                self._dirs_real[dir_] = None
+            elif dir_real == self.toplevel:
+                #### the top level may be reached through symlinks outside of the work tree only
+                parent_real = os.path.realpath(parent)
+                within = parent != dir_ and os.path.commonpath((parent_real, self.toplevel)) == self.toplevel
+                self._dirs_real[dir_] = None if within else dir_real
+            elif os.path.islink(dir_):
+                self._dirs_real[dir_] = None
+            else:
+                self._dirs_real[dir_] = dir_real if self._dir_real(parent) is not None else None
+        return self._dirs_real[dir_]
+
+    def query(self, paths: Iterable[str]) -> Iterator[tuple[str, list[str]]]:
+        """Yield each of <paths> along with the fields git output for it, in the order of <paths>
+
+        Relative <paths> are relative to <toplevel>. Abandoning the iteration early closes the process.
+
+        Raises:
+            git.exc.GitCommandError: if git exits while answering <paths>, e.g. for a path outside of <toplevel>
+        """
+        paths = list(paths)
+        if not paths:
+            return
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            proc = self._proc
+            assert proc is not None
+            writer = threading.Thread(target=self._write, args=(proc, paths), daemon=True)
+            writer.start()
+            finished = False
+            try:
+                buf = b""
+                fields: list[bytes] = []
+                i_field = 0
+                for path in paths:
+                    while len(fields) - i_field < self.fields_per_path:
+                        data = os.read(proc.stdout.fileno(), 2**16)  # type: ignore[union-attr]
+                        if not data:
+                            raise self._error(proc)
+                        fields = fields[i_field:] + (buf + data).split(b"\0")
+                        buf = fields.pop()
+                        i_field = 0
+                    yield path, [
+                        field.decode("utf-8", "surrogateescape")
+                        for field in fields[i_field : i_field + self.fields_per_path]
+                    ]
+                    i_field += self.fields_per_path
+                finished = True
+            finally:
+                #### a writer blocked on a full pipe is only released by git exiting
+                if not finished and self._proc is not None:
+                    self._proc.kill()
+                writer.join()
+                if not finished:
+                    self.close()
+
+    def _start(self) -> None:
+        self.close()
+        self._stderr = tempfile.TemporaryFile()  # pylint: disable=[consider-using-with]
+        self._proc = subprocess.Popen(  # pylint: disable=[consider-using-with]
+            ["git", *self.args, "--stdin", "-z"],
+            cwd=self.toplevel,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+            env={**os.environ, "GIT_FLUSH": "1"},
+        )
+
+    @staticmethod
+    def _write(proc: subprocess.Popen, paths: Sequence[str]) -> None:
+        try:
+            for path in paths:
+                proc.stdin.write(path.encode("utf-8", "surrogateescape") + b"\0")  # type: ignore[union-attr]
+            proc.stdin.flush()  # type: ignore[union-attr]
+        except (BrokenPipeError, ValueError):
+            pass
+
+    def _error(self, proc: subprocess.Popen) -> git.exc.GitCommandError:
+        status = proc.wait()
+        self._stderr.seek(0)  # type: ignore[union-attr]
+        stderr = self._stderr.read().decode("utf-8", "replace")  # type: ignore[union-attr]
+        return git.exc.GitCommandError(["git", *self.args, "--stdin", "-z"], status, stderr)
+
+
+atexit.register(GitBatchQuery.close_all)
+
+
+def find_git_dir(dir_: str) -> tuple[str, str] | None:
+    """Top level and git dir of the repo containing <dir_>, found without git by looking for '.git' in <dir_> and its
+    parents, or None if there is no such repo or git would be pointed elsewhere by GIT_DIR or GIT_WORK_TREE"""
+    if "GIT_DIR" in os.environ or "GIT_WORK_TREE" in os.environ:
+        return None
+    path = os.path.realpath(dir_)
+    while True:
+        dot_git = os.path.join(path, ".git")
+        if os.path.isdir(dot_git):
+            return path, dot_git
+        if os.path.isfile(dot_git):
+            #### worktrees and submodules have a '.git' file of 'gitdir: <git dir>'
+            with open(dot_git, encoding="utf-8") as f:
+                content = f.read().strip()
+            if not content.startswith("gitdir: "):
+                return None
+            return path, os.path.normpath(os.path.join(path, content[len("gitdir: ") :]))
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+GIT_INDEX_STAT_SIZE = 40
+GIT_INDEX_EXTENDED = 0x4000
+GIT_INDEX_INTENT_TO_ADD = 0x2000
+GIT_OID_SIZE = 20
+
+
+class GitIndex:
+    """Entries of a repo's index file read without git from an mmap of its DIRC format, versions 2 to 4.
+
+    Entry i is the path <paths>[i], relative to <toplevel> and '/' separated, and entries are sorted by path then
+    stage as in the index. The stat data git recorded for each entry is kept in compact arrays of one item per entry,
+    as are the object ids, concatenated in <oids>, and the stage flags, being 0 for merged entries and 1 to 3 for each
+    side of a conflict. Valid trees of the cache tree extension are kept by dir path in <tree_cache>, with '' being
+    the root.
+
+    Indexes git writes without SHA-1, split indexes and sparse indexes are not supported.
+
+    Attributes:
+        toplevel: Top level directory of the repo
+        path: Path of the index file
+    """
+
+    STAT_FIELDS = ("ctime_s", "ctime_ns", "mtime_s", "mtime_ns", "dev", "ino", "mode", "uid", "gid", "size")
+
+    _indexes: dict[str, tuple[tuple[int, ...], GitIndex]] = {}
+
+    def __init__(self, toplevel: str, path: str) -> None:
+        self.toplevel = toplevel
+        self.path = path
+        self.paths: list[str] = []
+        self.oids = b""
+        self.stages = array.array("B")
+        self.ext_flags = array.array("H")
+        self.tree_cache: dict[str, bytes] = {}
+        self._dirs: dict[str, tuple[set[str], set[str]]] | None = None
+        for field in self.STAT_FIELDS:
+            setattr(self, field, array.array("I"))
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            self._parse(data)
+
+    @classmethod
+    def get(cls, dir_: str) -> GitIndex | None:
+        """GitIndex of the repo containing <dir_>, parsed again only when its index file changes, or None if the index
+        cannot be read without git
+
+        Index files that are missing, corrupt or unsupported give None rather than raising so that callers can fall back
+        to asking git.
+        """
+        dirs = find_git_dir(dir_)
+        if dirs is None or "GIT_INDEX_FILE" in os.environ:
+            return None
+        path = os.path.join(dirs[1], "index")
+        try:
+            st = os.stat(path)
+            key = (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+            if path not in cls._indexes or cls._indexes[path][0] != key:
+                cls._indexes[path] = (key, cls(dirs[0], path))
+        except (OSError, ValueError, IndexError, struct.error) as exc:
+            logger.debug(f"could not read git index {path!r}: {exc}")
+            return None
+        return cls._indexes[path][1]
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def oid(self, i: int) -> bytes:
+        """Object id of entry <i>"""
+        return self.oids[i * GIT_OID_SIZE : (i + 1) * GIT_OID_SIZE]
+
+    def dirs(self) -> dict[str, tuple[set[str], set[str]]]:
+        """Names of the entries and of the dirs holding entries within each dir holding entries, by dir path with ''
+        being the top level"""
+        if self._dirs is None:
+            self._dirs = {"": (set(), set())}
+            for path in self.paths:
+                dir_, _, name = path.rpartition("/")
+                if dir_ in self._dirs:
+                    self._dirs[dir_][0].add(name)
+                    continue
+                self._dirs[dir_] = ({name}, set())
+                #### add the new dir to its parents up to the first that was already known
+                while dir_:
+                    parent, _, name = dir_.rpartition("/")
+                    known = parent in self._dirs
+                    self._dirs.setdefault(parent, (set(), set()))[1].add(name)
+                    if known:
+                        break
+                    dir_ = parent
+        return self._dirs
+
+    def tracked(self, prefix: str = "") -> list[str]:
+        """Paths of the entries within the dir <prefix> relative to <toplevel>, once each like `git ls-files`"""
+        prefix = f"{prefix}/" if prefix else ""
+        return [p for p in dict.fromkeys(self.paths) if p.startswith(prefix)]
+
+    def staged(self, prefix: str = "") -> list[str]:
+        """Paths within the dir <prefix> of the entries that differ from HEAD, like `git diff --cached --name-only`
+
+        HEAD's trees are read from the object database by gitdb rather than git, skipping each tree that the cache tree
+        records as unchanged along with every entry within it.
+        """
+        repo = git.Repo(self.toplevel)
+        odb = gitdb.GitDB(os.path.join(repo.common_dir, "objects"))
+        try:
+            commit_head = odb.stream(repo.head.commit.binsha).read()
+            #### the first line of a commit is 'tree <hex object id>'
+            tree_head = bytes.fromhex(commit_head.split(b"\n", 1)[0].split(b" ")[1].decode())
+        except ValueError:
+            #### no commit yet so all entries are staged
+            tree_head = None
+        #### blobs of HEAD within trees that are not unchanged in the index
+        blobs_head: dict[str, tuple[bytes, int]] = {}
+        trees_unchanged = set()
+        trees = [("", tree_head)] if tree_head is not None else []
+        while trees:
+            tree, oid = trees.pop()
+            if self.tree_cache.get(tree) == oid:
+                trees_unchanged.add(tree)
+                continue
+            for oid_entry, mode, name in _git_tree_entries(odb.stream(oid).read()):
+                path = f"{tree}/{name}" if tree else name
+                if mode >> 12 == 0o04:
+                    trees.append((path, oid_entry))
+                else:
+                    blobs_head[path] = (oid_entry, mode)
+        repo.close()
+        if "" in trees_unchanged:
+            return []
+        #### an entry is unchanged if it or one of its parents is within an unchanged tree
+        dirs_unchanged: dict[str, bool] = {}
+
+        def is_unchanged(dir_: str) -> bool:
+            if dir_ not in dirs_unchanged:
+                dirs_unchanged[dir_] = dir_ in trees_unchanged or (dir_ != "" and is_unchanged(dir_.rpartition("/")[0]))
+            return dirs_unchanged[dir_]
+
+        staged = {}
+        dir_last = None
+        for i, path in enumerate(self.paths):
+            #### entries are sorted by path so those of a dir are consecutive
+            dir_ = path.rpartition("/")[0]
+            if dir_ != dir_last:
+                dir_last = dir_
+                dir_unchanged = is_unchanged(dir_)
+            if dir_unchanged or self.ext_flags[i] & GIT_INDEX_INTENT_TO_ADD:
+                continue
+            blob_head = blobs_head.pop(path, None)
+            if self.stages[i] or blob_head != (self.oid(i), self.mode[i]):  # type: ignore[attr-defined]
+                staged[path] = None
+        #### blobs of HEAD left without an entry are deleted from the index
+        prefix = f"{prefix}/" if prefix else ""
+        return sorted(p for p in itertools.chain(staged, blobs_head) if p.startswith(prefix))
+
+    def _parse(self, data: mmap.mmap) -> None:
+        if data[:4] != b"DIRC":
+            raise ValueError("not a git index")
+        checksum = data[-GIT_OID_SIZE:]
+        if checksum != bytes(GIT_OID_SIZE) and checksum != hashlib.sha1(data[:-GIT_OID_SIZE]).digest():
+            raise ValueError("git index checksum mismatch, it may not use SHA-1")
+        version, count = struct.unpack_from(">II", data, 4)
+        if version not in (2, 3, 4):
+            raise ValueError(f"git index version {version} is not supported")
+        #### the fixed size fields of each entry are sliced out whole and converted once all entries are read
+        stats = []
+        oids = []
+        flags = array.array("H")
+        ext_flags = self.ext_flags
+        names = []
+        pos = 12
+        name = b""
+        for _ in range(count):
+            start = pos
+            pos += GIT_INDEX_STAT_SIZE
+            stats.append(data[start:pos])
+            oids.append(data[pos : pos + GIT_OID_SIZE])
+            pos += GIT_OID_SIZE
+            flag = data[pos] << 8 | data[pos + 1]
+            flags.append(flag)
+            pos += 2
+            if flag & GIT_INDEX_EXTENDED:
+                ext_flags.append(data[pos] << 8 | data[pos + 1])
+                pos += 2
+            else:
+                ext_flags.append(0)
+            if version == 4:
+                #### v4 paths drop the given number of bytes from the end of the previous path then append the rest
+                strip, pos = _git_index_varint(data, pos)
+                end = data.find(b"\0", pos)
+                name = name[: len(name) - strip] + data[pos:end]
+                names.append(name)
+                pos = end + 1
+            else:
+                #### v2 and v3 entries are padded with 1 to 8 NULs to a multiple of 8 bytes
+                end = data.find(b"\0", pos)
+                names.append(data[pos:end])
+                pos = start + ((end - start + 8) & ~7)
+        if names:
+            self.paths = b"\0".join(names).decode("utf-8", "surrogateescape").split("\0")
+        stats = array.array("I", b"".join(stats))
+        if sys.byteorder == "little":
+            stats.byteswap()
+        for i, field in enumerate(self.STAT_FIELDS):
+            setattr(self, field, stats[i :: len(self.STAT_FIELDS)])
+        if any(mode >> 12 == 0o04 for mode in self.mode):  # type: ignore[attr-defined]
+            raise ValueError("sparse git indexes are not supported")
+        self.oids = b"".join(oids)
+        self.stages = array.array("B", (flag >> 12 & 0x3 for flag in flags))
+        #### extensions
+        while pos < len(data) - GIT_OID_SIZE:
+            signature, size = struct.unpack_from(">4sI", data, pos)
+            pos += 8
+            if signature == b"link":
+                raise ValueError("split git indexes are not supported")
+            if signature == b"TREE":
+                self._parse_tree_cache(data, pos, "")
+            pos += size
+
+    def _parse_tree_cache(self, data: mmap.mmap, pos: int, parent: str) -> int:
+        """Parse the tree at <pos> of the cache tree extension and its subtrees, returning the position after them"""
+        end = data.find(b"\0", pos)
+        name = data[pos:end].decode("utf-8", "surrogateescape")
+        tree = f"{parent}/{name}" if parent else name
+        pos = data.find(b"\n", end)
+        entry_count, subtree_count = map(int, data[end + 1 : pos].split())
+        pos += 1
+        #### trees invalidated since the cache tree was written have an entry count of -1 and no object id
+        if entry_count >= 0:
+            self.tree_cache[tree] = data[pos : pos + GIT_OID_SIZE]
+            pos += GIT_OID_SIZE
+        for _ in range(subtree_count):
+            pos = self._parse_tree_cache(data, pos, tree)
+        return pos
+
+
+def _git_tree_entries(data: bytes) -> Iterator[tuple[bytes, int, str]]:
+    """Object id, mode and name of each entry of the tree object <data>, each being '<octal mode> <name>\\0<oid>'"""
+    pos = 0
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        end = data.index(b"\0", space)
+        mode = int(data[pos:space], 8)
+        name = data[space + 1 : end].decode("utf-8", "surrogateescape")
+        pos = end + 1 + GIT_OID_SIZE
+        yield data[end + 1 : pos], mode, name
+
+
+def _git_index_varint(data: mmap.mmap, pos: int) -> tuple[int, int]:
+    """Decode the offset varint of git at <pos>, returning it and the position after it"""
+    byte = data[pos]
+    value = byte & 0x7F
+    while byte & 0x80:
+        pos += 1
+        byte = data[pos]
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, pos + 1
+
+
 ####
 #### Repo modifying operations
 ####
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+#
+# Benchmarks the eol check of path_utils.open_unix_safely against its previous tmp file rewrite and compare, and
+# path_utils.file_as_eol_lf against its previous 4KiB chunked normalizer
+#
+# usage
+#   * python -m utils.path_utils.bench_path_utils
+#       * times both checks on LF-only files and both normalizers on CRLF files of 1MB, 100MB and 1GB in a tmp dir
+#   * python -m utils.path_utils.bench_path_utils --sizes 1000000 --dir /mnt/disk
+#       * the legacy check writes a full copy of each file to the system tmp dir
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from collections.abc import Sequence
+
+from utils import path_utils
+
+
+def legacy_is_file_eol_lf(path: str, chunk_size: int = 4096) -> bool:
+    """The check open_unix_safely did before is_file_eol_lf: rewrite the file to a tmp file then compare both."""
+    with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
+        try:
+            path_utils.file_as_eol_lf(path, tmp_file.name, chunk_size)
+            return path_utils.is_file_content_equal(path, tmp_file.name, chunk_size)  # type: ignore[no-any-return]
+        finally:
+            os.unlink(tmp_file.name)
+
+
+def legacy_file_as_eol_lf(src_file: str, dst_file: str, chunk_size: int = 4096) -> None:
+    """The normalizer file_as_eol_lf used before reading into a reused buffer: three replaces per 4KiB chunk."""
+    with open(src_file, "rb") as src, open(dst_file, "wb") as tgt:
+        previous_end_cr = False
+        while chunk := src.read(chunk_size):
+            if previous_end_cr and chunk.startswith(b"\n"):
+                chunk = chunk[1:]
+            previous_end_cr = chunk.endswith(b"\r")
+            tgt.write(path_utils.replace_eol_bin(chunk, b"\n"))
+
+
+def write_lf_file(path: str, size: int, eol: bytes = b"\n") -> None:
+    line = b"".join(bytes([ord("a") + i % 26]) for i in range(80 - len(eol))) + eol
+    block = line * (2**20 // len(line) + 1)
+    with open(path, "wb") as f:
+        for _ in range(size // len(block)):
+            f.write(block)
+        f.write(block[: size % len(block)])
+
+
+def time_call(func: Callable, *args) -> tuple[float, bool]:
+    start = time.perf_counter()
+    out = func(*args)
+    return time.perf_counter() - start, out
+
+
+def parse_inputs(argparse_args: Sequence[str] | None = None) -> dict:
+    """Parse cmd line inputs; set, check, and fix script's default variables."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=[10**6, 10**8, 10**9], nargs="+", type=int, help="file sizes in bytes")
+    parser.add_argument("--dir", default=None, help="dir to write the benchmarked files into")
+    return dict(parser.parse_args(argparse_args).__dict__.items())
+
+
+def main(argparse_args: Sequence[str] | None = None) -> None:
+    args = parse_inputs(argparse_args)
+    with tempfile.TemporaryDirectory(dir=args["dir"]) as tmp_dir:
+        for size in args["sizes"]:
+            path = os.path.join(tmp_dir, f"lf_{size}.txt")
+            write_lf_file(path, size)
+            legacy_s, legacy_out = time_call(legacy_is_file_eol_lf, path)
+            scan_s, scan_out = time_call(path_utils.is_file_eol_lf, path)
+            assert legacy_out == scan_out, (legacy_out, scan_out)
+            print(
+                f"INFO: size={size}; legacy check={legacy_s:.3f}s; is_file_eol_lf={scan_s:.3f}s "
+                f"({size / scan_s / 2**20:.0f}MiB/s); speedup={legacy_s / scan_s:.1f}x",
+            )
+            write_lf_file(path, size, b"\r\n")
+            legacy_s, _ = time_call(legacy_file_as_eol_lf, path, path + ".legacy")
+            normalize_s, _ = time_call(path_utils.file_as_eol_lf, path, path + ".lf")
+            assert path_utils.is_file_content_equal(path + ".legacy", path + ".lf")
+            print(
+                f"INFO: size={size}; legacy normalize={legacy_s:.3f}s; file_as_eol_lf={normalize_s:.3f}s "
+                f"({size / normalize_s / 2**20:.0f}MiB/s); speedup={legacy_s / normalize_s:.1f}x",
+            )
+            for p in (path, path + ".legacy", path + ".lf"):
+                os.remove(p)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,30 @@
 #       * adding this to a python file allows usage of functions as path_utils.func()
 #
 # author: acegene <acegene22@gmail.com>
+from __future__ import annotations
+
+import concurrent.futures
+import contextlib
 import errno
+import hashlib
+import itertools
+import json
 import logging
+import mmap
 import os
 import pathlib
 import re
 import shutil
+import stat
+import sys
 import tempfile
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
 from collections.abc import Sequence
 from typing import Any
 from typing import BinaryIO
@@ -30,6 +46,13 @@
 
 logger = logging.getLogger(__name__)
 
+MV_MULTI_COPY_WORKERS = 4
+MV_COPY_CHUNK_SIZE = 2**23
+#### errnos of kernel copies that are unsupported for the given files, so the next copy method is tried
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
+MV_PROGRESS_INTERVAL_S = 0.5
+PATH_CLEAN_DIR_CACHE_MAX_SIZE = 2**12
+
 
 def generate_tmp_from_path(path: str):
     """Generate and return temporary unique pathname from <path>
@@ -46,11 +69,23 @@ def generate_tmp_from_path(path: str):
     return f"{path}.{copy_id}.tmp"
 
 
-def is_filesystem_case_sensitive(dir_: str = ".") -> bool:
+def case_sensitivity_cache_path() -> str:
+    """Path of the answers of is_filesystem_case_sensitive kept across runs, under $XDG_CACHE_HOME or ~/.cache"""
+    cache_dir = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache_dir, "path_utils", "case_sensitivity.json")
+
+
+def is_filesystem_case_sensitive(dir_: str = ".", persist: bool = False) -> bool:
     """Check whether <dir_> is part of a case sensitive filesystem.
 
+    Answers are cached per filesystem, identified by _filesystem_key, so that each filesystem is probed once: first
+    by looking up an existing name in <dir_> or its path with its case swapped, then if no name has cased letters by
+    creating a tmp file in <dir_>. With <persist> answers are also kept across runs in case_sensitivity_cache_path(),
+    so a CLI can persist the answer for its filesystems before calling e.g. mv, which then reuses it.
+
     Args:
         dir_: Directory that is being tested for case sensitivity
+        persist: Read and write the answers cached across runs
 
     Returns:
         True if filesystem for <dir_> is case sensitive
@@ -59,17 +94,117 @@ def is_filesystem_case_sensitive(dir_: str = ".") -> bool:
         https://stackoverflow.com/a/36580834/10630957
 
     Warnings:
-        Requires write access to <dir_>
+        Requires write access to <dir_> if neither <dir_> nor its entries have a cased letter
+        Directories with their own case sensitivity, e.g. ext4 casefold dirs, share the answer of their filesystem
     """
     try:
         return is_filesystem_case_sensitive.case_sensitive_dir_dict[dir_]  # type: ignore[attr-defined, no-any-return]
     except AttributeError:
         setattr(is_filesystem_case_sensitive, "case_sensitive_dir_dict", {})
+        setattr(is_filesystem_case_sensitive, "case_sensitive_fs_dict", {})
+        setattr(is_filesystem_case_sensitive, "fs_key_dict", {})
     except KeyError:
         pass
+    # pylint: disable=[no-member]
+    case_sensitive_dir_dict = is_filesystem_case_sensitive.case_sensitive_dir_dict  # type: ignore[attr-defined]
+    case_sensitive_fs_dict = is_filesystem_case_sensitive.case_sensitive_fs_dict  # type: ignore[attr-defined]
+    fs_key_dict = is_filesystem_case_sensitive.fs_key_dict  # type: ignore[attr-defined]
+    st_dev = os.stat(dir_).st_dev
+    if st_dev not in fs_key_dict:
+        fs_key_dict[st_dev] = _filesystem_key(dir_, st_dev)
+    fs_key = fs_key_dict[st_dev]
+    if fs_key not in case_sensitive_fs_dict and persist:
+        case_sensitive_fs_dict.update(_case_sensitivity_cache_load())
+    if fs_key not in case_sensitive_fs_dict:
+        case_sensitive_fs_dict[fs_key] = _probe_case_sensitive(dir_)
+        if persist:
+            _case_sensitivity_cache_store(fs_key, case_sensitive_fs_dict[fs_key])
+    case_sensitive_dir_dict[dir_] = case_sensitive_fs_dict[fs_key]
+    return case_sensitive_dir_dict[dir_]  # type: ignore[no-any-return]
+
+
+def is_filesystem_case_sensitive_cache_clear(persisted: bool = False) -> None:
+    """Forget the answers of is_filesystem_case_sensitive, including those kept across runs if <persisted>."""
+    for attr in ("case_sensitive_dir_dict", "case_sensitive_fs_dict", "fs_key_dict"):
+        if hasattr(is_filesystem_case_sensitive, attr):
+            getattr(is_filesystem_case_sensitive, attr).clear()
+    if persisted:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(case_sensitivity_cache_path())
+
+
+def _filesystem_key(dir_: str, st_dev: int) -> str:
+    """Identify the filesystem of <dir_> across runs by its device, mount point, type and source.
+
+    The mount is looked up in /proc/self/mountinfo, picking the mount point of <st_dev> closest to <dir_> in case of
+    bind mounts. Elsewhere the mount point is found by walking up from <dir_> until the device changes.
+    """
+    path = os.path.realpath(dir_)
+    with contextlib.suppress(OSError, IndexError, ValueError):
+        with open("/proc/self/mountinfo", encoding="utf-8") as f:
+            mounts = []
+            for line in f:
+                fields, _sep, fs_fields = line.partition(" - ")
+                fields_split = fields.split()
+                major, minor = fields_split[2].split(":")
+                if os.makedev(int(major), int(minor)) == st_dev:
+                    #### mountinfo escapes spaces, tabs, newlines and backslashes as octal
+                    mount_point = re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields_split[4])
+                    mounts.append((mount_point, *fs_fields.split()[:2]))
+            mounts.sort(key=lambda mount: len(mount[0]), reverse=True)
+            for mount_point, fs_type, source in mounts:
+                if os.path.join(path, "").startswith(os.path.join(mount_point, "")):
+                    return f"{st_dev} {mount_point} {fs_type} {source}"
+    while (parent := os.path.dirname(path)) != path and os.stat(parent).st_dev == st_dev:
+        path = parent
+    return f"{st_dev} {path}"
+
+
+def _probe_case_sensitive(dir_: str) -> bool:
+    """Whether <dir_> is case sensitive, preferably found by looking up an existing name with its case swapped."""
+    path = os.path.realpath(dir_)
+    with os.scandir(path) as entries:
+        names = [entry.name for entry in itertools.islice(entries, 64)]
+    #### the name of <path> is looked up in its parent, which is another filesystem if <path> is a mount point
+    paths = [os.path.join(path, name) for name in names] + ([] if os.path.ismount(path) else [path])
+    for path_name in paths:
+        dir_name, name = os.path.split(path_name)
+        #### names like "straße" do not swap back to themselves, so their swapped case is not a case fold of them
+        if name.swapcase() != name and name.swapcase().swapcase() == name:
+            name_stat = os.lstat(path_name)
+            try:
+                swapped_stat = os.lstat(os.path.join(dir_name, name.swapcase()))
+            except FileNotFoundError:
+                return True
+            return (name_stat.st_dev, name_stat.st_ino) != (swapped_stat.st_dev, swapped_stat.st_ino)
     with tempfile.NamedTemporaryFile(prefix="TmP", dir=dir_) as tmp_file:
-        is_filesystem_case_sensitive.case_sensitive_dir_dict[dir_] = not os.path.exists(tmp_file.name.lower())  # type: ignore[attr-defined] # pylint: disable=[no-member]
-        return is_filesystem_case_sensitive.case_sensitive_dir_dict[dir_]  # type: ignore[attr-defined, no-any-return] # pylint: disable=[no-member]
+        return not os.path.exists(tmp_file.name.lower())
+
+
+def _case_sensitivity_cache_load() -> dict[str, bool]:
+    try:
+        with open(case_sensitivity_cache_path(), encoding="utf-8") as f:
+            cache = json.load(f)
+        return {k: v for k, v in cache.items() if isinstance(v, bool)}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def _case_sensitivity_cache_store(fs_key: str, case_sensitive: bool) -> None:
+    """Add <fs_key> to case_sensitivity_cache_path(), replacing the file atomically; failures to write are ignored."""
+    cache = {**_case_sensitivity_cache_load(), fs_key: case_sensitive}
+    cache_path = case_sensitivity_cache_path()
+    with contextlib.suppress(OSError):
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = generate_tmp_from_path(cache_path)
+        try:
+            with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+                json.dump(cache, f, indent=2, sort_keys=True)
+                f.write("\n")
+            os.replace(tmp_path, cache_path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
 
 
 def _mv_raise_if_paths_not_correct_status(src: str, dst: str, overwrite: bool = False) -> None:
@@ -91,7 +226,106 @@ def _mv_raise_if_paths_not_correct_status(src: str, dst: str, overwrite: bool =
         raise NotADirectoryError(f"Directory '{dir_dst}' for '{dst}' aka <dst> does not exist!")
 
 
-def mv(src: str, dst: str, /, ignore_locks: bool = False, overwrite: bool = False) -> None:
+class MvProgress:
+    """Counters of the bytes and files moved by mv, mv_multi, RenamePlan.execute and cp, passed to <callback>.
+
+    <callback> is called from the moving threads at most once every <interval> seconds while bytes are copied, and
+    once more when each call finishes. Renamed files and dirs count as one file of zero bytes; the totals of dirs
+    copied across filesystems are added when their copy starts, so <files_total> and <bytes_total> grow as a batch of
+    moves progresses.
+
+    Attributes:
+        bytes_copied: Bytes copied across filesystems so far
+        bytes_total: Bytes of the files whose copy has started
+        files_done: Files renamed or copied so far
+        files_total: Files whose rename or copy has started
+        finished: Whether the last call to <callback> was made by MvProgress.finish
+    """
+
+    def __init__(self, callback: Callable[[MvProgress], None], interval: float = MV_PROGRESS_INTERVAL_S) -> None:
+        self.callback = callback
+        self.interval = interval
+        self.bytes_copied = 0
+        self.bytes_total = 0
+        self.files_done = 0
+        self.files_total = 0
+        self.finished = False
+        self.start = time.monotonic()
+        self._next_report = self.start + interval
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since this object was created"""
+        return time.monotonic() - self.start
+
+    @property
+    def mb_per_s(self) -> float:
+        """Average MB/s of the bytes copied so far"""
+        elapsed = self.elapsed
+        return self.bytes_copied / elapsed / 10**6 if elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.bytes_copied / 10**6:.1f}/{self.bytes_total / 10**6:.1f} MB; "
+            f"{self.files_done}/{self.files_total} files; {self.elapsed:.1f}s; {self.mb_per_s:.1f} MB/s"
+        )
+
+    def add_total(self, files: int, bytes_: int = 0) -> None:
+        with self._lock:
+            self.files_total += files
+            self.bytes_total += bytes_
+
+    def add_copied(self, bytes_: int) -> None:
+        with self._lock:
+            self.bytes_copied += bytes_
+            self._report_if_due()
+
+    def add_done(self, files: int = 1) -> None:
+        with self._lock:
+            self.files_done += files
+            self._report_if_due()
+
+    def finish(self) -> None:
+        """Call <callback> regardless of <interval>; called when each call moving files returns or raises"""
+        with self._lock:
+            self.finished = True
+            self._next_report = time.monotonic() + self.interval
+            self.callback(self)
+
+    def _report_if_due(self) -> None:
+        now = time.monotonic()
+        if now >= self._next_report:
+            self.finished = False
+            self._next_report = now + self.interval
+            self.callback(self)
+
+
+def print_progress_line(progress: MvProgress, file: TextIO | None = None) -> None:
+    """Callback of MvProgress that rewrites a single progress line on <file>, sys.stderr by default"""
+    file = sys.stderr if file is None else file
+    file.write(f"\rINFO: {progress}" + ("\n" if progress.finished else ""))
+    file.flush()
+
+
+@contextlib.contextmanager
+def _finishing(progress: MvProgress | None):
+    try:
+        yield
+    finally:
+        if progress is not None:
+            progress.finish()
+
+
+def mv(
+    src: str,
+    dst: str,
+    /,
+    ignore_locks: bool = False,
+    overwrite: bool = False,
+    fsync: bool = False,
+    progress: MvProgress | None = None,
+) -> None:
     """Atomically move object <src> to <dst> even across filesystems.
 
     Avoids race conditions with programs that utilize advisory locking system (see LockManager)
@@ -100,6 +334,8 @@ def mv(src: str, dst: str, /, ignore_locks: bool = False, overwrite: bool = Fals
         src: Object to move
         dst: Destination object to move <src> to
         ignore_locks: Useful if locks are managed external to this function
+        fsync: Flush copied files and the directory of <dst> to disk before returning, see _mv_unchecked
+        progress: Counters updated as <src> is moved, see MvProgress
 
     Returns:
         None
@@ -127,104 +363,514 @@ def mv(src: str, dst: str, /, ignore_locks: bool = False, overwrite: bool = Fals
     _mv_raise_if_paths_not_correct_status(src_nrm, dst_nrm, overwrite=overwrite)
     #### lock <src> and <dst> prior to interacting with them to avoid race condition
     lock_files = () if ignore_locks else files_nrm
-    with LockManager(*lock_files):
+    with LockManager(*lock_files), _finishing(progress):
         ### check that a mv <src> to <dst> is possible, redundantly now that locks obtained
         _mv_raise_if_paths_not_correct_status(src_nrm, dst_nrm, overwrite=overwrite)
         #### execute mv
-        try:
-            os.rename(src_nrm, dst_nrm)
-        except OSError as err:
-            if err.errno == errno.EXDEV:
-                #### generate unique ID for <dst_nrm> and assign to <tmp_dst>
-                tmp_dst = generate_tmp_from_path(dst_nrm)
-                #### mv <tmp_dst> <src> # atomic mv, handled differently for files and dirs
-                if os.path.isfile(src):
-                    shutil.copyfile(src_nrm, tmp_dst)
-                    os.rename(tmp_dst, dst_nrm)
-                    os.unlink(src_nrm)
+        _mv_unchecked(src_nrm, dst_nrm, fsync, progress)
+
+
+def _mv_unchecked(src: str, dst: str, fsync: bool = False, progress: MvProgress | None = None) -> None:
+    """Rename <src> to <dst>, copying to a tmp path next to <dst> and renaming that when on different filesystems.
+
+    Files are copied by _copy_file and dirs by _copytree; a failed copy removes its tmp path. With <fsync> the copies
+    and the directory of <dst> are flushed to disk before <src> is removed.
+    """
+    try:
+        os.rename(src, dst)
+        if progress is not None:
+            progress.add_total(1)
+            progress.add_done()
+    except OSError as err:
+        if err.errno == errno.EXDEV:
+            #### generate unique ID for <dst> and assign to <tmp_dst>
+            tmp_dst = generate_tmp_from_path(dst)
+            #### mv <tmp_dst> <src> # atomic mv, handled differently for files and dirs
+            is_file = os.path.isfile(src)
+            try:
+                if is_file:
+                    _copy_file(src, tmp_dst, fsync, progress=progress)
                 else:
-                    shutil.copytree(src_nrm, tmp_dst)
-                    os.rename(tmp_dst, dst_nrm)
-                    shutil.rmtree(src_nrm)
-            else:
+                    _copytree(src, tmp_dst, fsync, progress)
+            except BaseException:
+                if is_file:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(tmp_dst)
+                else:
+                    shutil.rmtree(tmp_dst, ignore_errors=True)
                 raise
+            os.rename(tmp_dst, dst)
+            if fsync:
+                _fsync_dir(os.path.dirname(dst))
+            if is_file:
+                os.unlink(src)
+            else:
+                shutil.rmtree(src)
+        else:
+            raise
+
+
+def _copy_file(
+    src: str,
+    dst: str,
+    fsync: bool = False,
+    copy_stat: bool = False,
+    progress: MvProgress | None = None,
+    counted: bool = False,
+) -> None:
+    """Copy the content of <src> to <dst>, and its metadata if <copy_stat>, flushing <dst> to disk if <fsync>.
+
+    <dst> is preallocated with posix_fallocate and filled by the first of os.copy_file_range, os.sendfile and reads
+    into a reused buffer that the filesystems support. The size of <src> is added to the totals of <progress> unless
+    <counted>, i.e. already added by _copytree.
+    """
+    with open(src, "rb") as src_f, open(dst, "wb") as dst_f:
+        src_fd = src_f.fileno()
+        dst_fd = dst_f.fileno()
+        size = os.fstat(src_fd).st_size
+        if progress is not None and not counted:
+            progress.add_total(1, size)
+        if size and hasattr(os, "posix_fallocate"):
+            with contextlib.suppress(OSError):
+                os.posix_fallocate(dst_fd, 0, size)
+        copied = 0
+        for copy_func in (
+            lambda offset: os.copy_file_range(src_fd, dst_fd, MV_COPY_CHUNK_SIZE, offset, offset),
+            lambda offset: os.sendfile(dst_fd, src_fd, offset, MV_COPY_CHUNK_SIZE),
+        ):
+            os.lseek(dst_fd, copied, os.SEEK_SET)
+            try:
+                while num_copied := copy_func(copied):
+                    copied += num_copied
+                    if progress is not None:
+                        progress.add_copied(num_copied)
+                break
+            except (AttributeError, OSError) as err:
+                if isinstance(err, OSError) and err.errno not in _COPY_FALLBACK_ERRNOS:
+                    raise
+        else:
+            #### neither is supported between these fds so read into a reused buffer
+            src_f.seek(copied)
+            dst_f.seek(copied)
+            buf = bytearray(MV_COPY_CHUNK_SIZE)
+            view = memoryview(buf)
+            while num_read := src_f.readinto(buf):
+                dst_f.write(view[:num_read])
+                copied += num_read
+                if progress is not None:
+                    progress.add_copied(num_read)
+            dst_f.flush()
+        #### <src> may have shrunk since <dst> was preallocated
+        if copied != size:
+            dst_f.truncate(copied)
+        if fsync:
+            os.fsync(dst_fd)
+    if copy_stat:
+        shutil.copystat(src, dst)
+    if progress is not None:
+        progress.add_done()
+
+
+def _copytree(src: str, dst: str, fsync: bool = False, progress: MvProgress | None = None) -> None:
+    """shutil.copytree <src> to <dst> with the files copied by _copy_file in MV_MULTI_COPY_WORKERS threads."""
+    if progress is not None:
+        for dir_, _dirs, files in os.walk(src):
+            progress.add_total(len(files), sum(os.lstat(os.path.join(dir_, f)).st_size for f in files))
+    with concurrent.futures.ThreadPoolExecutor(MV_MULTI_COPY_WORKERS) as executor:
+        futures = []
+
+        def copy_function(src_file: str, dst_file: str) -> str:
+            #### create <dst_file> now so that copytree's copystat of its directory is not undone by the thread
+            open(dst_file, "xb").close()  # pylint: disable=[consider-using-with]
+            futures.append(executor.submit(_copy_file, src_file, dst_file, fsync, True, progress, True))
+            return dst_file
+
+        shutil.copytree(src, dst, copy_function=copy_function)
+        for future in futures:
+            future.result()
+    if fsync:
+        for dir_, _dirs, _files in os.walk(dst):
+            _fsync_dir(dir_)
+
+
+def _fsync_dir(dir_: str) -> None:
+    """Flush the entries of <dir_> to disk where directories can be opened, i.e. not on windows."""
+    with contextlib.suppress(OSError):
+        dir_fd = os.open(dir_, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def cp(src: str, dst: str, /, fsync: bool = False, progress: MvProgress | None = None) -> None:
+    """Copy file or dir <src> to <dst> along with its metadata, as shutil.copy2 or shutil.copytree would.
+
+    Files are copied as by mv across filesystems, see _copy_file and _copytree.
+
+    Args:
+        src: Object to copy
+        dst: Destination object to copy <src> to, overwritten if <src> is a file
+        fsync: Flush <dst> to disk before returning
+        progress: Counters updated as <src> is copied, see MvProgress
+    """
+    with _finishing(progress):
+        if os.path.isdir(src):
+            _copytree(src, dst, fsync, progress)
+        else:
+            _copy_file(src, dst, fsync, copy_stat=True, progress=progress)
 
 
-def mv_multi(srcs: Sequence[str], dsts: Sequence[str]) -> None:
+def mv_multi(
+    srcs: Sequence[str],
+    dsts: Sequence[str],
+    fsync: bool = False,
+    progress: MvProgress | None = None,
+) -> None:
     """Move objects <srcs> to <dsts> even across filesystems.
 
+    Each path and each parent directory is stat'd once and <dsts> that already exist are matched to <srcs> through
+    the (st_dev, st_ino) of their directory and their name, so a hardlink of a src is not one of <srcs>. <srcs> are
+    first moved to tmp paths next to their <dsts>, renaming those on the same device in one loop while copying those
+    on other devices with a pool of MV_MULTI_COPY_WORKERS threads, and the tmp paths are then renamed to <dsts>, so
+    <dsts> may be other <srcs> e.g. when swapping names. If any of these raises, every completed move is undone.
+
     Args:
         srcs: Objects to move
         dsts: Destination objects to move <srcs> to
+        fsync: Flush copied files and the directories of <dsts> to disk before returning, see _mv_unchecked
+        progress: Counters updated as <srcs> are moved, see MvProgress
 
     Returns:
         None
 
     Raises:
         FileNotFoundError: if not all([os.path.exists(src) for src in <srcs>])
-        FileExistsError: if any([os.path.exists(dst) for dst in <dsts> if os.path.samefile(src, dst) for src in <srcs>])
+        FileExistsError: if any([os.path.exists(dst) for dst in <dsts> if dst not in <srcs>])
         PermissionError: if the lock for any file in <srcs> or <dsts> cannot be acquired
         ValueError: if len(<srcs>) != len(<dsts>) or all elements of <srcs> or <dsts> are not unique
     """
     # pylint: disable=[too-many-branches,too-many-statements]
+
+    #### local funcs
+    def stat_or_none(path: str) -> os.stat_result | None:
+        try:
+            return os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def dir_stat(path: str) -> os.stat_result | None:
+        """Stat of the directory of <path>, or None if it is not a directory; cached in <dir_stats>."""
+        dir_ = os.path.dirname(path)
+        if dir_ not in dir_stats:
+            st = stat_or_none(dir_)
+            dir_stats[dir_] = st if st is not None and stat.S_ISDIR(st.st_mode) else None
+        return dir_stats[dir_]
+
+    def entry_key(path: str) -> tuple[int, int, str]:
+        """Identify the entry of <path> in its existing directory, so hardlinks of the same file are different."""
+        dir_st = dir_stat(path)
+        assert dir_st is not None, path
+        name = os.path.basename(path)
+        return (
+            dir_st.st_dev,
+            dir_st.st_ino,
+            name if is_filesystem_case_sensitive(os.path.dirname(path)) else name.lower(),
+        )
+
     #### ensure <srcs> and <dsts> are the same length
     if len(srcs) != len(dsts):
         raise ValueError("Inputs <srcs> and <dsts> should have the same length!")
     #### normalize inputs
     srcs_nrm = tuple(path_clean(src) for src in srcs)
     dsts_nrm = tuple(path_clean(dst) for dst in dsts)
-    #### remove duplicates from <srcs> # TODO: handle when dirname does not exist
-    srcs_unique = set()
-    for src in srcs_nrm:
-        dir_src = os.path.dirname(src)
-        if not os.path.isdir(dir_src):
-            raise NotADirectoryError(f"Directory for '{src}' from <srcs> does not exist!")
-        srcs_unique.add(src if is_filesystem_case_sensitive(dir_src) else src.lower())
-    #### remove duplicates from <dsts>
-    dsts_unique = set()
-    for dst in dsts_nrm:
-        dir_dst = os.path.dirname(dst)
-        if not os.path.isdir(dir_dst):
-            raise NotADirectoryError(f"Directory for '{dst}' from <dsts> does not exist!")
-        dsts_unique.add(dst if is_filesystem_case_sensitive(dir_dst) else dst.lower())
+    dir_stats: dict[str, os.stat_result | None] = {}
     #### all of <srcs> and <dsts> must be unique
-    if len(srcs_nrm) != len(srcs_unique):
-        raise ValueError(f"All <srcs> values should be unique! {srcs}")
-    if len(dsts_nrm) != len(dsts_unique):
-        raise ValueError(f"All <dsts> values should be unique! {dsts}")
+    for paths_nrm, paths, name in ((srcs_nrm, srcs, "srcs"), (dsts_nrm, dsts, "dsts")):
+        paths_unique = set()
+        for path in paths_nrm:
+            if dir_stat(path) is None:
+                raise NotADirectoryError(f"Directory for '{path}' from <{name}> does not exist!")
+            paths_unique.add(path if is_filesystem_case_sensitive(os.path.dirname(path)) else path.lower())
+        if len(paths_nrm) != len(paths_unique):
+            raise ValueError(f"All <{name}> values should be unique! {paths}")
     #### lock <srcs> and <dsts> prior to interacting with them to avoid race condition
-    with LockManager(*set.union(set(srcs_nrm), set(dsts_nrm))):
+    with LockManager(*set.union(set(srcs_nrm), set(dsts_nrm))), _finishing(progress):
+        dir_stats.clear()
         #### check that a mv_multi <srcs> to <dsts> is possible
         ## all of <srcs> must exist
+        src_stats = []
         for src in srcs_nrm:
-            if not os.path.exists(src):
-                if os.path.exists(os.path.dirname(src)):
+            src_stat = stat_or_none(src)
+            if src_stat is None:
+                if dir_stat(src) is not None:
                     raise FileNotFoundError(f"File or directory '{src}' from <srcs> does not exist!")
-                # redundantly verifying if dir exists
                 raise NotADirectoryError(f"Directory '{src}' from <srcs> does not exist!")
-        ## all of <dsts> must not exist unless also part of <srcs>
+            src_stats.append(src_stat)
+        ## all of <dsts> must not exist unless also part of <srcs>, i.e. the same entry of the same dir
+        src_entries = {entry_key(src) for src in srcs_nrm}
         for dst in dsts_nrm:
-            if os.path.exists(dst):
-                if not any(os.path.samefile(src, dst) for src in srcs_nrm):
-                    if os.path.isfile(dst):
+            dst_stat = stat_or_none(dst)
+            if dst_stat is not None:
+                if entry_key(dst) not in src_entries:
+                    if stat.S_ISREG(dst_stat.st_mode):
                         raise FileExistsError(f"File '{dst}' from <dsts> should not exist!")
                     raise FileExistsError(f"Directory '{dst}' from <dsts> should not exist!")
-            else:  # redundantly verifying if dir exists
-                if not os.path.exists(os.path.dirname(dst)):
-                    raise NotADirectoryError(f"Directory '{dst}' from <dsts> does not exist!")
+            elif dir_stat(dst) is None:
+                raise NotADirectoryError(f"Directory '{dst}' from <dsts> does not exist!")
         #### execute mv_multi
-        ## generate <tmp_dsts> from <dsts_nrm>
-        tmp_dsts = [generate_tmp_from_path(dst) for dst in dsts_nrm]
-        ## perform mv(srcs, tmp_dsts)
-        for src, tmp_dst, dst in zip(srcs_nrm, tmp_dsts, dsts_nrm):
-            if os.path.exists(dst):
-                continue  # TODO: should this happen?
-            mv(src, tmp_dst, ignore_locks=True)
-        ## perform mv(tmp_dsts, dsts)
-        for src, tmp_dst, dst in zip(srcs_nrm, tmp_dsts, dsts_nrm):
-            if os.path.exists(dst):
-                continue  # TODO: should this happen?
-            mv(tmp_dst, dst, ignore_locks=True)
+        ## mv <srcs> to tmp paths next to their <dsts>, grouped by whether a rename is possible
+        moves = [
+            (src, generate_tmp_from_path(dst), dst, src_stat.st_dev == dir_stat(dst).st_dev)  # type: ignore[union-attr]
+            for src, dst, src_stat in zip(srcs_nrm, dsts_nrm, src_stats)
+            if src != dst
+        ]
+        moved: list[tuple[str, str]] = []  # (src, tmp_dst) of completed mvs
+        renamed: list[tuple[str, str]] = []  # (tmp_dst, dst) of completed renames
+        futures: dict[concurrent.futures.Future, tuple[str, str]] = {}
+        try:
+            for src, tmp_dst, _dst, same_dev in moves:
+                if same_dev:
+                    _mv_unchecked(src, tmp_dst, fsync, progress)
+                    moved.append((src, tmp_dst))
+            copies = [(src, tmp_dst) for src, tmp_dst, _dst, same_dev in moves if not same_dev]
+            if copies:
+                with concurrent.futures.ThreadPoolExecutor(min(MV_MULTI_COPY_WORKERS, len(copies))) as executor:
+                    futures = {
+                        executor.submit(_mv_unchecked, src, tmp_dst, fsync, progress): (src, tmp_dst)
+                        for src, tmp_dst in copies
+                    }
+                    try:
+                        for future in futures:
+                            future.result()
+                    except BaseException:
+                        for future in futures:
+                            future.cancel()
+                        raise
+                moved.extend(futures.values())
+                futures = {}
+            ## mv tmp paths to <dsts>
+            for _src, tmp_dst, dst, _same_dev in moves:
+                os.rename(tmp_dst, dst)
+                renamed.append((tmp_dst, dst))
+        except BaseException:
+            #### copies still running have finished once the pool has shut down
+            moved.extend(
+                pair
+                for future, pair in futures.items()
+                if future.done() and not future.cancelled() and future.exception() is None
+            )
+            logger.error("Restoring %d moved <srcs> of %s", len(moved), srcs_nrm)
+            for tmp_dst, dst in reversed(renamed):
+                os.rename(dst, tmp_dst)
+            for src, tmp_dst in reversed(moved):
+                _mv_unchecked(tmp_dst, src, fsync)
+            raise
+        if fsync:
+            for dir_ in {os.path.dirname(dst) for _src, _tmp_dst, dst, _same_dev in moves}:
+                _fsync_dir(dir_)
+
+
+class RenamePlan:
+    """Batch of renames of <srcs> to <dsts>, ordered so that no rename targets a path that has yet to be moved away.
+
+    Chains of renames are ordered from their free dst backwards and cycles are broken by first moving one of their
+    srcs to a tmp path. The whole batch is checked and executed under a single LockManager. When <journal> is given,
+    the renames, the number completed and whether they are being undone are recorded there so an interrupted batch
+    can be finished with RenamePlan.from_journal(<journal>).execute() or undone with
+    RenamePlan.from_journal(<journal>).rollback().
+
+    Attributes:
+        steps: Renames in the order they are executed, including any to and from tmp paths
+        done: Number of <steps> completed
+        journal: Path of the journal or None
+    """
+
+    def __init__(self, srcs: Sequence[str], dsts: Sequence[str], journal: str | None = None) -> None:
+        """Plan mv(src, dst) for each pair of <srcs> and <dsts>; pairs where src == dst are dropped
+
+        Raises:
+            NotADirectoryError: if the directory of any of <srcs> or <dsts> does not exist
+            ValueError: if len(<srcs>) != len(<dsts>) or all elements of <srcs> or <dsts> are not unique
+        """
+        if len(srcs) != len(dsts):
+            raise ValueError("Inputs <srcs> and <dsts> should have the same length!")
+        pairs = [(src, dst) for src, dst in zip(map(path_clean, srcs), map(path_clean, dsts)) if src != dst]
+        self.steps: list[tuple[str, str]] = self._order(pairs)
+        self.done = 0
+        self.journal = journal
+        self._journal_started = False
+        self._rolling_back = False
+
+    @classmethod
+    def from_journal(cls, journal: str) -> RenamePlan:
+        """Load the plan recorded in <journal> along with its number of completed renames"""
+        with open_unix_safely(journal) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        plan = cls([], [], journal)
+        plan._journal_started = True  # pylint: disable=protected-access
+        plan.steps = [(src, dst) for src, dst in records[0]["steps"]]
+        plan.done = next((record["done"] for record in reversed(records) if "done" in record), 0)
+        plan._rolling_back = next(  # pylint: disable=protected-access
+            (record["rollback"] for record in reversed(records) if "rollback" in record), False
+        )
+        #### a rename or its undo may have completed without being journaled if the batch was interrupted
+        if plan._rolling_back:  # pylint: disable=protected-access
+            if plan.done > 0:
+                src, dst = plan.steps[plan.done - 1]
+                if os.path.exists(src) and not os.path.exists(dst):
+                    plan.done -= 1
+        elif plan.done < len(plan.steps):
+            src, dst = plan.steps[plan.done]
+            if not os.path.exists(src) and os.path.exists(dst):
+                plan.done += 1
+        return plan
+
+    @staticmethod
+    def _order(pairs: Sequence[tuple[str, str]]) -> list[tuple[str, str]]:
+        def key(path: str) -> str:
+            dir_ = os.path.dirname(path)
+            if not os.path.isdir(dir_):
+                raise NotADirectoryError(f"Directory '{dir_}' for '{path}' does not exist!")
+            return path if is_filesystem_case_sensitive(dir_) else path.lower()
+
+        src_keys = {key(src): i for i, (src, _) in enumerate(pairs)}
+        dst_keys = {key(dst) for _, dst in pairs}
+        if len(src_keys) != len(pairs):
+            raise ValueError(f"All <srcs> values should be unique! {[src for src, _ in pairs]}")
+        if len(dst_keys) != len(pairs):
+            raise ValueError(f"All <dsts> values should be unique! {[dst for _, dst in pairs]}")
+        #### <pairs>[i] can only be renamed once <pairs>[blocked_by[i]] has moved away from its dst
+        blocked_by = {i: src_keys.get(key(dst)) for i, (_, dst) in enumerate(pairs)}
+        blocks = {j: i for i, j in blocked_by.items() if j not in (None, i)}
+        steps: list[tuple[str, str]] = []
+        visited: set[int] = set()
+
+        def unblock(i: int | None) -> None:
+            while i is not None and i not in visited:
+                visited.add(i)
+                steps.append(pairs[i])
+                i = blocks.get(i)
+
+        for i, j in blocked_by.items():
+            if j in (None, i):
+                unblock(i)
+        #### the remaining pairs form cycles, each of which is broken by moving one src to a tmp path
+        for i in blocked_by:
+            if i not in visited:
+                src, dst = pairs[i]
+                tmp = generate_tmp_from_path(src)
+                steps.append((src, tmp))
+                visited.add(i)
+                unblock(blocks[i])
+                steps.append((tmp, dst))
+        return steps
+
+    def check(self) -> None:
+        """Raise if the remaining renames cannot be executed
+
+        Raises:
+            FileNotFoundError: if a src that has not been moved yet does not exist
+            FileExistsError: if a dst exists and is not a src that is moved away first
+        """
+        remaining = self.steps[self.done :]
+        srcs = {src for src, _ in remaining}
+        dsts: set[str] = set()
+        for src, dst in remaining:
+            if src not in dsts and not os.path.lexists(src):
+                raise FileNotFoundError(f"File or directory '{src}' from <srcs> does not exist!")
+            dsts.add(dst)
+        for dst in dsts - srcs:
+            if os.path.lexists(dst):
+                if not any(os.path.samefile(src, dst) for src in srcs if os.path.dirname(src) == os.path.dirname(dst)):
+                    raise FileExistsError(f"File or directory '{dst}' from <dsts> should not exist!")
+
+    def execute(self, progress: MvProgress | None = None) -> None:
+        """Execute the remaining renames, undoing the completed ones if one raises an Exception
+
+        Args:
+            progress: Counters updated as the renames are executed, see MvProgress
+
+        Raises:
+            FileNotFoundError: see RenamePlan.check
+            FileExistsError: see RenamePlan.check, or if a new plan's <journal> exists
+            PermissionError: if the lock for any path cannot be acquired
+        """
+        try:
+            with LockManager(*self._lock_paths()), _finishing(progress):
+                self.check()
+                with self._open_journal() as journal:
+                    try:
+                        self._record_direction(journal, rollback=False)
+                        for src, dst in self.steps[self.done :]:
+                            _mv_unchecked(src, dst, progress=progress)
+                            self.done += 1
+                            self._record(journal)
+                    except Exception:
+                        logger.error("Rolling back %d completed renames of %s", self.done, self.steps)
+                        self._rollback(journal)
+                        raise
+        finally:
+            if self.done in (0, len(self.steps)):
+                self._remove_journal()
+
+    def rollback(self) -> None:
+        """Undo the completed renames in reverse order
+
+        Raises:
+            PermissionError: if the lock for any path cannot be acquired
+        """
+        try:
+            with LockManager(*self._lock_paths()):
+                with self._open_journal() as journal:
+                    self._rollback(journal)
+        finally:
+            if self.done == 0:
+                self._remove_journal()
+
+    def _rollback(self, journal: TextIO | None) -> None:
+        self._record_direction(journal, rollback=True)
+        while self.done > 0:
+            src, dst = self.steps[self.done - 1]
+            _mv_unchecked(dst, src)
+            self.done -= 1
+            self._record(journal)
+
+    def _lock_paths(self) -> Iterable[str]:
+        return sorted({path for step in self.steps for path in step})
+
+    def _open_journal(self) -> contextlib.AbstractContextManager[TextIO | None]:
+        if self.journal is None:
+            return contextlib.nullcontext()
+        if self._journal_started:
+            return open_unix_safely(self.journal, "a")
+        if os.path.exists(self.journal):
+            raise FileExistsError(f"Journal '{self.journal}' of an interrupted rename plan should not exist!")
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal)), exist_ok=True)
+        journal = open_unix_safely(self.journal, "w")
+        journal.write(json.dumps({"steps": self.steps}) + "\n")
+        self._record(journal)
+        self._journal_started = True
+        return journal
+
+    def _record(self, journal: TextIO | None) -> None:
+        if journal is not None:
+            journal.write(json.dumps({"done": self.done}) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def _record_direction(self, journal: TextIO | None, rollback: bool) -> None:
+        #### from_journal needs the direction to tell which rename may have completed without being journaled
+        if journal is not None and self._rolling_back != rollback:
+            journal.write(json.dumps({"rollback": rollback}) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        self._rolling_back = rollback
+
+    def _remove_journal(self) -> None:
+        #### a journal this plan did not start may be that of an interrupted plan
+        if self.journal is not None and self._journal_started and os.path.exists(self.journal):
+            os.unlink(self.journal)
 
 
 def path_basename_to_lower(path: str, ignore_locks: bool = False) -> str:
@@ -273,6 +919,52 @@ def path_clean(path: str) -> str:
     return str(pathlib.Path(path).resolve(strict=False))
 
 
+def path_clean_many(paths: Iterable[str]) -> list[str]:
+    """path_clean each of <paths>, resolving each distinct parent directory only once.
+
+    Resolved parent directories are kept for the rest of the process in an LRU of PATH_CLEAN_DIR_CACHE_MAX_SIZE
+    entries and the basenames of <paths> are joined onto them. Basenames that are symlinks, '.' or '..' are resolved
+    by path_clean, so the results equal those of path_clean as long as no cached directory has since been replaced by
+    a symlink or had a parent symlink retargeted; see path_clean_cache_clear.
+
+    Args:
+        paths: Paths to clean
+
+    Returns:
+        Cleaned <paths> in the same order
+    """
+    try:
+        dirs_resolved = path_clean_many.dirs_resolved  # type: ignore[attr-defined]
+    except AttributeError:
+        dirs_resolved = OrderedDict()
+        setattr(path_clean_many, "dirs_resolved", dirs_resolved)
+    cwd = os.getcwd()
+    out = []
+    for path in paths:
+        dir_, base = os.path.split(path)
+        if base in ("", ".", ".."):
+            out.append(path_clean(path))
+            continue
+        dir_ = os.path.join(cwd, dir_)
+        try:
+            dir_resolved = dirs_resolved[dir_]
+            dirs_resolved.move_to_end(dir_)
+        except KeyError:
+            dir_resolved = path_clean(dir_)
+            dirs_resolved[dir_] = dir_resolved
+            if len(dirs_resolved) > PATH_CLEAN_DIR_CACHE_MAX_SIZE:
+                dirs_resolved.popitem(last=False)
+        path_resolved = os.path.join(dir_resolved, base)
+        out.append(path_clean(path_resolved) if os.path.islink(path_resolved) else path_resolved)
+    return out
+
+
+def path_clean_cache_clear() -> None:
+    """Forget every parent directory resolved by path_clean_many."""
+    if hasattr(path_clean_many, "dirs_resolved"):
+        path_clean_many.dirs_resolved.clear()  # pylint: disable=[no-member]
+
+
 def path_with_linux_normalized_drive_letter_if_windows(path):
     if python_utils.is_os_windows() and re.match(r"^[A-Za-z]:/", path):
         return re.sub(r"^([A-Za-z]):", lambda m: f"/{m.group(1).lower()}", path)
@@ -299,9 +991,39 @@ def path_windows_to_posix(path):
 LE_CRLF_B = b"\r\n"
 LE_LF_B = b"\n"
 LINE_ENDINGS_B = (LE_CR_B, LE_CRLF_B, LE_LF_B)
+EOL_SCAN_CHUNK_SIZE = 2**20
+_LONE_CR_REGEX = re.compile(rb"\r(?!\n)")
+EOL_LF_CACHE_MAX_SIZE = 2**12
+FILE_DIGEST_CACHE_MAX_SIZE = 2**12
+STAT_CACHE_RACY_NS = 2 * 10**9  # mtimes this recent may not change on a further write, e.g. 2s on FAT
+
 
+def append_missing_lines_to_file(
+    file: str,
+    lines: Iterable[str],
+    is_windows: bool = False,
+    check_only: bool = False,
+    use_mmap: bool = False,
+) -> bool:
+    """Append each of <lines> that is not already a line of <file> to <file>, creating <file> if it does not exist.
 
-def append_missing_lines_to_file(file, lines, is_windows=False, check_only: bool = False):
+    <file> is searched for all of <lines> in one pass by file_lines_missing and the missing ones are appended with a
+    single write, so thousands of <lines> cost about as much as one. A line matches only a whole line of <file>.
+
+    Args:
+        file: File to append <lines> to
+        lines: Lines to ensure are in <file>; lines containing newlines are split into their lines, empty lines are
+            ignored
+        is_windows: Open <file> as text with the platform's eol instead of with open_unix_safely
+        check_only: Only log the missing lines without modifying or creating <file>
+        use_mmap: Search <file> through mmap, see file_lines_missing
+
+    Returns:
+        False if <check_only> and any of <lines> is missing else True
+
+    Raises:
+        ValueError: if not <is_windows> and <file> has CR eols, as open_unix_safely would
+    """
     if not os.path.exists(file):
         if check_only:
             logger.info(f"file does not exist: {file}")
@@ -311,28 +1033,80 @@ def append_missing_lines_to_file(file, lines, is_windows=False, check_only: bool
         else:
             open_unix_safely(file, "a").close()
         logger.info(f"created {file}")
+    elif not is_windows and not is_file_eol_lf(file):
+        raise ValueError(f"Unexpected newline type in path={file}")
 
-    missing_line = False
-    open_wrapper = lambda is_windows: (
-        open(file, "r+", encoding="utf-8")  # pylint: disable=consider-using-with
+    lines_missing = file_lines_missing(file, lines, use_mmap=use_mmap)
+    if check_only:
+        for line in lines_missing:
+            logger.info(f"file={file} is missing line={line}")
+        return not lines_missing
+    if not lines_missing:
+        return True
+    with open(file, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            f.seek(-1, os.SEEK_END)
+        prepend_nl_necessary = size > 0 and f.read(1) != LE_LF_B
+    with (
+        open(file, "a", encoding="utf-8")  # pylint: disable=consider-using-with
         if is_windows
-        else open_unix_safely(file, "r+")
-    )
-    with open_wrapper(is_windows) as f:
-        content = f.read()
-        prepend_nl_necessary = content and not content.endswith("\n")
-        for line in lines:
-            if line not in content:
-                if check_only:
-                    logger.info(f"file={file} is missing line={line}")
-                    missing_line = True
-                else:
-                    if prepend_nl_necessary:
-                        prepend_nl_necessary = False
-                        f.write("\n")
-                    f.write(line + "\n")
-                    logger.info(f"wrote to file={file} line={line}")
-    return not missing_line
+        else open_unix_safely(file, "a")
+    ) as f:
+        f.write(("\n" if prepend_nl_necessary else "") + "".join(line + "\n" for line in lines_missing))
+    for line in lines_missing:
+        logger.debug(f"wrote to file={file} line={line}")
+    logger.info(f"wrote {len(lines_missing)} missing lines to file={file}")
+    return True
+
+
+def file_lines_missing(
+    file: str,
+    lines: Iterable[str],
+    use_mmap: bool = False,
+    chunk_size: int = EOL_SCAN_CHUNK_SIZE,
+) -> list[str]:
+    """Lines of <lines> that are not a whole line of <file>, in order and without duplicates.
+
+    <lines> are indexed in a set which <file> is streamed against in <chunk_size> chunks, each split into its lines
+    and removed from the set, stopping early once every line is found. CRLF eols of <file> are ignored. With
+    <use_mmap> the chunks are sliced from a mmap of <file> instead of read, falling back to reads if it cannot be
+    mmap'd.
+    """
+    wanted: dict[bytes, str] = {}
+    for line in lines:
+        for sub_line in line.split("\n"):
+            sub_line = sub_line.rstrip("\r")
+            #### empty lines are never missing, as with the substring search this replaced
+            if sub_line:
+                wanted.setdefault(sub_line.encode("utf-8"), sub_line)
+    missing = set(wanted)
+    with open(file, "rb") as f:
+        for file_lines in _iter_file_lines(f, use_mmap, chunk_size):
+            missing.difference_update(file_lines)
+            if not missing:
+                break
+    return [line for line_b, line in wanted.items() if line_b in missing]
+
+
+def _iter_file_lines(f: BinaryIO, use_mmap: bool, chunk_size: int) -> Iterator[list[bytes]]:
+    """Yield the lines of <f> without eols, a list per chunk of <chunk_size> bytes."""
+    with contextlib.ExitStack() as stack:
+        chunks: Iterable[bytes] = iter(lambda: f.read(chunk_size), b"")
+        if use_mmap:
+            with contextlib.suppress(OSError, ValueError):
+                m = stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                chunks = (m[i : i + chunk_size] for i in range(0, len(m), chunk_size))
+        carry = b""
+        for chunk in chunks:
+            data = carry + chunk
+            file_lines = data.split(LE_LF_B)
+            carry = file_lines.pop()
+            if LE_CR_B in data:
+                file_lines = [line.removesuffix(LE_CR_B) for line in file_lines]
+            yield file_lines
+        if carry:
+            yield [carry.removesuffix(LE_CR_B)]
 
 
 def cp_with_replace(src: str, dst: str, replacements: Sequence[tuple[str, str]], check_only: bool = False) -> bool:
@@ -347,17 +1121,23 @@ def cp_with_replace(src: str, dst: str, replacements: Sequence[tuple[str, str]],
         content = content.replace(orig_str, repl_str)
 
     if check_only:
-        with open_unix_safely(dst, "r") as f:
-            dst_content = f.read()
-            if content != dst_content:
-                logger.info(f"src={src} does not match dst={dst}")
-                return False
-    else:
+        if not _is_file_text_equal(dst, content):
+            logger.info(f"src={src} does not match dst={dst}")
+            return False
+    elif not os.path.exists(dst) or not _is_file_text_equal(dst, content):
         with open_unix_safely(dst, "w") as f:
             f.write(content)
     return True
 
 
+def _is_file_text_equal(path: str, content: str) -> bool:
+    """Check that <path> holds <content> as written by open_unix_safely, skipping the read when the sizes differ."""
+    if os.path.getsize(path) != len(content.encode("utf-8")):
+        return False
+    with open_unix_safely(path, "r") as f:
+        return f.read() == content
+
+
 def eol_str_to_bin_str(str_in: bytes | str) -> bytes:
     if str_in in LINE_ENDINGS_B:
         return str_in  # type: ignore[return-value]
@@ -370,7 +1150,7 @@ def eol_str_to_bin_str(str_in: bytes | str) -> bytes:
     raise ValueError("<eol> must be specified as one of ['cr', 'crlf', 'lf'].")
 
 
-def file_as_eol_lf(src_file, dst_file=None, /, chunk_size=4096):
+def file_as_eol_lf(src_file, dst_file=None, /, chunk_size=EOL_SCAN_CHUNK_SIZE):
     """Converts all types of eol (CRLF, CR) to LF. If <dst_file> is not provided, overwrite <src_file> in place.
 
     :param src_file: Path to the file which may contain mixed eol.
@@ -379,36 +1159,143 @@ def file_as_eol_lf(src_file, dst_file=None, /, chunk_size=4096):
     if dst_file is None:
         temp_fd, temp_path = tempfile.mkstemp()
         try:
-            with open(src_file, "rb") as src, os.fdopen(temp_fd, "wb") as tgt:
+            with open(src_file, "rb", buffering=0) as src, os.fdopen(temp_fd, "wb") as tgt:
                 write_src_to_tgt_as_eol_lf_using_chunks(src, tgt, chunk_size)
             os.replace(temp_path, src_file)
         except Exception as e:
             os.remove(temp_path)
             raise e
     else:
-        with open(src_file, "rb") as src, open(dst_file, "wb") as tgt:
+        with open(src_file, "rb", buffering=0) as src, open(dst_file, "wb") as tgt:
             write_src_to_tgt_as_eol_lf_using_chunks(src, tgt, chunk_size)
 
 
-def is_file_content_equal(lhs, rhs, chunk_size=4096):
+def is_file_eol_lf(path: str, chunk_size: int = EOL_SCAN_CHUNK_SIZE, use_cache: bool = True) -> bool:
+    """Check that <path> has no CR, i.e. file_as_eol_lf would leave it unchanged, without writing anything.
+
+    The file is mmap'd and searched in place; files that cannot be mmap'd, such as pipes, are instead read in
+    <chunk_size> chunks into a single reused buffer. Files found LF-only are remembered for the rest of the process by
+    their (st_dev, st_ino, st_size, st_mtime_ns) in an LRU of EOL_LF_CACHE_MAX_SIZE entries so that reopening an
+    unchanged file skips the scan; <use_cache>=False always scans. Files modified within STAT_CACHE_RACY_NS are not
+    remembered since a further write may leave their mtime and size unchanged.
+    """
+    try:
+        lf_fingerprints = is_file_eol_lf.lf_fingerprints  # type: ignore[attr-defined]
+    except AttributeError:
+        lf_fingerprints = OrderedDict()
+        setattr(is_file_eol_lf, "lf_fingerprints", lf_fingerprints)
+    with open(path, "rb") as f:
+        file_stat = os.fstat(f.fileno())
+        fingerprint = (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+        if use_cache and fingerprint in lf_fingerprints:
+            lf_fingerprints.move_to_end(fingerprint)
+            return True
+        if not _is_open_file_eol_lf(f, file_stat.st_size, chunk_size):
+            return False
+    if use_cache and time.time_ns() - file_stat.st_mtime_ns > STAT_CACHE_RACY_NS:
+        lf_fingerprints[fingerprint] = None
+        if len(lf_fingerprints) > EOL_LF_CACHE_MAX_SIZE:
+            lf_fingerprints.popitem(last=False)
+    return True
+
+
+def is_file_eol_lf_cache_clear() -> None:
+    """Forget every file remembered as LF-only by is_file_eol_lf."""
+    if hasattr(is_file_eol_lf, "lf_fingerprints"):
+        is_file_eol_lf.lf_fingerprints.clear()  # pylint: disable=[no-member]
+
+
+def _is_open_file_eol_lf(f: BinaryIO, size: int, chunk_size: int) -> bool:
+    try:
+        if size == 0:
+            return not f.read(1)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return m.find(LE_CR_B) == -1
+    except (OSError, ValueError):
+        f.seek(0)
+    buf = bytearray(chunk_size)
+    while num_read := f.readinto(buf):
+        if buf.find(LE_CR_B, 0, num_read) != -1:
+            return False
+    return True
+
+
+def is_file_content_equal(lhs, rhs, chunk_size=EOL_SCAN_CHUNK_SIZE, use_digest_cache: bool = False) -> bool:
     """Compare two files in a binary mode chunk by chunk.
 
+    Files that are the same inode are equal and files of different sizes are not, without reading either. Otherwise
+    the files are read in <chunk_size> chunks into two reused buffers, stopping at the first differing chunk.
+
     Args:
         lhs: Path to the first file.
         rhs: Path to the second file.
-        chunk_size: The size of each chunk to read, default 4096 bytes.
+        chunk_size: The size of each chunk to read, default 1MiB.
+        use_digest_cache: Compare the files' file_digest instead, so that files compared again while unchanged are
+            not read.
 
     Returns:
         True if file content is the same
     """
+    lhs_stat = os.stat(lhs)
+    rhs_stat = os.stat(rhs)
+    if (lhs_stat.st_dev, lhs_stat.st_ino) == (rhs_stat.st_dev, rhs_stat.st_ino):
+        return True
+    #### files such as those in /proc report a size of 0 while having content
+    if lhs_stat.st_size != rhs_stat.st_size and lhs_stat.st_size and rhs_stat.st_size:
+        return False
+    if use_digest_cache:
+        return file_digest(lhs, chunk_size) == file_digest(rhs, chunk_size)
+    lhs_buf = bytearray(chunk_size)
+    rhs_buf = bytearray(chunk_size)
     with open(lhs, "rb") as lhs_f, open(rhs, "rb") as rhs_f:
         while True:
-            lhs_chunk = lhs_f.read(chunk_size)
-            rhs_chunk = rhs_f.read(chunk_size)
-            if lhs_chunk != rhs_chunk:
+            lhs_read = lhs_f.readinto(lhs_buf)
+            rhs_read = rhs_f.readinto(rhs_buf)
+            if lhs_read != rhs_read:
                 return False
-            if not lhs_chunk and not rhs_chunk:
-                return True
+            if lhs_read < chunk_size:
+                return lhs_buf[:lhs_read] == rhs_buf[:rhs_read]
+            if lhs_buf != rhs_buf:
+                return False
+
+
+def file_digest(path: str, chunk_size: int = EOL_SCAN_CHUNK_SIZE) -> bytes:
+    """Return the blake2b digest of <path>'s content.
+
+    Digests are remembered for the rest of the process by the file's (st_dev, st_ino, st_size, st_mtime_ns) in an LRU
+    of FILE_DIGEST_CACHE_MAX_SIZE entries so an unchanged file is only read once; as with is_file_eol_lf, files
+    modified within STAT_CACHE_RACY_NS are not remembered.
+    """
+    try:
+        digests = file_digest.digests  # type: ignore[attr-defined]
+    except AttributeError:
+        digests = OrderedDict()
+        setattr(file_digest, "digests", digests)
+    file_stat = os.stat(path)
+    fingerprint = (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+    if fingerprint in digests:
+        digests.move_to_end(fingerprint)
+        return digests[fingerprint]  # type: ignore[no-any-return]
+    with open(path, "rb") as f:
+        file_stat = os.fstat(f.fileno())
+        fingerprint = (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+        hasher = hashlib.blake2b(digest_size=32)
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        while num_read := f.readinto(buf):
+            hasher.update(view[:num_read])
+    digest = hasher.digest()
+    if time.time_ns() - file_stat.st_mtime_ns > STAT_CACHE_RACY_NS:
+        digests[fingerprint] = digest
+        if len(digests) > FILE_DIGEST_CACHE_MAX_SIZE:
+            digests.popitem(last=False)
+    return digest
+
+
+def file_digest_cache_clear() -> None:
+    """Forget every digest remembered by file_digest."""
+    if hasattr(file_digest, "digests"):
+        file_digest.digests.clear()  # pylint: disable=[no-member]
 
 
 def open_unix_safely(
@@ -417,16 +1304,23 @@ def open_unix_safely(
     buffering: int = -1,
     encoding: str | None = "utf-8",
     correct_eol: bool = False,
-    chunk_size=4096,
+    chunk_size=EOL_SCAN_CHUNK_SIZE,
+    use_eol_cache: bool = True,
     **kwargs: Any,
 ) -> TextIO:
     """Open a file with UTF-8 encoding and a specified newline character, allowing overrides.
 
+    An existing file is first checked for CR eols by is_file_eol_lf, which writes nothing; only when CRs are found
+    and <correct_eol> is set is the file rewritten with LF eols, otherwise a ValueError is raised.
+
     Args:
         path: Path to the file.
         mode: The mode in which the file is opened.
         buffering: Buffering policy (-1 to use default buffering).
         encoding: Encoding for the file.
+        correct_eol: Rewrite CR and CRLF eols of an existing file to LF instead of raising.
+        chunk_size: Size of the chunks used to scan and rewrite the file's eols.
+        use_eol_cache: Skip the scan of a file unchanged since is_file_eol_lf last found it LF-only.
         **kwargs: Additional arguments to pass to the built-in open function.
 
     Returns:
@@ -434,19 +1328,17 @@ def open_unix_safely(
     """
     # pylint: disable=[too-many-arguments]
     tmp_file = None
-    if os.path.exists(path):
+    if os.path.exists(path) and not is_file_eol_lf(path, chunk_size, use_eol_cache):
+        if not correct_eol:
+            raise ValueError(f"Unexpected newline type in path={path}")
         try:
             with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
                 file_as_eol_lf(path, tmp_file.name, chunk_size)
-                if not is_file_content_equal(path, tmp_file.name, chunk_size):
-                    if correct_eol:
-                        mv(tmp_file.name, path, overwrite=True)
-                        logger.warning("Newlines needed adjusting to lf for path=%s", path)
-                    else:
-                        raise ValueError(f"Unexpected newline type in path={path}")
+            mv(tmp_file.name, path, overwrite=True)
+            logger.warning("Newlines needed adjusting to lf for path=%s", path)
         finally:
-            if tmp_file is not None and os.path.exists(str(tmp_file)):
-                os.unlink(str(tmp_file))
+            if tmp_file is not None and os.path.exists(tmp_file.name):
+                os.unlink(tmp_file.name)
     assert "b" not in mode, mode
     forbidden_keywords = {"closefd", "errors", "newline"}
     assert not any(key in kwargs for key in forbidden_keywords), kwargs
@@ -471,21 +1363,34 @@ def replace_eol_bin(bin_str: bytes, eol: bytes | str = LE_LF_B) -> bytes:
     return bin_str_out
 
 
-def write_src_to_tgt_as_eol_lf_using_chunks(src: BinaryIO, tgt: BinaryIO, chunk_size=4096) -> None:
+def write_src_to_tgt_as_eol_lf_using_chunks(src: BinaryIO, tgt: BinaryIO, chunk_size=EOL_SCAN_CHUNK_SIZE) -> None:
     """Read from src and write to tgt and force all eol to lf. Handles large files and chunk boundary edge cases.
 
+    Chunks are read into one reused buffer; a chunk without CR is written straight from the buffer, a chunk whose CRs
+    all start a CRLF has them deleted with the single byte fast path of bytes.replace, and only a chunk with lone CRs
+    is normalized with two full replaces. A CR ending a chunk is held back so that a CRLF split across chunks becomes
+    one LF.
+
     :param src: Source file object opened in binary mode for reading.
     :param tgt: Target file object opened in binary mode for writing.
     """
-    previous_end_cr = False  # To handle '\r' at the end of a chunk
-
-    while True:
-        chunk = src.read(chunk_size)
-        if not chunk:
-            break
-        # handle CRLF spread across chunk boundaries
-        if previous_end_cr and chunk.startswith(LE_LF_B):
-            chunk = chunk[1:]
-        previous_end_cr = chunk.endswith(LE_CR_B)
-        chunk = replace_eol_bin(chunk, LE_LF_B)
-        tgt.write(chunk)
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    pending_cr = False
+    while num_read := src.readinto(buf):
+        start = 0
+        if pending_cr:
+            tgt.write(LE_LF_B)
+            start = int(buf[0] == LE_LF_B[0])
+        pending_cr = buf[num_read - 1] == LE_CR_B[0]
+        end = num_read - pending_cr
+        if start >= end:
+            continue
+        if buf.find(LE_CR_B, start, end) == -1:
+            tgt.write(view[start:end])
+        elif _LONE_CR_REGEX.search(view[start:end]) is None:
+            tgt.write(bytes(view[start:end]).replace(LE_CR_B, b""))
+        else:
+            tgt.write(bytes(view[start:end]).replace(LE_CRLF_B, LE_LF_B).replace(LE_CR_B, LE_LF_B))
+    if pending_cr:
+        tgt.write(LE_LF_B)
@@ -1,4 +1,6 @@
+import contextlib
 import errno
+import json
 import os
 import tempfile
 import unittest.mock
@@ -58,6 +60,371 @@ def test_file_as_eol_lf(self, src_str_bin: bytes, expected_tgt_str_bin: bytes, c
             chunk_size -= 1
 
 
+class TestIsFileEolLf(unittest.TestCase):
+    @parameterized.expand(
+        [
+            (b"", True),
+            (b"Hello World\n", True),
+            (b"Hello World\r", False),
+            (b"Hello\r\nWorld\r\n", False),
+            (b"a" * (2**16) + b"\n", True),
+            (b"a" * (2**16) + b"\r", False),
+        ],
+    )
+    def test_is_file_eol_lf(self, src_str_bin: bytes, expected: bool) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "src.txt")
+            with open(path, "wb") as f:
+                f.write(src_str_bin)
+            self.assertEqual(path_utils.is_file_eol_lf(path), expected)
+            with unittest.mock.patch("utils.path_utils.path_utils.mmap.mmap", side_effect=OSError):
+                for chunk_size in (1, 7, 4096):
+                    self.assertEqual(path_utils.is_file_eol_lf(path, chunk_size), expected)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), src_str_bin)
+
+
+class TestIsFileEolLfCache(unittest.TestCase):
+    def setUp(self):
+        path_utils.is_file_eol_lf_cache_clear()
+        self.addCleanup(path_utils.is_file_eol_lf_cache_clear)
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        scan = path_utils.path_utils._is_open_file_eol_lf  # pylint: disable=protected-access
+        patcher = unittest.mock.patch("utils.path_utils.path_utils._is_open_file_eol_lf", side_effect=scan)
+        self.scan = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, name: str, content: bytes, mtime_ns: int | None = 10**18) -> str:
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def test_unchanged_file_is_scanned_once(self):
+        path = self.write("a.txt", b"a\n")
+        for _ in range(3):
+            with path_utils.open_unix_safely(path) as f:
+                self.assertEqual(f.read(), "a\n")
+        self.assertEqual(self.scan.call_count, 1)
+        self.assertTrue(path_utils.is_file_eol_lf(path, use_cache=False))
+        self.assertEqual(self.scan.call_count, 2)
+
+    def test_changed_file_is_scanned_again(self):
+        path = self.write("a.txt", b"a\n")
+        self.assertTrue(path_utils.is_file_eol_lf(path))
+        self.write("a.txt", b"a\r\n", 10**18 + 1)
+        self.assertFalse(path_utils.is_file_eol_lf(path))
+        self.assertFalse(path_utils.is_file_eol_lf(path))
+        self.assertEqual(self.scan.call_count, 3)
+
+    def test_recently_modified_file_is_not_cached(self):
+        path = self.write("a.txt", b"a\n", None)
+        self.assertTrue(path_utils.is_file_eol_lf(path))
+        self.assertTrue(path_utils.is_file_eol_lf(path))
+        self.assertEqual(self.scan.call_count, 2)
+
+    def test_least_recently_used_is_evicted(self):
+        paths = [self.write(f"{i}.txt", b"a\n") for i in range(3)]
+        with unittest.mock.patch("utils.path_utils.path_utils.EOL_LF_CACHE_MAX_SIZE", 2):
+            for path in paths[:2] + [paths[0]] + paths[2:]:
+                self.assertTrue(path_utils.is_file_eol_lf(path))
+            self.assertEqual(self.scan.call_count, 3)
+            self.assertTrue(path_utils.is_file_eol_lf(paths[0]))
+            self.assertEqual(self.scan.call_count, 3)
+            self.assertTrue(path_utils.is_file_eol_lf(paths[1]))
+            self.assertEqual(self.scan.call_count, 4)
+
+
+class TestIsFileContentEqual(unittest.TestCase):
+    def setUp(self):
+        path_utils.file_digest_cache_clear()
+        self.addCleanup(path_utils.file_digest_cache_clear)
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def write(self, name: str, content: bytes, mtime_ns: int = 10**18) -> str:
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    @parameterized.expand(
+        [
+            (b"", b"", True),
+            (b"a", b"", False),
+            (b"abc", b"abd", False),
+            (b"ab" * 5000, b"ab" * 5000, True),
+            (b"ab" * 5000, b"ab" * 4999 + b"ac", False),
+            (b"ab" * 5000, b"ab" * 5000 + b"a", False),
+        ],
+    )
+    def test_is_file_content_equal(self, lhs_bin: bytes, rhs_bin: bytes, expected: bool) -> None:
+        lhs = self.write("lhs", lhs_bin)
+        rhs = self.write("rhs", rhs_bin)
+        for chunk_size in (1, 7, 4096, 2**20):
+            self.assertEqual(path_utils.is_file_content_equal(lhs, rhs, chunk_size), expected)
+            self.assertEqual(path_utils.is_file_content_equal(rhs, lhs, chunk_size), expected)
+            self.assertEqual(path_utils.is_file_content_equal(lhs, rhs, chunk_size, use_digest_cache=True), expected)
+
+    def test_is_file_content_equal_skips_reads(self):
+        lhs = self.write("lhs", b"a" * 100)
+        rhs = self.write("rhs", b"b" * 101)
+        link = os.path.join(self.tmp_dir.name, "link")
+        os.link(lhs, link)
+        with unittest.mock.patch("builtins.open", side_effect=AssertionError("should not be read")):
+            self.assertFalse(path_utils.is_file_content_equal(lhs, rhs))
+            self.assertTrue(path_utils.is_file_content_equal(lhs, link))
+
+    def test_file_digest_cache(self):
+        lhs = self.write("lhs", b"a" * 100)
+        rhs = self.write("rhs", b"a" * 100)
+        self.assertTrue(path_utils.is_file_content_equal(lhs, rhs, use_digest_cache=True))
+        with unittest.mock.patch("builtins.open", side_effect=AssertionError("should not be read")):
+            self.assertTrue(path_utils.is_file_content_equal(lhs, rhs, use_digest_cache=True))
+        self.write("rhs", b"b" * 100, 10**18 + 1)
+        self.assertFalse(path_utils.is_file_content_equal(lhs, rhs, use_digest_cache=True))
+
+
+class TestCpWithReplace(unittest.TestCase):
+    def test_cp_with_replace(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src = os.path.join(tmp_dir, "src.txt")
+            dst = os.path.join(tmp_dir, "dst.txt")
+            with open(src, "w", encoding="utf-8", newline="\n") as f:
+                f.write("hello \u2603\nworld\n")
+            replacements = [("world", "there")]
+            self.assertFalse(path_utils.cp_with_replace(src, dst, replacements, check_only=True))
+            self.assertTrue(path_utils.cp_with_replace(src, dst, replacements))
+            with open(dst, "rb") as f:
+                self.assertEqual(f.read(), "hello \u2603\nthere\n".encode("utf-8"))
+            os.utime(dst, ns=(0, 0))
+            self.assertTrue(path_utils.cp_with_replace(src, dst, replacements, check_only=True))
+            self.assertTrue(path_utils.cp_with_replace(src, dst, replacements))
+            self.assertEqual(os.stat(dst).st_mtime_ns, 0)
+            self.assertFalse(path_utils.cp_with_replace(src, dst, [("world", "here")], check_only=True))
+
+
+class TestCopyFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.src = os.path.join(self.tmp_dir.name, "src")
+        self.dst = os.path.join(self.tmp_dir.name, "dst")
+
+    @parameterized.expand([(0,), (1,), (3 * 2**20 + 5,)])
+    def test_copy_file(self, size: int) -> None:
+        content = os.urandom(size)
+        with open(self.src, "wb") as f:
+            f.write(content)
+        unsupported = OSError(errno.ENOSYS, "")
+        for patches in (
+            {},
+            {"copy_file_range": unsupported},
+            {"copy_file_range": unsupported, "sendfile": unsupported},
+        ):
+            with contextlib.ExitStack() as stack:
+                for name, err in patches.items():
+                    stack.enter_context(unittest.mock.patch(f"os.{name}", side_effect=err, create=True))
+                stack.enter_context(unittest.mock.patch("utils.path_utils.path_utils.MV_COPY_CHUNK_SIZE", 2**20))
+                path_utils.path_utils._copy_file(self.src, self.dst, fsync=True)  # pylint: disable=protected-access
+            with open(self.dst, "rb") as f:
+                self.assertEqual(f.read(), content, patches)
+            os.remove(self.dst)
+
+    def test_copy_file_raises(self):
+        with open(self.src, "wb") as f:
+            f.write(b"a")
+        with unittest.mock.patch("os.copy_file_range", side_effect=OSError(errno.EIO, ""), create=True):
+            copy_file = path_utils.path_utils._copy_file  # pylint: disable=protected-access
+            self.assertRaises(OSError, copy_file, self.src, self.dst)
+
+    def test_cp_progress(self):
+        with open(self.src, "wb") as f:
+            f.write(os.urandom(3 * 2**20))
+        for interval, num_reports in ((3600, 1), (0, 5)):
+            reports = []
+            progress = path_utils.MvProgress(lambda p: reports.append(p.bytes_copied), interval)
+            with unittest.mock.patch("utils.path_utils.path_utils.MV_COPY_CHUNK_SIZE", 2**20):
+                path_utils.cp(self.src, self.dst, progress=progress)
+            #### a report per chunk, for the file being done, and when cp returns
+            self.assertEqual(len(reports), num_reports, reports)
+            self.assertEqual(reports[-1], 3 * 2**20)
+            self.assertEqual(str(progress).split(";")[:2], ["3.1/3.1 MB", " 1/1 files"])
+
+    def test_copytree(self):
+        for sub in ("", "a", os.path.join("a", "b")):
+            os.makedirs(os.path.join(self.src, sub), exist_ok=True)
+            for i in range(3):
+                with open(os.path.join(self.src, sub, f"{i}.txt"), "w", encoding="utf-8") as f:
+                    f.write(sub + str(i))
+        for dir_, _dirs, files in os.walk(self.src, topdown=False):
+            for path in [os.path.join(dir_, f) for f in files] + [dir_]:
+                os.utime(path, ns=(10**18, 10**18))
+        path_utils.path_utils._copytree(self.src, self.dst, fsync=True)  # pylint: disable=protected-access
+        for dir_, dirs, files in os.walk(self.src):
+            dst_dir = os.path.join(self.dst, os.path.relpath(dir_, self.src))
+            self.assertEqual(sorted(os.listdir(dst_dir)), sorted(dirs + files))
+            self.assertEqual(os.stat(dst_dir).st_mtime_ns, 10**18)
+            for f in files:
+                self.assertTrue(path_utils.is_file_content_equal(os.path.join(dir_, f), os.path.join(dst_dir, f)))
+                self.assertEqual(os.stat(os.path.join(dst_dir, f)).st_mtime_ns, 10**18)
+
+
+class TestPathCleanMany(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.addCleanup(path_utils.path_clean_cache_clear)
+        os.makedirs(os.path.join(self.tmp_dir.name, "real", "sub"))
+        open(os.path.join(self.tmp_dir.name, "real", "sub", "file"), "w", encoding="utf-8").close()
+        os.symlink(os.path.join(self.tmp_dir.name, "real"), os.path.join(self.tmp_dir.name, "link_dir"))
+        os.symlink(os.path.join("sub", "file"), os.path.join(self.tmp_dir.name, "real", "link_file"))
+
+    def test_path_clean_many(self):
+        paths = [
+            os.path.join(self.tmp_dir.name, *parts)
+            for parts in (
+                ("real", "sub", "file"),
+                ("link_dir", "sub", "file"),
+                ("link_dir", "sub", "missing"),
+                ("link_dir", "link_file"),
+                ("link_dir", "sub", ".."),
+                ("link_dir", "sub", "..", "sub", "file"),
+                ("link_dir", "sub", ""),
+                ("missing", "file"),
+            )
+        ]
+        paths.append(os.path.relpath(paths[1]))
+        for _ in range(2):
+            self.assertEqual(path_utils.path_clean_many(paths), [path_utils.path_clean(p) for p in paths])
+
+    def test_path_clean_many_resolves_each_dir_once(self):
+        paths = [os.path.join(self.tmp_dir.name, "link_dir", "sub", str(i)) for i in range(10)]
+        with unittest.mock.patch(
+            "utils.path_utils.path_utils.path_clean",
+            side_effect=path_utils.path_clean,
+        ) as path_clean:
+            path_utils.path_clean_many(paths)
+            path_utils.path_clean_many(paths)
+        self.assertEqual(path_clean.call_count, 1)
+
+
+class TestIsFilesystemCaseSensitive(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.cache_path = os.path.join(self.tmp_dir.name, "cache", "path_utils", "case_sensitivity.json")
+        patcher = unittest.mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(self.tmp_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        path_utils.is_filesystem_case_sensitive_cache_clear()
+        self.addCleanup(path_utils.is_filesystem_case_sensitive_cache_clear)
+        self.dirs = [os.path.join(self.tmp_dir.name, str(i)) for i in range(10)]
+        for dir_ in self.dirs:
+            os.mkdir(dir_)
+
+    def test_probed_once_per_filesystem(self):
+        with unittest.mock.patch(
+            "utils.path_utils.path_utils._probe_case_sensitive",
+            side_effect=path_utils.path_utils._probe_case_sensitive,  # pylint: disable=protected-access
+        ) as probe:
+            self.assertEqual({path_utils.is_filesystem_case_sensitive(dir_) for dir_ in self.dirs}, {True})
+        self.assertEqual(probe.call_count, 1)
+        self.assertFalse(os.path.exists(self.cache_path))
+        #### a dir named without cased letters falls back to a tmp file
+        self.assertTrue(path_utils.path_utils._probe_case_sensitive(self.dirs[0]))  # pylint: disable=protected-access
+
+    def test_persisted(self):
+        self.assertTrue(path_utils.is_filesystem_case_sensitive(self.dirs[0], persist=True))
+        with open(self.cache_path, encoding="utf-8") as f:
+            self.assertEqual(list(json.load(f).values()), [True])
+        path_utils.is_filesystem_case_sensitive_cache_clear()
+        with unittest.mock.patch("utils.path_utils.path_utils._probe_case_sensitive", side_effect=AssertionError):
+            self.assertTrue(path_utils.is_filesystem_case_sensitive(self.dirs[1], persist=True))
+            path_utils.is_filesystem_case_sensitive_cache_clear()
+            self.assertRaises(AssertionError, path_utils.is_filesystem_case_sensitive, self.dirs[1])
+        path_utils.is_filesystem_case_sensitive_cache_clear(persisted=True)
+        self.assertFalse(os.path.exists(self.cache_path))
+
+
+class TestIsFilesystemCaseSensitiveFake(pyfakefs.fake_filesystem_unittest.TestCase):
+    def setUp(self):
+        self.setUpPyfakefs()
+        path_utils.is_filesystem_case_sensitive_cache_clear()
+        self.addCleanup(path_utils.is_filesystem_case_sensitive_cache_clear)
+
+    @parameterized.expand([(True,), (False,)])
+    def test_probe(self, case_sensitive: bool):
+        self.fs.is_case_sensitive = case_sensitive
+        self.fs.create_file("/123/File")
+        self.fs.create_dir("/456")
+        #### "straße".swapcase() is "STRASSE", which is not the same name even if case insensitive
+        self.fs.create_file("/789/straße")
+        for dir_ in ("/123", "/456", "/789"):
+            path_utils.is_filesystem_case_sensitive_cache_clear()
+            self.assertEqual(path_utils.is_filesystem_case_sensitive(dir_, persist=False), case_sensitive)
+
+
+class TestAppendMissingLinesToFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "file")
+
+    def write(self, content: bytes) -> None:
+        with open(self.path, "wb") as f:
+            f.write(content)
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    @parameterized.expand([(False,), (True,)])
+    def test_append_missing_lines_to_file(self, use_mmap: bool):
+        self.write(b"foobar\nbaz")
+        self.assertFalse(path_utils.append_missing_lines_to_file(self.path, ["foo", "baz"], check_only=True))
+        self.assertEqual(self.read(), b"foobar\nbaz")
+        self.assertTrue(
+            path_utils.append_missing_lines_to_file(self.path, ["foo", "baz", "qux\nfoo", ""], use_mmap=use_mmap),
+        )
+        self.assertEqual(self.read(), b"foobar\nbaz\nfoo\nqux\n")
+        self.assertTrue(path_utils.append_missing_lines_to_file(self.path, ["foo", "qux"], check_only=True))
+        self.assertTrue(path_utils.append_missing_lines_to_file(self.path, ["foo", "qux"], use_mmap=use_mmap))
+        self.assertEqual(self.read(), b"foobar\nbaz\nfoo\nqux\n")
+
+    def test_append_missing_lines_to_file_created(self):
+        self.assertFalse(path_utils.append_missing_lines_to_file(self.path, ["a"], check_only=True))
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(path_utils.append_missing_lines_to_file(self.path, ["a", "b", "a"]))
+        self.assertEqual(self.read(), b"a\nb\n")
+
+    @parameterized.expand([(False,), (True,)])
+    def test_append_missing_lines_to_file_crlf(self, check_only: bool):
+        self.write(b"foo\r\nbar\r\n")
+        self.assertRaises(
+            ValueError, path_utils.append_missing_lines_to_file, self.path, ["baz"], check_only=check_only
+        )
+        self.assertEqual(self.read(), b"foo\r\nbar\r\n")
+        self.assertTrue(
+            path_utils.append_missing_lines_to_file(self.path, ["bar"], is_windows=True, check_only=check_only)
+        )
+
+    @parameterized.expand([(False,), (True,)])
+    def test_file_lines_missing(self, use_mmap: bool):
+        lines = [f"line {i}" for i in range(1000)]
+        self.write("\r\n".join(lines[::2]).encode("utf-8"))
+        for chunk_size in (1, 7, 2**20):
+            self.assertEqual(
+                path_utils.file_lines_missing(self.path, lines + ["line 1"], use_mmap, chunk_size),
+                lines[1::2],
+            )
+            self.assertEqual(path_utils.file_lines_missing(self.path, lines[-2::-2], use_mmap, chunk_size), [])
+
+
 class TestOpenUnixTxtSafely(unittest.TestCase):
     @parameterized.expand(
         [
@@ -136,12 +503,21 @@ def __call__(self, old, new):
         unmocked_os_rename(old, new)
 
 
+def patch_kernel_copy(test_case: unittest.TestCase) -> None:
+    """Make _copy_file read and write the fds of pyfakefs, which are unknown to the kernel, for <test_case>"""
+    for name in ("posix_fallocate", "copy_file_range", "sendfile"):
+        patcher = unittest.mock.patch(f"os.{name}", side_effect=OSError(errno.ENOSYS, ""), create=True)
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+
+
 class TestMv(pyfakefs.fake_filesystem_unittest.TestCase):
     # pylint: disable=[too-many-public-methods]
     def setUp(self):
         setattr(MockOSRenameFailOnce, "num_os_rename_calls", 0)
         setattr(MockOSRenameFailOnce, "num_os_rename_raises", 0)
         self.setUpPyfakefs()
+        patch_kernel_copy(self)
         self.dir = "/test/"
         self.create_dirs(self.dir)
         self.old = self.dir + "old.txt"
@@ -349,6 +725,7 @@ def setUp(self):
         setattr(MockOSRenameFailOnce, "num_os_rename_calls", 0)
         setattr(MockOSRenameFailOnce, "num_os_rename_raises", 0)
         self.setUpPyfakefs()
+        patch_kernel_copy(self)
         self.dir = "/test/"
         self.create_dirs(self.dir)
         self.old = [self.dir + "old_" + str(i) + ".txt" for i in range(11)]
@@ -483,6 +860,217 @@ def test__mv_multi__files_switch_old_and_new__success(self):
         path_utils.mv_multi(self.old, self.new)
         self.assert_exists(3, 0, *self.new)
 
+    def test__mv_multi__files_switch_old_and_new__contents_switched(self):
+        self.old = [self.dir + str(i) + ".txt" for i in [1, 2, 3]]
+        self.new = [self.dir + str(i) + ".txt" for i in [3, 2, 1]]
+        for f in self.old:
+            self.fs.create_file(f, contents=os.path.basename(f))
+        path_utils.mv_multi(self.old, self.new)
+        self.assert_exists(3, 0, *self.new)
+        for old, new in zip(self.old, self.new):
+            with open(new, encoding="utf-8") as f:
+                self.assertEqual(f.read(), os.path.basename(old))
+
+    def test__mv_multi__files_across_fs__success(self):
+        dir_mnt = self.dir + "mnt/"
+        self.fs.add_mount_point(dir_mnt)
+        self.new = [dir_mnt + os.path.basename(new) for new in self.new]
+        for f in self.old:
+            self.fs.create_file(f, contents=os.path.basename(f))
+        path_utils.mv_multi(self.old, self.new)
+        self.assert_exists(11, 1, *self.new, dir_mnt)
+        for old, new in zip(self.old, self.new):
+            self.assertNotEqual(os.stat(new).st_dev, os.stat(self.dir).st_dev)
+            with open(new, encoding="utf-8") as f:
+                self.assertEqual(f.read(), os.path.basename(old))
+
+    def test__mv_multi__files_across_fs_copy_fails__restored(self):
+        dir_mnt = self.dir + "mnt/"
+        self.fs.add_mount_point(dir_mnt)
+        self.new = [dir_mnt + os.path.basename(new) if i % 2 else new for i, new in enumerate(self.new)]
+        for f in self.old:
+            self.fs.create_file(f, contents=os.path.basename(f))
+        copy_file = path_utils.path_utils._copy_file  # pylint: disable=protected-access
+
+        def copy_file_fails(src, dst, *args, **kwargs):
+            if src == self.old[5]:
+                raise OSError(errno.EIO, "")
+            copy_file(src, dst, *args, **kwargs)
+
+        with unittest.mock.patch("utils.path_utils.path_utils._copy_file", side_effect=copy_file_fails):
+            self.assertRaises(OSError, path_utils.mv_multi, self.old, self.new)
+        self.assert_exists(11, 1, *self.old, dir_mnt)
+        for old in self.old:
+            with open(old, encoding="utf-8") as f:
+                self.assertEqual(f.read(), os.path.basename(old))
+
+    def test__mv_multi__files_new_hardlink_of_old__raise_file_exists(self):
+        self.create_files(*self.old)
+        os.link(self.old[1], self.new[0])
+        self.assertRaises(FileExistsError, path_utils.mv_multi, self.old, self.new)
+        self.assert_exists(12, 0, *self.old, self.new[0])
+
+    def test__mv_multi__progress__counts_renames_and_copies(self):
+        dir_mnt = self.dir + "mnt/"
+        self.fs.add_mount_point(dir_mnt)
+        self.new = [dir_mnt + os.path.basename(new) if i % 2 else new for i, new in enumerate(self.new)]
+        for f in self.old:
+            self.fs.create_file(f, contents=os.path.basename(f))
+        reports = []
+        progress = path_utils.MvProgress(lambda p: reports.append((p.bytes_copied, p.files_done, p.finished)), 0)
+        path_utils.mv_multi(self.old, self.new, progress=progress)
+        bytes_copied = sum(len(os.path.basename(old)) for i, old in enumerate(self.old) if i % 2)
+        self.assertEqual((progress.files_done, progress.files_total), (len(self.old), len(self.old)))
+        self.assertEqual((progress.bytes_copied, progress.bytes_total), (bytes_copied, bytes_copied))
+        self.assertEqual(reports[-1], (bytes_copied, len(self.old), True))
+        self.assertEqual(reports, sorted(reports))
+
+
+class MockOSRenameFailNth:
+    # pylint: disable=[too-few-public-methods]
+    num_os_rename_calls = 0
+    fail_on_call = 0
+    exception: BaseException = OSError(errno.EIO, "")
+
+    def __init__(self):
+        pass
+
+    def __call__(self, old, new):
+        MockOSRenameFailNth.num_os_rename_calls += 1
+        if MockOSRenameFailNth.num_os_rename_calls == MockOSRenameFailNth.fail_on_call:
+            raise MockOSRenameFailNth.exception
+        unmocked_os_rename(old, new)
+
+
+class TestRenamePlan(TestMvMulti):
+    def setUp(self):
+        super().setUp()
+        setattr(MockOSRenameFailNth, "num_os_rename_calls", 0)
+        setattr(MockOSRenameFailNth, "fail_on_call", 0)
+        setattr(MockOSRenameFailNth, "exception", OSError(errno.EIO, ""))
+        self.journal = "/journal.jsonl"
+
+    def create_files_named(self, *files):
+        for f in files:
+            self.fs.create_file(f, contents=os.path.basename(f))
+
+    def assert_contents(self, dsts, srcs):
+        for dst, src in zip(dsts, srcs):
+            with open(dst, encoding="utf-8") as f:
+                self.assertEqual(f.read(), os.path.basename(src), f"'{dst}' should contain '{src}'")
+
+    def test__rename_plan__files_base_case__success(self):
+        self.create_files_named(*self.old)
+        path_utils.RenamePlan(self.old, self.new, self.journal).execute()
+        self.assert_exists(11, 0, *self.new)
+        self.assert_contents(self.new, self.old)
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test__rename_plan__files_chain__success(self):
+        self.old = [self.dir + str(i) + ".txt" for i in [1, 2, 3]]
+        self.new = [self.dir + str(i) + ".txt" for i in [2, 3, 4]]
+        self.create_files_named(*self.old)
+        plan = path_utils.RenamePlan(self.old, self.new)
+        self.assertEqual(len(plan.steps), 3)
+        plan.execute()
+        self.assert_exists(3, 0, *self.new)
+        self.assert_contents(self.new, self.old)
+
+    def test__rename_plan__files_cycle__success(self):
+        self.old = [self.dir + str(i) + ".txt" for i in [1, 2, 3]]
+        self.new = [self.dir + str(i) + ".txt" for i in [2, 3, 1]]
+        self.create_files_named(*self.old)
+        plan = path_utils.RenamePlan(self.old, self.new)
+        self.assertEqual(len(plan.steps), 4)
+        plan.execute()
+        self.assert_exists(3, 0, *self.new)
+        self.assert_contents(self.new, self.old)
+
+    @unittest.mock.patch("os.rename", side_effect=MockOSRenameFailNth())
+    def test__rename_plan__journal_dir_missing__created(self, _mock_os_rename_):
+        setattr(MockOSRenameFailNth, "fail_on_call", 6)
+        setattr(MockOSRenameFailNth, "exception", KeyboardInterrupt())
+        self.journal = "/cache/mfmv/journal.jsonl"
+        self.create_files_named(*self.old)
+        self.assertRaises(KeyboardInterrupt, path_utils.RenamePlan(self.old, self.new, self.journal).execute)
+        self.assertEqual(path_utils.RenamePlan.from_journal(self.journal).done, 5)
+
+    def test__rename_plan__files_new_exists__raise_file_exists(self):
+        self.create_files(*self.old, self.new[-1])
+        self.assertRaises(FileExistsError, path_utils.RenamePlan(self.old, self.new, self.journal).execute)
+        self.assert_exists(12, 0, *self.old, self.new[-1])
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test__rename_plan__files_new_not_unique__raise_value(self):
+        self.assertRaises(ValueError, path_utils.RenamePlan, self.old, self.new[:-1] + [self.new[0]])
+
+    @unittest.mock.patch("os.rename", side_effect=MockOSRenameFailNth())
+    def test__rename_plan__files_rename_fails__rollback(self, _mock_os_rename_):
+        setattr(MockOSRenameFailNth, "fail_on_call", 6)
+        self.create_files_named(*self.old)
+        self.assertRaises(OSError, path_utils.RenamePlan(self.old, self.new, self.journal).execute)
+        self.assert_exists(11, 0, *self.old)
+        self.assert_contents(self.old, self.old)
+        self.assertFalse(os.path.exists(self.journal))
+
+    @unittest.mock.patch("os.rename", side_effect=MockOSRenameFailNth())
+    def test__rename_plan__files_interrupted__resume(self, _mock_os_rename_):
+        setattr(MockOSRenameFailNth, "fail_on_call", 6)
+        setattr(MockOSRenameFailNth, "exception", KeyboardInterrupt())
+        self.create_files_named(*self.old)
+        self.assertRaises(KeyboardInterrupt, path_utils.RenamePlan(self.old, self.new, self.journal).execute)
+        self.assertTrue(os.path.exists(self.journal))
+        plan = path_utils.RenamePlan.from_journal(self.journal)
+        self.assertEqual(plan.done, 5)
+        plan.execute()
+        self.assert_exists(11, 0, *self.new)
+        self.assert_contents(self.new, self.old)
+        self.assertFalse(os.path.exists(self.journal))
+
+    @unittest.mock.patch("os.rename", side_effect=MockOSRenameFailNth())
+    def test__rename_plan__files_interrupted__rollback(self, _mock_os_rename_):
+        setattr(MockOSRenameFailNth, "fail_on_call", 6)
+        setattr(MockOSRenameFailNth, "exception", KeyboardInterrupt())
+        self.create_files_named(*self.old)
+        self.assertRaises(KeyboardInterrupt, path_utils.RenamePlan(self.old, self.new, self.journal).execute)
+        path_utils.RenamePlan.from_journal(self.journal).rollback()
+        self.assert_exists(11, 0, *self.old)
+        self.assert_contents(self.old, self.old)
+        self.assertFalse(os.path.exists(self.journal))
+
+    @unittest.mock.patch("os.rename", side_effect=MockOSRenameFailNth())
+    def test__rename_plan__rollback_interrupted__rollback(self, _mock_os_rename_):
+        setattr(MockOSRenameFailNth, "fail_on_call", 6)
+        setattr(MockOSRenameFailNth, "exception", KeyboardInterrupt())
+        self.create_files_named(*self.old)
+        self.assertRaises(KeyboardInterrupt, path_utils.RenamePlan(self.old, self.new, self.journal).execute)
+        #### interrupted after undoing a rename but before journaling it
+        with unittest.mock.patch.object(path_utils.RenamePlan, "_record", side_effect=KeyboardInterrupt()):
+            self.assertRaises(KeyboardInterrupt, path_utils.RenamePlan.from_journal(self.journal).rollback)
+        plan = path_utils.RenamePlan.from_journal(self.journal)
+        self.assertEqual(plan.done, 4)
+        plan.rollback()
+        self.assert_exists(11, 0, *self.old)
+        self.assert_contents(self.old, self.old)
+        self.assertFalse(os.path.exists(self.journal))
+
+    @unittest.mock.patch("os.rename", side_effect=MockOSRenameFailNth())
+    def test__rename_plan__journal_of_interrupted_plan__kept(self, _mock_os_rename_):
+        setattr(MockOSRenameFailNth, "fail_on_call", 6)
+        setattr(MockOSRenameFailNth, "exception", KeyboardInterrupt())
+        self.create_files_named(*self.old)
+        self.assertRaises(KeyboardInterrupt, path_utils.RenamePlan(self.old, self.new, self.journal).execute)
+        other_old = [self.dir + "other_old.txt"]
+        other_new = [self.dir + "other_new.txt"]
+        self.create_files_named(*other_old)
+        self.assertRaises(FileExistsError, path_utils.RenamePlan(other_old, other_new, self.journal).execute)
+        self.assertRaises(FileExistsError, path_utils.RenamePlan(other_old, other_new, self.journal).rollback)
+        plan = path_utils.RenamePlan.from_journal(self.journal)
+        self.assertEqual(plan.done, 5)
+        plan.execute()
+        self.assert_exists(12, 0, *self.new, *other_old)
+        self.assertFalse(os.path.exists(self.journal))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,10 +3,17 @@
 # usage:
 #   * from utils import slice_utils
 #       * adding this to a python file allows usage of functions as slice_utils.func()
+#   * normalized = slice_utils.NormalizedSlice(slice_, length)
+#       * normalizes <slice_> once so that normalized.index(i), i in normalized, normalized.merge(s) and
+#         normalized.reverse() are O(1) arithmetic
 #
 # author: acegene <acegene22@gmail.com>
+from __future__ import annotations
+
 import functools
+from collections.abc import Iterator
 from collections.abc import Sequence
+from typing import Any
 
 
 def in_slice(index: int, slice_: slice, length: int) -> bool:
@@ -205,3 +212,111 @@ def slice_merge_impl(lhs: slice, rhs: slice, length: int, allow_nones: bool) ->
         return slice(start, stop, step)
 
     return functools.reduce(lambda x, y: slice_merge_impl(x, y, length, allow_nones), slices)
+
+
+class NormalizedSlice:
+    """Immutable container[<slice_>] normalized for len(container) = <length>
+
+    The indices of container[<slice_>] are stored as a range, which holds start/step/len, so no method renormalizes
+    <slice_>.
+
+    Attributes:
+        start: First index of the container in container[<slice_>]
+        stop: Index of the container one step past the last index in container[<slice_>], negative if that precedes 0
+        step: Step between consecutive indices of the container
+        len: len(container[<slice_>])
+        length: Length of the first dimension of the container being sliced
+    """
+
+    __slots__ = ("_range", "length")
+
+    def __init__(self, slice_: slice | None, length: int) -> None:
+        """Normalize <slice_>, or all of the container if None, for a container of len <length>
+
+        Args:
+            slice_: Slice to be normalized
+            length: Length of the first dimension of the container being sliced
+        """
+        object.__setattr__(self, "_range", range(length) if slice_ is None else range(length)[slice_])
+        object.__setattr__(self, "length", length)
+
+    @classmethod
+    def _from_range(cls, range_: range, length: int) -> NormalizedSlice:
+        out = cls.__new__(cls)
+        object.__setattr__(out, "_range", range_)
+        object.__setattr__(out, "length", length)
+        return out
+
+    @property
+    def start(self) -> int:
+        return self._range.start
+
+    @property
+    def stop(self) -> int:
+        return self._range.start + len(self._range) * self._range.step
+
+    @property
+    def step(self) -> int:
+        return self._range.step
+
+    @property
+    def len(self) -> int:
+        return len(self._range)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __contains__(self, index: object) -> bool:
+        """Return 'container[<index>] in container[<slice_>]' like in_slice()"""
+        if not isinstance(index, int):
+            return False
+        return (index + self.length if index < 0 else index) in self._range
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, NormalizedSlice):
+            return NotImplemented
+        return self._range == other._range and self.length == other.length
+
+    def __hash__(self) -> int:
+        return hash((self._range, self.length))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._range)
+
+    def __len__(self) -> int:
+        return len(self._range)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_slice()}, {self.length})"
+
+    def index(self, index: int) -> int:
+        """Return <index_slice> such that 'cntnr[<index_slice>] == cntnr[<slice_>][<index>]' like slice_index()
+
+        Raises:
+            IndexError: If cntnr[<slice_>][<index>] would raise a IndexError
+        """
+        return self._range[index]
+
+    def merge(self, slice_: slice | NormalizedSlice) -> NormalizedSlice:
+        """Return the NormalizedSlice of container[<self>][<slice_>] like slice_merge()"""
+        if isinstance(slice_, NormalizedSlice):
+            assert slice_.length == self.len, (slice_.length, self.len)
+            slice_ = slice_.to_slice()
+        return self._from_range(self._range[slice_], self.length)
+
+    def reverse(self) -> NormalizedSlice:
+        """Return the NormalizedSlice of container[<self>][::-1]"""
+        return self._from_range(self._range[::-1], self.length)
+
+    def to_range(self) -> range:
+        """Return the indices of container[<slice_>] as a range"""
+        return self._range
+
+    def to_slice(self) -> slice:
+        """Return a slice equivalent to <self>, with stop set to None when it would be negative"""
+        if not self._range:
+            return slice(0, 0, self.step)
+        return slice(self.start, self.stop if self.stop >= 0 else None, self.step)
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+#
+# Tests filter_utils.py
+#
+# usage
+#   * python test_filter_utils.py
+#       * need to have filter_utils.py in $PYTHONPATH or place filter_utils.py in parent directory
+import os
+import tempfile
+import unittest.mock
+
+try:
+    from utils import filter_utils
+except ImportError:
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+    from utils import filter_utils
+####################################################################################################
+####################################################################################################
+
+
+class FilterUtilsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.dir = os.path.realpath(self.tmp_dir.name)
+        self.files = [os.path.join(self.dir, str(i), f) for i in range(20) for f in ("a.txt", "B.txt", ".DS_Store")]
+        for f in self.files:
+            os.makedirs(os.path.dirname(f), exist_ok=True)
+            open(f, "w", encoding="utf-8").close()
+
+    def main(self, *args: str) -> list[str]:
+        return list(filter_utils.main(["--dir", self.dir, *args]))
+
+    def test_main(self):
+        self.assertEqual(sorted(self.main("--or", "files")), sorted(self.files))
+        self.assertEqual(sorted(self.main("--or", "files", "--or", "files")), sorted(self.files))
+        self.assertEqual(
+            sorted(self.main("--or", "files", "--and", "regex --rhu --file-mode")),
+            sorted(f for f in self.files if os.path.basename(f) != "a.txt"),
+        )
+        self.assertEqual(
+            sorted(self.main("--or", "files", "--and", "apple_junk")),
+            sorted(f for f in self.files if f.endswith(".DS_Store")),
+        )
+        self.assertEqual(self.main("--and", "files"), [])
+
+    def test_main_streams(self):
+        walked = []
+        os_walk = os.walk
+
+        def walk(*args, **kwargs):
+            for root, dirs, files in os_walk(*args, **kwargs):
+                walked.append(root)
+                yield root, dirs, files
+
+        with unittest.mock.patch("utils.filter_utils.os.walk", side_effect=walk):
+            objs = iter(filter_utils.main(["--dir", self.dir, "--or", "files", "--and", "regex -r B"]))
+            self.assertEqual(walked, [])
+            self.assertTrue(next(objs).endswith("B.txt"))
+            self.assertLess(len(walked), 3)
+
+    def test_plan_filters(self):
+        filter_lst, _explain = filter_utils._parse_input(  # pylint: disable=protected-access
+            [
+                "--dir",
+                self.dir,
+                "--or",
+                "files",
+                "--and",
+                "git_text",
+                "--and",
+                "apple_junk",
+                "--and",
+                "regex -r Store",
+                "--and",
+                "regex -r Store",
+                "--or",
+                "files",
+            ],
+        )
+        plan = filter_utils.plan_filters(filter_lst)
+        self.assertEqual(
+            [(f["operation"], f["filter"]) for f in plan],
+            [("or", "files"), ("and", "regex"), ("and", "apple_junk"), ("and", "git_text"), ("or", "files")],
+        )
+        self.assertIs(plan[0]["args"]["snapshot"], plan[2]["args"]["snapshot"])
+        self.assertNotIn("snapshot", filter_lst[0]["args"])
+        self.assertIn("shares snapshot 1", filter_utils.explain_plan(filter_lst, plan))
+
+    def test_main_walks_once(self):
+        with unittest.mock.patch("utils.filter_utils.os.scandir", side_effect=os.scandir) as scandir:
+            self.assertEqual(
+                sorted(self.main("--or", "files", "--and", "apple_junk")),
+                sorted(f for f in self.files if f.endswith(".DS_Store")),
+            )
+        #### each dir is listed on its own once instead of each filter walking the tree
+        self.assertEqual(scandir.call_count, 21)
+
+    def test_dir_snapshot(self):
+        os.makedirs(os.path.join(self.dir, "0", ".git", "objects"))
+        os.symlink(os.path.join(self.dir, "1"), os.path.join(self.dir, "0", "link"))
+        walked = []
+        for root, dirs, files in os.walk(self.dir):
+            dirs[:] = [d for d in dirs if d != ".git"]
+            walked.append((root, sorted(dirs), sorted(f for f in files if f != "B.txt")))
+        snapshot = filter_utils.DirSnapshot(self.dir, [".git"])
+        for _ in range(2):
+            self.assertEqual(sorted((r, sorted(d), sorted(f)) for r, d, f in snapshot.walk(["B.txt"])), sorted(walked))
+        self.assertEqual(len(snapshot), 1 + 20 + 3 * 20 + 1)
+        self.assertIs(snapshot.names[-1], snapshot.names[-4])
+        self.assertTrue(os.path.exists(snapshot.path(len(snapshot) - 1)))
+        #### names pruned from the yielded dirs are not walked
+        walk = snapshot.walk()
+        _root, dirs, _files = next(walk)
+        dirs[:] = ["3"]
+        self.assertEqual([r for r, _d, _f in walk], [os.path.join(self.dir, "3")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+#
+# Tests git_utils.py
+#
+# usage
+#   * python test_git_utils.py
+#       * need to have git_utils.py in $PYTHONPATH or place git_utils.py in parent directory
+import os
+import subprocess
+import tempfile
+import unittest.mock
+
+import git
+
+try:
+    from utils import filter_utils
+    from utils import git_utils
+except ImportError:
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+    from utils import filter_utils
+    from utils import git_utils
+####################################################################################################
+####################################################################################################
+
+
+class GitBatchQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.addCleanup(git_utils.GitBatchQuery.close_all)
+        self.dir = os.path.realpath(self.tmp_dir.name)
+        subprocess.run(["git", "init", "-q", self.dir], check=True)
+        files = {
+            ".gitignore": "*.log\n!keep.log\n",
+            ".gitattributes": "*.txt text eol=crlf\n*.md text\n",
+            "a.log": "",
+            "keep.log": "",
+            "tracked.log": "",
+            "a.txt": "",
+            "a.md": "",
+            "a.bin": "",
+        }
+        for f, content in files.items():
+            with open(os.path.join(self.dir, f), "w", encoding="utf-8") as f_obj:
+                f_obj.write(content)
+        subprocess.run(["git", "-C", self.dir, "add", "-f", "tracked.log"], check=True)
+        self.files = [os.path.join(self.dir, f) for f in files]
+
+    def test_query(self):
+        query = git_utils.GitBatchQuery.get(self.dir, ("check-ignore", "--verbose", "--non-matching"), 4)
+        self.assertIs(query, git_utils.GitBatchQuery.get(self.dir, ("check-ignore", "--verbose", "--non-matching"), 4))
+        for _ in range(2):
+            self.assertEqual(
+                list(query.query(["a.log", "keep.log", "a.txt"] * 1000))[:3],
+                [
+                    ("a.log", [".gitignore", "1", "*.log", "a.log"]),
+                    ("keep.log", [".gitignore", "2", "!keep.log", "keep.log"]),
+                    ("a.txt", ["", "", "", "a.txt"]),
+                ],
+            )
+        #### an abandoned query restarts the process
+        results = query.query(["a.log"] * 100000)
+        next(results)
+        results.close()
+        self.assertEqual(len(list(query.query(["a.log"] * 10))), 10)
+        self.assertFalse(query.contains(os.path.dirname(self.dir)))
+        self.assertRaises(git.exc.GitCommandError, list, query.query([os.path.dirname(self.dir)]))
+        self.assertEqual(len(list(query.query(["a.log"]))), 1)
+
+    def test_filter_git_ignore(self):
+        files = self.files + [os.path.dirname(self.dir)]
+        self.assertEqual(list(filter_utils.filter_git_ignore(files, self.dir)), [os.path.join(self.dir, "a.log")])
+
+    def test_symlinked_dir(self):
+        os.makedirs(os.path.join(self.dir, "real", "sub"))
+        os.symlink("real", os.path.join(self.dir, "link"))
+        os.symlink(self.dir, os.path.join(self.dir, "real", "top"))
+        outside = self.dir + "_link"
+        os.symlink(self.dir, outside)
+        self.addCleanup(os.unlink, outside)
+        files = [os.path.join(self.dir, d, "a.log") for d in ("real", "real/sub", "link", "link/sub", "real/top")]
+        for f in files:
+            with open(f, "w", encoding="utf-8"):
+                pass
+        query = git_utils.GitBatchQuery.get(self.dir, ("check-ignore", "--verbose", "--non-matching"), 4)
+        self.assertEqual([query.contains(f) for f in files], [True, True, False, False, False])
+        self.assertTrue(query.contains(os.path.join(outside, "a.log")))
+        self.assertEqual(
+            list(filter_utils.filter_git_ignore([*files, os.path.join(outside, "a.log")], self.dir)),
+            [*files[:2], os.path.join(self.dir, "a.log")],
+        )
+        self.assertEqual(list(filter_utils.filter_git_text(files, self.dir, "all")), [])
+
+    def test_filter_git_text(self):
+        self.assertEqual(
+            sorted(filter_utils.filter_git_text(self.files, self.dir, "all")),
+            [os.path.join(self.dir, f) for f in ("a.md", "a.txt")],
+        )
+        self.assertEqual(
+            list(filter_utils.filter_git_text(self.files, self.dir, "crlf")), [os.path.join(self.dir, "a.txt")]
+        )
+
+
+class GitIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.addCleanup(git_utils.GitBatchQuery.close_all)
+        self.dir = os.path.realpath(self.tmp_dir.name)
+        self.git("init", "-q")
+        self.git("config", "user.email", "test@test")
+        self.git("config", "user.name", "test")
+        for f in ("a.txt", "d/b.txt", "d/e/c.txt", "f/g.txt", "h.txt"):
+            self.write(f, f)
+        os.symlink("a.txt", os.path.join(self.dir, "link"))
+        self.git("add", ".")
+        self.git("commit", "-q", "-m", "init")
+        #### staged modification, addition and removal along with untracked and ignored files
+        self.write("d/b.txt", "changed")
+        self.write("d/new.txt", "")
+        self.git("add", "d")
+        self.git("rm", "-q", "--cached", "f/g.txt")
+        os.remove(os.path.join(self.dir, "h.txt"))
+        self.write(".gitignore", "ignored/\n*.log\n")
+        for f in ("u.txt", "d/e/u.log", "ignored/i.txt", "new/n.txt"):
+            self.write(f, "")
+        self.git("init", "-q", "nested")
+
+    def git(self, *args: str) -> str:
+        return subprocess.run(["git", "-C", self.dir, *args], check=True, capture_output=True, text=True).stdout
+
+    def write(self, file: str, content: str) -> None:
+        path = os.path.join(self.dir, file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def test_parse(self):
+        self.git("add", "--intent-to-add", "u.txt")
+        for version in ("2", "3", "4"):
+            self.git("update-index", "--index-version", version)
+            index = git_utils.GitIndex.get(self.dir)
+            self.assertIs(index, git_utils.GitIndex.get(os.path.join(self.dir, "d")))
+            stages = [line.split(None, 3) for line in self.git("ls-files", "-s", "-z").split("\0")[:-1]]
+            self.assertEqual(index.paths, [path for _mode, _oid, _stage, path in stages])
+            self.assertEqual(list(index.stages), [int(stage) for _mode, _oid, stage, _path in stages])
+            self.assertEqual(list(index.mode), [int(mode, 8) for mode, _oid, _stage, _path in stages])
+            self.assertEqual([index.oid(i).hex() for i in range(len(index))], [oid for _mode, oid, _, _ in stages])
+            st = os.lstat(os.path.join(self.dir, "d", "b.txt"))
+            i = index.paths.index("d/b.txt")
+            self.assertEqual((index.size[i], index.mtime_s[i], index.ino[i]), (st.st_size, int(st.st_mtime), st.st_ino))
+            self.assertEqual([p for i, p in enumerate(index.paths) if index.ext_flags[i]], ["u.txt"])
+        self.git("reset", "-q", "--", "u.txt")
+        self.git("write-tree")
+        self.assertIn("d/e", git_utils.GitIndex.get(self.dir).tree_cache)
+        self.assertIsNone(git_utils.GitIndex.get(os.path.dirname(self.dir)))
+
+    def test_staged(self):
+        with unittest.mock.patch("subprocess.Popen", side_effect=AssertionError("git was run")):
+            staged = git_utils.GitIndex.get(self.dir).staged()
+        self.assertEqual(staged, self.git("diff", "--cached", "--name-only", "-z").split("\0")[:-1])
+        self.git("commit", "-q", "-m", "staged")
+        self.git("write-tree")
+        self.assertEqual(git_utils.GitIndex.get(self.dir).staged(), [])
+        #### conflicted entries are staged once
+        self.git("checkout", "-q", "-b", "other")
+        self.write("a.txt", "other")
+        self.git("commit", "-q", "-am", "other")
+        self.git("checkout", "-q", "-")
+        self.write("a.txt", "main")
+        self.git("commit", "-q", "-am", "main")
+        subprocess.run(["git", "-C", self.dir, "merge", "-q", "other"], check=False, capture_output=True)
+        index = git_utils.GitIndex.get(self.dir)
+        self.assertEqual([index.stages[i] for i, p in enumerate(index.paths) if p == "a.txt"], [1, 2, 3])
+        self.assertEqual(
+            index.staged(), sorted(set(self.git("diff", "--cached", "--name-only", "-z").split("\0")[:-1]))
+        )
+        self.assertEqual(index.tracked().count("a.txt"), 1)
+
+    def test_filters(self):
+        for dir_ in (self.dir, os.path.join(self.dir, "d")):
+            for filter_, args in (
+                (filter_utils.filter_git_tracked, ()),
+                (filter_utils.filter_git_staged, ()),
+                (filter_utils.filter_git_untracked, (False,)),
+                (filter_utils.filter_git_untracked, (True,)),
+            ):
+                self.assertEqual(
+                    sorted(filter_(dir_, *args, read_index=True)),
+                    sorted(filter_(dir_, *args, read_index=False)),
+                )
+        self.assertIn(os.path.join(self.dir, "nested"), filter_utils.filter_git_untracked(self.dir, False))
+        self.assertNotIn(os.path.join(self.dir, "h.txt"), filter_utils.filter_git_tracked(self.dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
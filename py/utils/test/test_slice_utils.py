@@ -184,6 +184,35 @@ def test__slice_merge(self):
                         expected_base[s1][s2][s3] == expected_base[s_merged]
                     ), f"{[s1, s2, s3]} != {s_merged} so {expected_base[s1][s2][s3]} != {expected_base[s_merged]}"
 
+    def test__normalized_slice(self):
+        #### set expected base list to slice and compare with actual
+        expected_base = [0, 1, 2]
+        expected_base_length = len(expected_base)
+        #### generate slices to use for testing
+        starts = list(range(-expected_base[-1] - 2, expected_base[-1] + 2)) + [None]
+        stops = list(range(-expected_base[-1] - 2, expected_base[-1] + 2)) + [None]
+        steps = list(range(-expected_base[-1] - 1, 0)) + list(range(1, expected_base[-1] + 2)) + [None]
+        slices = [slice(start, stop, step) for start in starts for stop in stops for step in steps]
+        #### iterate over slices and test class
+        for s1 in slices:
+            normalized = slice_utils.NormalizedSlice(s1, expected_base_length)
+            assert list(normalized) == expected_base[s1] == expected_base[normalized.to_slice()], s1
+            assert len(normalized) == len(expected_base[s1]), s1
+            assert list(normalized.reverse()) == expected_base[s1][::-1], s1
+            for i in range(-expected_base_length - 1, expected_base_length + 1):
+                assert (i in normalized) == slice_utils.in_slice(i, s1, expected_base_length), (s1, i)
+                if -len(expected_base[s1]) <= i < len(expected_base[s1]):
+                    assert normalized.index(i) == slice_utils.slice_index(i, s1, expected_base_length), (s1, i)
+                else:
+                    with self.assertRaises(IndexError):
+                        normalized.index(i)
+            for s2 in slices:
+                merged = normalized.merge(s2)
+                assert list(merged) == expected_base[s1][s2] == expected_base[merged.to_slice()], [s1, s2]
+                assert merged == normalized.merge(slice_utils.NormalizedSlice(s2, len(normalized))), [s1, s2]
+        with self.assertRaises(AttributeError):
+            normalized.start = 0  # type: ignore[misc]
+
 
 if __name__ == "__main__":
     unittest.main()
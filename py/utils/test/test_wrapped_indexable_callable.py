@@ -8,6 +8,8 @@
 import itertools
 import unittest.mock
 
+from utils import wrapped_indexable_callable
+
 try:
     pass
     # from utils.wrapped_indexable_callable import wrapped_indexable_callable  # type: ignore[attr-defined] # TODO
@@ -82,6 +84,30 @@ def test__iterable_from_indexable(self):
                     self.assert_containers_equal(expected_base[s1][s2][s3], actual_func[s2][s3], [s1, s2, s3])
                     self.assert_containers_equal(expected_base[s1][s2][s3], actual_list[s2][s3], [s1, s2, s3])
 
+    def test_index_of(self):
+        values = [f"v{i}" for i in range(100)]
+        slices = [slice(None), slice(3, 90, 7), slice(None, 40, -3), slice(-5, None), slice(50, 0)]
+        for s in slices:
+            expected = values[s]
+            wics = [
+                wrapped_indexable_callable.WrappedIndexableCallable(
+                    values.__getitem__, len(values), s, inverse=values.index
+                ),
+                wrapped_indexable_callable.WrappedIndexableCallable(expected, len(expected)),
+            ]
+            for wic in wics:
+                for i, value in enumerate(expected):
+                    assert wic.index_of(value) == i, (s, value, i)
+                for value in ("", "v", "v100", values[0], values[-1], values[50], 0, None, [], {}):
+                    assert (value in wic) is (value in expected), (s, value)
+            #### values are searched rather than reverse indexed past REVERSE_INDEX_MAX_LENGTH
+            with unittest.mock.patch.object(
+                wrapped_indexable_callable.WrappedIndexableCallable, "REVERSE_INDEX_MAX_LENGTH", 0
+            ):
+                wic = wrapped_indexable_callable.WrappedIndexableCallable(expected, len(expected))
+                assert [wic.index_of(value) for value in expected] == list(range(len(expected))), s
+                assert [] not in wic, s
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,6 +3,10 @@
 # usage
 #   * from utils.wrapped_indexable_callable import WrappedIndexableCallable
 #   * func_name = WrappedIndexableCallable(func_that_accepts_a_single_int)
+#   * func_name = WrappedIndexableCallable(func_that_accepts_a_single_int, length, inverse=func_returning_the_int)
+#       * <inverse> makes func_name.index_of(value) and 'value in func_name' O(1)
+#   * func_name = WrappedIndexableCallable(func_that_accepts_a_single_int, length, batch=func_that_accepts_a_range)
+#       * <batch> makes func_name.materialize(slice_) and func_name.take(n) build their lists in one call
 #
 # author: acegene <acegene22@gmail.com>
 from __future__ import annotations
@@ -21,17 +25,33 @@
 class WrappedIndexableCallable:
     """Wraps <callable_> and exposes it as an iterable container."""
 
-    def __init__(self, callable_: Callable | Sequence[T_co], length: int, slice_: slice | None = None) -> None:
+    REVERSE_INDEX_MAX_LENGTH = 2**16
+
+    def __init__(
+        self,
+        callable_: Callable | Sequence[T_co],
+        length: int,
+        slice_: slice | slice_utils.NormalizedSlice | None = None,
+        inverse: Callable[[Any], int] | None = None,
+        batch: Callable[[range], list[T_co]] | None = None,
+    ) -> None:
         """<callable_> taking a single pos int param, with <length> less than the largest valid index for <callable_>
 
         Args:
             callable_: Object to be wrapped and exposed as an iterable container
             length A size smaller than the largest index that <callable_> will accept
-            slice_: A slice used to simulate slicing of the internal container
+            slice_: A slice, or one already normalized for <length>, used to simulate slicing of the internal container
+            inverse: Returns the index of <callable_> that produces a value, raising ValueError for other values
+            batch: Returns [<callable_>(i) for i in range_] for a range_ of valid indices of <callable_>
         """
         self._callable = callable_
         self._length = length
-        self._slice = slice_ if slice_ is not None else slice(0, self._length, 1)
+        self._slice = (
+            slice_ if isinstance(slice_, slice_utils.NormalizedSlice) else slice_utils.NormalizedSlice(slice_, length)
+        )
+        self._inverse = inverse
+        self._batch = batch
+        self._reverse_index: dict[Any, int] | None = None
 
     @overload
     def __getitem__(self, index: int) -> T_co: ...  # type: ignore[type-var] # TODO
@@ -44,10 +64,12 @@ def __getitem__(self, item):
             return WrappedIndexableCallable(
                 self._callable,
                 self._length,
-                slice_utils.slice_merge([self._slice, item], self._length),
+                self._slice.merge(item),
+                self._inverse,
+                self._batch,
             )
         if isinstance(item, int):
-            indexable_index = slice_utils.slice_index(item, self._slice, self._length)
+            indexable_index = self._slice.index(item)
             try:
                 return (
                     self._callable[indexable_index]
@@ -65,24 +87,84 @@ def __iter__(self) -> _WrappedIndexableCallableIterator[T_co]:  # type: ignore[t
         return self._WrappedIndexableCallableIterator(self._callable, self._length, self._slice)
 
     def __len__(self) -> int:
-        return slice_utils.slice_length(self._slice, self._length)
+        return self._slice.len
 
     def __reversed__(self) -> WrappedIndexableCallable[T_co]:  # type: ignore[type-arg] # TODO
         return WrappedIndexableCallable(
             self._callable,
             self._length,
-            slice_utils.slice_merge([self._slice, slice(None, None, -1)], self._length),
+            self._slice.reverse(),
+            self._inverse,
+            self._batch,
         )
 
+    def __contains__(self, value: object) -> bool:
+        try:
+            self.index_of(value)
+        except ValueError:
+            return False
+        return True
+
+    def index_of(self, value: Any) -> int:
+        """Return the first index of <value>, in O(1) if an <inverse> was provided
+
+        Without an <inverse>, a reverse index of the values is memoized if there are at most REVERSE_INDEX_MAX_LENGTH
+        values, otherwise the values are searched.
+
+        Raises:
+            ValueError: If <value> is not present
+        """
+        if self._inverse is not None:
+            indexable_index = self._inverse(value)
+            if 0 <= indexable_index < self._length and indexable_index in self._slice:
+                return (indexable_index - self._slice.start) // self._slice.step
+        elif len(self) <= self.REVERSE_INDEX_MAX_LENGTH:
+            if self._reverse_index is None:
+                self._reverse_index = {}
+                for index, item in enumerate(self):
+                    self._reverse_index.setdefault(item, index)
+            #### unhashable values cannot be keys of the reverse index so are not present either
+            try:
+                return self._reverse_index[value]
+            except (KeyError, TypeError):
+                pass
+        else:
+            for index, item in enumerate(self):
+                if item == value:
+                    return index
+        raise ValueError(f"{value!r} is not in {type(self).__name__}")
+
     def __repr__(self) -> str:
-        return f"[{', '.join(str(x) for x in self)}]"
+        return f"[{', '.join(str(x) for x in self.materialize())}]"
+
+    def materialize(self, slice_: slice | None = None) -> list[T_co]:
+        """Return list(self[<slice_>]), using <batch> if provided instead of a call per item"""
+        indices = self._slice.to_range()
+        if slice_ is not None:
+            indices = indices[slice_]
+        if self._batch is not None:
+            return self._batch(indices)
+        try:
+            if hasattr(self._callable, "__getitem__"):
+                return [self._callable[i] for i in indices]
+            return [self._callable(i) for i in indices]  # type: ignore[operator]
+        except IndexError as e:
+            raise ValueError(
+                f"Param <callable_> provided to {type(self)} did not contain all of the indices {indices} "
+                f"that were implied to exist by <length> {self._length}",
+            ) from e
+
+    def take(self, n: int) -> list[T_co]:
+        """Return the first <n> items as a list"""
+        return self.materialize(slice(0, n))
 
     class _WrappedIndexableCallableIterator:
-        def __init__(self, callable_: Callable | Sequence[Any], length: int, slice_: slice) -> None:
+        def __init__(
+            self, callable_: Callable | Sequence[Any], length: int, slice_: slice_utils.NormalizedSlice
+        ) -> None:
             self._callable = callable_
             self._length = length
-            self._slice = slice_utils.slice_clean(slice_, self._length, True)
-            self._index = self._slice.start
+            self._indices = iter(slice_)
 
         def __iter__(
             self,
@@ -92,18 +174,7 @@ def __iter__(
             return self
 
         def __next__(self) -> T_co:  # type: ignore[type-var] # TODO
-            current = self._index
-            self._index += self._slice.step
-            if self._slice.stop is not None:
-                if self._slice.step > 0:
-                    if current >= self._slice.stop:
-                        raise StopIteration
-                else:
-                    if current <= self._slice.stop:
-                        raise StopIteration
-            else:
-                if self._slice.step < 0 and current <= -1:
-                    raise StopIteration
+            current = next(self._indices)
             try:
                 return self._callable[current] if hasattr(self._callable, "__getitem__") else self._callable(current)  # type: ignore[no-any-return] # TODO
             except IndexError as e: